@@ -0,0 +1,59 @@
+"""
+Memory footprint and metric drift of the compact dtype mode (float32 prices / features, int8 positions)
+on a synthetic minute-level get_data frame. The drift is measured on the PerformanceEstimator metrics of
+real strategies (BuyNHold, AlphaTraderLongBiased) run on the float64 and on the compact frame, so a float32
+column reaching a metric shows up as drift.
+
+    python benchmarks/bench_compact_dtypes.py --years 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from syntheticData import synthetic_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from featureStore import FeatureStore  # noqa: E402
+from tradingPerformance import PerformanceEstimator  # noqa: E402
+from tradingStrategies import AlphaTraderLongBiased, BuyNHold  # noqa: E402
+from utils import utils  # noqa: E402
+
+
+def strategy_metrics(strategy_class, data, path):
+    """
+    PerformanceEstimator metrics of `strategy_class` run on `data`, served to the strategy through a
+    FeatureStore at `path` as in production (get_data frames are never modified by the benchmark).
+    """
+    FeatureStore.create(path, data, overwrite=True)
+    strategy = strategy_class(10000., None, None, feature_store=path)
+    return PerformanceEstimator(tradingData=strategy.generate_signals()).computeMetrics()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact dtype mode benchmark")
+    parser.add_argument('--years', type=float, default=3., help='Years of minute bars')
+    parser.add_argument('--tolerance', type=float, default=1e-3, help='Maximum relative metric drift')
+    args = parser.parse_args()
+
+    data = synthetic_data(int(args.years * 525600), freq='min', volatility=0.0005, regime_length=1,
+                          uncontextualized=True, start='2021-01-01')
+    compact = utils.compact_frame(data)
+
+    before, after = utils.frame_nbytes(data), utils.frame_nbytes(compact)
+    print(f"rows={len(data):,}")
+    print(f"{'float64':<12} {before / 1024 ** 2:10.1f} MB")
+    print(f"{'compact':<12} {after / 1024 ** 2:10.1f} MB ({1 - after / before:.0%} saved)")
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for strategy_class in (BuyNHold, AlphaTraderLongBiased):
+            reference = strategy_metrics(strategy_class, data, os.path.join(directory, 'float64'))
+            result = strategy_metrics(strategy_class, compact, os.path.join(directory, 'compact'))
+            print(strategy_class.__name__)
+            for name, value in reference.items():
+                drift = abs(result[name] - value) / max(abs(value), 1e-12)
+                failed |= drift > args.tolerance
+                print(f"  {name:<22} {value:14.6g} {result[name]:14.6g}  drift={drift:.2e}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,47 @@
+"""
+Benchmark of the data-quality stage (repair_frame and flag_outliers) on multi-million-row hourly frames.
+
+    python benchmarks/bench_data_quality.py --rows 2000000 --drop 0.01 --max-seconds 5   # exit 1 above the budget
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from dataQuality import flag_outliers, repair_frame  # noqa: E402
+
+
+def hourly_frame(rows, drop, seed=0):
+    """Hourly random-walk frame with a fraction `drop` of the bars removed at random."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=rows, freq='h', name='t')
+    df = pd.DataFrame({'close': 100 + rng.normal(size=rows).cumsum(), 'ssr_oscillator': rng.normal(size=rows)},
+                      index=index)
+    return df.iloc[rng.random(rows) >= drop]
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:10.3f} s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-quality stage benchmark")
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Hourly bars before dropping')
+    parser.add_argument('--drop', type=float, default=0.01, help='Fraction of the bars dropped at random')
+    parser.add_argument('--max-seconds', type=float, default=None, help='Exit with status 1 when repair_frame is slower')
+    args = parser.parse_args()
+
+    df = hourly_frame(args.rows, args.drop)
+    (repaired, report), elapsed = timed(f"repair_frame (rows={len(df):,})", lambda: repair_frame(df))
+    timed('flag_outliers', lambda: flag_outliers(repaired))
+    print(f"missing bars: {report.missing_bars:,}  gaps: {len(report.gaps):,}  filled: {int(report.filled.sum()):,}")
+
+    sys.exit(1 if args.max_seconds is not None and elapsed > args.max_seconds else 0)
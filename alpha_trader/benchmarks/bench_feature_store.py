@@ -0,0 +1,70 @@
+"""
+Memory used by N worker processes over the same dataset: a pickled copy sent to each worker versus
+a FeatureStore attached read-only. Memory is the proportional set size (PSS: pages shared by k
+processes count 1/k for each), summed over the workers (Linux, reads /proc/self/smaps_rollup).
+
+    python benchmarks/bench_feature_store.py --rows 5000000 --workers 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from featureStore import FeatureStore  # noqa: E402
+
+
+def pss_kb():
+    """Proportional set size of this process, in kB."""
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    raise RuntimeError('Pss not found in /proc/self/smaps_rollup')
+
+
+def work(args):
+    """Touch every column, as a backtest would, then wait for the other workers and report PSS."""
+    data, barrier = args
+    if data is not None:
+        df = data.attach() if isinstance(data, FeatureStore) else data
+        sum(float(df[column].sum()) for column in df.columns)
+    barrier.wait()
+    return pss_kb()
+
+
+def run(label, payload, workers):
+    manager = multiprocessing.get_context('spawn').Manager()
+    barrier = manager.Barrier(workers)
+    started = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        total_mb = sum(pool.map(work, [(payload, barrier)] * workers, chunksize=1)) / 1024
+    elapsed = time.perf_counter() - started
+    manager.shutdown()
+    print(f"{label:<14} {elapsed:8.2f} s  total PSS {total_mb:9.1f} MB")
+    return total_mb
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature store memory benchmark")
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Rows of the dataset')
+    parser.add_argument('--columns', type=int, default=16, help='Float columns')
+    parser.add_argument('--workers', type=int, default=8, help='Worker processes')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(args.rows, args.columns)), columns=[f"f{i}" for i in range(args.columns)],
+                        index=pd.date_range('2015-01-01', periods=args.rows, freq='min', name='t'))
+    print(f"dataset {data.memory_usage().sum() / 1024 ** 2:.1f} MB, {args.workers} workers")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = FeatureStore.create(os.path.join(directory, 'features'), data)
+        baseline = run('no data', None, args.workers)
+        copied = run('pickled copy', data, args.workers)
+        shared = run('feature store', store, args.workers)
+        print(f"data memory: pickled {copied - baseline:.1f} MB, feature store {shared - baseline:.1f} MB")
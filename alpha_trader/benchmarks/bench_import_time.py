@@ -0,0 +1,62 @@
+"""
+Cold-start import latency of the main modules, each measured in a fresh interpreter.
+
+    python benchmarks/bench_import_time.py --runs 5 --top 10
+    python benchmarks/bench_import_time.py --modules dataManager --max-ms 800   # exit 1 above the budget
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+DEFAULT_MODULES = ['dataManager', 'executionEngine', 'tradingPerformance', 'tradingStrategies', 'tradingEnvironment']
+HEAVY_MODULES = ['pandas_ta', 'binance', 'pybit', 'requests', 'plotly', 'matplotlib']
+
+
+def import_once(module):
+    """
+    Import `module` in a new interpreter with -X importtime.
+
+    :return: Tuple (total microseconds, {imported module: cumulative microseconds}, heavy modules loaded).
+    """
+    code = (f"import sys; import {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SRC,
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': SRC})
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        cumulative[name.strip()] = int(cumulative_us)
+    heavy = [m for m in result.stdout.strip().split(',') if m]
+    return cumulative.get(module, 0), cumulative, heavy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES, help='Modules to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=5, help='Slowest top-level dependencies to list')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail when a median exceeds this budget')
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        runs = [import_once(module) for _ in range(args.runs)]
+        median_ms = statistics.median(total for total, _, _ in runs) / 1000
+        over_budget |= args.max_ms is not None and median_ms > args.max_ms
+
+        print(f"{module:<22} {median_ms:8.1f} ms  heavy modules loaded: {', '.join(runs[-1][2]) or 'none'}")
+        _, cumulative, _ = runs[-1]
+        top_level = {name: us for name, us in cumulative.items() if '.' not in name and name != module}
+        for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<26} {us / 1000:8.1f} ms")
+
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,63 @@
+"""
+Benchmark of the vectorized regime labeller (label_regimes) against the row-wise rule it replaced.
+
+    python benchmarks/bench_market_context.py --n 200000 --legacy-n 2000 --max-seconds 0.5   # exit 1 above the budget
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from marketContext import label_regimes  # noqa: E402
+
+
+def detections(n, seed=0):
+    """Hourly top/bottom detections: about 2% of the bars are tops and 2% bottoms, at random prices."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2011-08-01', periods=n, freq='h')
+    price = rng.uniform(1, 70000, n)
+    events = rng.choice([0, 1, 2], size=n, p=[0.96, 0.02, 0.02])
+    return pd.DataFrame({'top_detection': np.where(events == 1, price, 0.),
+                         'bottom_detection': np.where(events == 2, price, 0.)}, index=index)
+
+
+def legacy_determine_context(row):
+    # Row-wise rule previously applied by DataManager.compute_context_boolean
+    if row['bottom_detection'] != 0 and (row['top_detection'] == 0 or row.name < row.index[row['top_detection'] != 0].max()):
+        return int(1)
+    elif row['top_detection'] != 0 and (row['bottom_detection'] == 0 or row.name < row.index[row['bottom_detection'] != 0].max()):
+        return int(0)
+    else:
+        return np.nan
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:10.3f} s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regime labeller benchmark")
+    parser.add_argument('--n', type=int, default=200_000, help='Rows labelled by label_regimes')
+    parser.add_argument('--legacy-n', type=int, default=2_000, help='Rows labelled by the row-wise rule (0 to skip)')
+    parser.add_argument('--max-seconds', type=float, default=None, help='Exit with status 1 when label_regimes is slower')
+    args = parser.parse_args()
+
+    data = detections(args.n)
+    elapsed = timed(f"label_regimes (n={args.n:,})",
+                    lambda: label_regimes(data['top_detection'], data['bottom_detection']))
+
+    if args.legacy_n:
+        sample = data.iloc[:args.legacy_n]
+        legacy = timed(f"row-wise apply (n={args.legacy_n:,})",
+                       lambda: sample.apply(legacy_determine_context, axis=1))
+        print(f"{'per-row speedup':<40} {legacy / args.legacy_n / (elapsed / args.n):10.0f} x")
+
+    sys.exit(1 if args.max_seconds is not None and elapsed > args.max_seconds else 0)
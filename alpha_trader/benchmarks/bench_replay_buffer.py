@@ -0,0 +1,62 @@
+"""
+Memory per transition and sampling throughput of the ReplayBuffer, against the list of
+(state, action, reward, next_state, done) tuples it replaces, on a synthetic hourly dataset.
+
+    python benchmarks/bench_replay_buffer.py --transitions 200000 --batch-size 256
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+from syntheticData import synthetic_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from replayBuffer import ReplayBuffer  # noqa: E402
+from tradingEnvironment import TradingEnvironment  # noqa: E402
+
+
+def list_bytes_per_transition(env, count=2000):
+    """Traced allocation of `count` tuples with copied states, as collected from env.step."""
+    tracemalloc.start()
+    transitions = []
+    for i in range(count):
+        step = env.stateSize + i
+        transitions.append((env.observations([step])[0].copy(), 0, 0., env.observations([step + 1])[0].copy(), False))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay buffer benchmark")
+    parser.add_argument('--transitions', type=int, default=200000, help='Transitions stored')
+    parser.add_argument('--batch-size', type=int, default=256, help='Sampled batch size')
+    args = parser.parse_args()
+
+    env = TradingEnvironment(None, None, 10000., data=synthetic_data(args.transitions + 100, regime_length=1))
+    rng = np.random.default_rng(0)
+    steps = rng.integers(env.stateSize, len(env) - 1, args.transitions)
+
+    for prioritized in (False, True):
+        buffer = ReplayBuffer(args.transitions, environment=env, prioritized=prioritized, seed=0)
+        start = time.perf_counter()
+        for chunk in np.array_split(np.arange(args.transitions), max(1, args.transitions // 256)):
+            buffer.add_batch(steps[chunk], rng.integers(-1, 2, len(chunk)), rng.normal(size=len(chunk)),
+                             steps[chunk] + 1, np.zeros(len(chunk)))
+        add_rate = args.transitions / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(200):
+            batch = buffer.sample(args.batch_size)
+            buffer.update_priorities(batch['indices'], rng.normal(size=args.batch_size))
+        sample_rate = 200 / (time.perf_counter() - start)
+
+        name = 'prioritized' if prioritized else 'uniform'
+        print(f"{name:<12} add {add_rate:12,.0f} transitions/s   sample+update {sample_rate:8,.0f} batches/s")
+
+    stored = sum(values.nbytes for values in buffer.storage.values()) / args.transitions
+    print(f"{'tuple list':<12} {list_bytes_per_transition(env):10,.0f} bytes/transition")
+    print(f"{'ring buffer':<12} {stored:10,.0f} bytes/transition (+{buffer.tree.tree.nbytes / args.transitions:.0f} for the sum-tree)")
@@ -0,0 +1,46 @@
+"""
+Benchmark of the rolling median/quantile kernel against pandas.
+
+    python benchmarks/bench_rolling_quantile.py --n 10000000 --windows 240 2400
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from rollingQuantile import RollingQuantile  # noqa: E402
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:10.3f} s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling median/quantile benchmark")
+    parser.add_argument('--n', type=int, default=10_000_000, help='Number of points')
+    parser.add_argument('--windows', type=int, nargs='+', default=[240], help='Window lengths to sweep')
+    parser.add_argument('--quantile', type=float, default=0.5, help='Quantile to compute')
+    args = parser.parse_args()
+
+    values = np.cumsum(np.random.default_rng(0).normal(size=args.n))
+    series = pd.Series(values)
+
+    for window in args.windows:
+        print(f"n={args.n:,} window={window} quantile={args.quantile}")
+        rolling = series.rolling(window)
+        timed('pandas rolling (batch)', lambda: rolling.median() if args.quantile == 0.5 else rolling.quantile(args.quantile))
+
+        def stream():
+            kernel = RollingQuantile(window, quantile=args.quantile)
+            for value in values.tolist():
+                kernel.update(value)
+
+        timed('RollingQuantile (streaming, per update)', stream)
@@ -0,0 +1,212 @@
+"""
+Steps per second of TradingEnvironment.step (NumPy ledger) against the previous pandas implementation,
+which read and wrote the account through `data.iloc[...]` / `data.at[...]` on every step. Both run the
+same random policy on a synthetic hourly get_data frame and must produce the same ledger. The batched
+VectorTradingEnvironment is reported in environment steps per second (N episodes per batch step), and
+the cost of reset() is measured at the start of a --reset-rows long dataset (the worst case when a reset
+rewrites the rest of the history). On the same dataset, fork() and snapshot()/restore() are compared to
+deep-copying the environment.
+
+    python benchmarks/bench_trading_environment.py --steps 20000 --min-speedup 50 --num-envs 256 --reset-rows 50000
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import numpy as np
+from syntheticData import synthetic_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from tradingEnvironment import TradingEnvironment  # noqa: E402
+from vectorEnvironment import VectorTradingEnvironment  # noqa: E402
+
+STATE_COLUMNS = TradingEnvironment.STATE_COLUMNS_CONTEXTUALIZED
+
+
+class PandasTradingEnvironment:
+    """The previous step/reset: account kept as DataFrame columns, accessed cell by cell."""
+
+    def __init__(self, data, cash, stateSize=30, txCosts=0.01):
+        self.data = data.copy()
+        self.data['position'] = 0
+        self.data['action'] = 0
+        self.data['nav'] = 0.
+        self.data['cash'] = float(cash)
+        self.data['net_worth'] = self.data['cash']
+        self.data['returns'] = 0.
+        self.data['entry_price'] = np.nan
+        self.data['transaction_cost'] = 0.
+        self.stateSize = stateSize
+        self.txCosts = txCosts
+        self.current_step = stateSize
+        self.quantity = 0
+        self.done = False
+
+    def __len__(self):
+        return len(self.data)
+
+    def _get_state(self):
+        start_index = max(0, self.current_step - self.stateSize)
+        return self.data[STATE_COLUMNS].iloc[start_index:self.current_step].values.flatten().astype(float)
+
+    def reset(self):
+        if self.done:
+            self.current_step += 1
+        if self.current_step >= len(self.data):
+            self.done = True
+            return None
+        rows = self.data.index[self.current_step:]
+        self.data.loc[rows, ['position', 'action', 'nav', 'returns', 'transaction_cost']] = 0
+        self.data.loc[rows, 'entry_price'] = np.nan
+        self.data.loc[rows, 'cash'] = self.data['cash'].iloc[self.current_step - 1]
+        self.data.loc[rows, 'net_worth'] = self.data['cash'].iloc[self.current_step - 1]
+        self.done = False
+        self.quantity = 0
+        return self._get_state()
+
+    def step(self, action):
+        label = self.data.index[self.current_step]
+        current_price = self.data['close'].iloc[self.current_step]
+        market_context = self.data['context'].iloc[self.current_step]
+        previous_position = self.data['position'].iloc[self.current_step - 1]
+        previous_cash = self.data['cash'].iloc[self.current_step - 1]
+        previous_net_worth = self.data['net_worth'].iloc[self.current_step - 1]
+        entry_price = self.entry_price if previous_position != 0 else current_price
+        rate = self.txCosts
+        new_position, new_cash, transaction_cost = previous_position, previous_cash, 0
+        self.data.at[label, 'action'] = action
+
+        if market_context == 1:
+            if action == 1 and previous_position <= 0:
+                self.quantity = previous_cash / (current_price * (1 + rate))
+                transaction_cost = current_price * self.quantity * rate
+                new_cash = previous_cash - current_price * self.quantity - transaction_cost
+                new_position = 1 if previous_position == 0 else 0
+                self.entry_price = self.data.at[label, 'entry_price'] = current_price
+            elif action == -1 and previous_position == 1:
+                transaction_cost = current_price * self.quantity * rate
+                new_cash = previous_cash + current_price * self.quantity - transaction_cost
+                self.quantity = 0
+                new_position = 0
+        elif market_context == 0:
+            if action == 1 and previous_position == -1:
+                transaction_cost = current_price * self.quantity * rate
+                new_cash = previous_cash + current_price * self.quantity - transaction_cost
+                self.quantity = 0
+                new_position = 0
+            elif action == -1 and previous_position >= 0:
+                self.quantity = previous_cash / (current_price * (1 + rate))
+                transaction_cost = current_price * self.quantity * rate
+                new_cash = previous_cash - current_price * self.quantity - transaction_cost
+                new_position = -1 if previous_position == 0 else 0
+                self.entry_price = self.data.at[label, 'entry_price'] = current_price
+
+        self.data.at[label, 'position'] = new_position
+        self.data.at[label, 'cash'] = new_cash
+        self.data.at[label, 'nav'] = self.quantity * current_price
+        self.data.at[label, 'net_worth'] = self.data.at[label, 'nav'] + new_cash
+        self.data.at[label, 'transaction_cost'] = transaction_cost
+        current_net_worth = self.data.at[label, 'net_worth']
+        self.data.at[label, 'returns'] = (current_net_worth - previous_net_worth) / previous_net_worth if previous_net_worth != 0 else 0
+
+        if previous_position != 0 and new_position == 0:
+            reward = np.exp(((current_price * (1 - rate) - entry_price * (1 + rate)) / (entry_price * (1 + rate)))
+                            * (1 if previous_position > 0 else -1))
+            self.done = True
+            return self._get_state(), reward, self.done
+
+        self.current_step += 1
+        self.done = self.current_step >= len(self.data) - 1
+        return self._get_state(), 0, self.done
+
+
+def run(env, actions):
+    """Random policy: step until a trade closes, then reset. Returns (steps, seconds, rewards)."""
+    rewards = []
+    steps = 0
+    start = time.perf_counter()
+    for action in actions:
+        if env.current_step >= len(env) - 1:
+            break
+        _, reward, done = env.step(action)
+        steps += 1
+        if done:
+            rewards.append(reward)
+            if env.reset() is None:
+                break
+    return steps, time.perf_counter() - start, rewards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TradingEnvironment step throughput benchmark")
+    parser.add_argument('--steps', type=int, default=20000, help='Steps to run (the pandas path runs at most --pandas-steps)')
+    parser.add_argument('--pandas-steps', type=int, default=3000, help='Steps to run on the pandas path')
+    parser.add_argument('--num-envs', type=int, default=256, help='Episodes per batch of the vector environment')
+    parser.add_argument('--reset-rows', type=int, default=50000, help='Rows of the dataset used to time reset()')
+    parser.add_argument('--min-speedup', type=float, default=50., help='Exit with status 1 below this speedup')
+    args = parser.parse_args()
+
+    data = synthetic_data(args.steps + 100)
+    actions = np.random.default_rng(1).choice([-1, 0, 1], size=args.steps, p=[0.05, 0.9, 0.05]).tolist()
+
+    numpy_env = TradingEnvironment(None, None, 10000., data=data)
+    numpy_steps, numpy_seconds, numpy_rewards = run(numpy_env, actions)
+
+    pandas_env = PandasTradingEnvironment(data, 10000.)
+    pandas_steps, pandas_seconds, pandas_rewards = run(pandas_env, actions[:args.pandas_steps])
+
+    # Same trajectory on the common prefix
+    reference = TradingEnvironment(None, None, 10000., data=data)
+    _, _, reference_rewards = run(reference, actions[:args.pandas_steps])
+    # Rows after the last step differ while a trade is open (the pandas path only fills them on reset)
+    stepped = slice(0, reference.current_step)
+    ledger = reference.to_frame().iloc[stepped]
+    for column in ['position', 'cash', 'net_worth', 'returns']:
+        np.testing.assert_allclose(ledger[column].to_numpy(dtype=float),
+                                   pandas_env.data[column].iloc[stepped].to_numpy(dtype=float), rtol=1e-12)
+    np.testing.assert_allclose(reference_rewards, pandas_rewards, rtol=1e-12)
+
+    vector_env = VectorTradingEnvironment(TradingEnvironment(None, None, 10000., data=data), num_envs=args.num_envs)
+    batch_actions = np.random.default_rng(2).choice([-1, 0, 1], size=(max(1, args.steps // args.num_envs * 10), args.num_envs),
+                                                    p=[0.05, 0.9, 0.05])
+    start = time.perf_counter()
+    for row in batch_actions:
+        vector_env.step(row)
+    vector_rate = batch_actions.size / (time.perf_counter() - start)
+
+    reset_data = synthetic_data(args.reset_rows)
+    reset_times = {}
+    for name, env, repeats in [('pandas', PandasTradingEnvironment(reset_data, 10000.), 20),
+                               ('numpy', TradingEnvironment(None, None, 10000., data=reset_data), 20000)]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            env.reset()
+        reset_times[name] = (time.perf_counter() - start) / repeats
+
+    # Branching for lookahead: a few steps into an open trade, as a rollout would
+    branched = TradingEnvironment(None, None, 10000., data=reset_data)
+    for action in [1, 0, 0]:
+        branched.step(action)
+    branch_rates = {}
+    for name, branch, repeats in [('deepcopy', lambda: copy.deepcopy(branched), 20),
+                                  ('fork', branched.fork, 20000),
+                                  ('restore', lambda snapshot=branched.snapshot(): branched.restore(snapshot), 20000)]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            branch()
+        branch_rates[name] = repeats / (time.perf_counter() - start)
+
+    numpy_rate = numpy_steps / numpy_seconds
+    pandas_rate = pandas_steps / pandas_seconds
+    speedup = numpy_rate / pandas_rate
+    print(f"{'pandas':<8} {pandas_rate:12,.0f} steps/s ({pandas_steps:,} steps)")
+    print(f"{'numpy':<8} {numpy_rate:12,.0f} steps/s ({numpy_steps:,} steps, {len(numpy_rewards):,} trades)")
+    print(f"{'vector':<8} {vector_rate:12,.0f} steps/s ({len(batch_actions):,} batches of {args.num_envs})")
+    for name, seconds in reset_times.items():
+        print(f"{name + ' reset':<14} {seconds * 1e6:10,.1f} us ({args.reset_rows:,} rows)")
+    for name, rate in branch_rates.items():
+        print(f"{name:<14} {rate:10,.0f} /s ({args.reset_rows:,} rows)")
+    print(f"speedup  {speedup:12.1f}x")
+    sys.exit(0 if speedup >= args.min_speedup else 1)
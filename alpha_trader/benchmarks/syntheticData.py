@@ -0,0 +1,32 @@
+"""
+Synthetic get_data frames shared by the benchmarks.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_data(n, freq='h', volatility=0.005, regime_length=500, uncontextualized=False, seed=0,
+                   start='2020-01-01'):
+    """
+    Frame with the get_data columns, one row per `freq`: a random walk of `volatility` log returns from 30000,
+    OHLC bars around it, the trigger features and random bull/bear regimes of `regime_length` rows (1 for an
+    independent draw per row).
+
+    :param uncontextualized: Also add the context metrics of get_data(contextualize=False) ('mvrv_z_score',
+                             'mayer_multiple').
+    """
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.6 * volatility, n)) * close
+    data = pd.DataFrame({
+        'open': open_, 'high': np.maximum(open_, close) + spread, 'low': np.minimum(open_, close) - spread,
+        'close': close, 'volume': rng.gamma(2., 5., n),
+        'srs': rng.normal(0, 5, n), 'hash_ribbon': rng.normal(0, 1e18, n), 'cvd_ema24': rng.normal(0, 1e6, n),
+    }, index=pd.date_range(start, periods=n, freq=freq, name='t'))
+    if uncontextualized:
+        data['mvrv_z_score'] = rng.normal(1.5, 1., n)
+        data['mayer_multiple'] = rng.normal(1., 0.2, n)
+    data['context'] = np.repeat(rng.integers(0, 2, n // regime_length + 1), regime_length)[:n].astype(float)
+    return data
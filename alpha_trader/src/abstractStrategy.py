@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from tradingPerformance import PerformanceEstimator
 from dataManager import DataManager
+from featureStore import FeatureStore
+import numpy as np
 import pandas as pd 
 from executionEngine import BybitWrapper
 from datetime import datetime, timezone
@@ -9,19 +11,31 @@ from datetime import datetime, timezone
 class Strategy(ABC):
     
     @abstractmethod
-    def __init__(self, initial_balance, start, end, demo=True, contextualize=True):
-        self.data_manager = DataManager()
+    def __init__(self, initial_balance, start, end, demo=True, contextualize=True, compact=False, feature_store=None):
+        self.data_manager = DataManager(compact=compact)
         self.initial_balance = initial_balance
         if end == 'now':
             end = datetime.today().astimezone(timezone.utc).strftime('%Y-%m-%d')
 
-        self.data = self.data_manager.get_data(start=start, end=end, contextualize=contextualize)
+        if feature_store is not None:
+            # Attach to the shared memory-mapped dataset (see DataManager.build_feature_store)
+            # instead of building a private copy
+            self.data = FeatureStore(feature_store).attach() if isinstance(feature_store, str) else feature_store.attach()
+        else:
+            self.data = self.data_manager.get_data(start=start, end=end, contextualize=contextualize)
         self.wrapper = BybitWrapper(demo=demo)
         self.data['net_worth'] = self.initial_balance
     
     @abstractmethod
     def generate_signals(self) -> pd.DataFrame:
         pass
+
+    def compound(self, strategy_returns):
+        """
+        Net worth from per-bar strategy returns. Accumulated in float64 even in compact mode,
+        where prices and returns are float32.
+        """
+        return self.initial_balance * (1 + strategy_returns.astype(np.float64)).cumprod()
     
     def backtest(self, visualize=False):
         data = self.generate_signals()
@@ -0,0 +1,307 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Cache local em Parquet para métricas do Glassnode, permitindo buscar na API apenas as barras novas,
+          cache em memória (LRU) dos DataFrames já obtidos ou derivados, compartilhado pelo processo, e
+          snapshots imutáveis (Arrow IPC) dos datasets, endereçados pelo conteúdo.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import os
+import glob
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+
+###############################################################################
+######################### Classe GlassnodeCache ###############################
+###############################################################################
+
+class GlassnodeCache:
+    """
+    On-disk columnar cache of Glassnode metrics, one Parquet file per (endpoint, asset, frequency).
+
+    Besides the bars themselves, each file records the earliest start that was ever requested for
+    it (``coverage_start``), so a later call can tell "the metric has no data before this date"
+    apart from "this range was never downloaded".
+    """
+
+    METADATA_KEY = b'alpha_trader'
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.getenv(
+            'GLASSNODE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.alpha_trader', 'glassnode'))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, endpoint, asset, frequency):
+        key = endpoint.strip('/').replace('/', '__')
+        return os.path.join(self.cache_dir, f"{asset}_{frequency}_{key}.parquet")
+
+    def load(self, endpoint, asset, frequency):
+        """
+        Load a cached metric.
+
+        :return: Tuple (DataFrame with a 't' column, coverage_start) or (None, None) when not cached.
+        """
+        path = self._path(endpoint, asset, frequency)
+        if not os.path.exists(path):
+            return None, None
+
+        try:
+            table = pq.read_table(path)
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache file {path}: {e}")
+            return None, None
+
+        metadata = json.loads((table.schema.metadata or {}).get(self.METADATA_KEY, b'{}'))
+        coverage_start = pd.Timestamp(metadata['coverage_start']) if 'coverage_start' in metadata else None
+        return table.to_pandas(), coverage_start
+
+    def store(self, endpoint, asset, frequency, df, coverage_start):
+        """
+        Persist a metric, replacing any previous file atomically.
+        """
+        path = self._path(endpoint, asset, frequency)
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[self.METADATA_KEY] = json.dumps({'coverage_start': pd.Timestamp(coverage_start).isoformat()}).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def update(self, endpoint, asset, frequency, cached, new_frames, coverage_start):
+        """
+        Merge freshly downloaded bars into the cached ones and persist the result.
+        Newly downloaded bars win over cached bars with the same timestamp, so a
+        provisional last bar gets overwritten once its final value is published.
+
+        :return: The merged DataFrame, sorted by 't'.
+        """
+        frames = [df for df in [cached] + list(new_frames) if df is not None and not df.empty]
+        if not frames:
+            return None
+
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(subset='t', keep='last').sort_values('t').reset_index(drop=True)
+        self.store(endpoint, asset, frequency, merged, coverage_start)
+        return merged
+
+    def clear(self):
+        """Remove every cached file."""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+###############################################################################
+############################ Classe FrameCache ################################
+###############################################################################
+
+class FrameCache:
+    """
+    Process-wide LRU cache of DataFrames, bounded by their total memory footprint.
+
+    Frames are copied on the way in and on the way out, so callers can keep mutating
+    what they get back (most of the pipeline drops columns in place).
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached frame for `key`, or None."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            df, _ = self.entries[key]
+        return df.copy()
+
+    def put(self, key, df):
+        """Cache a copy of `df` under `key`, evicting the least recently used frames if needed."""
+        if df is None:
+            return
+        df = df.copy()
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            logging.info(f"Frame for {key} ({size} bytes) is larger than the cache, not caching it.")
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (df, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        """Return the cached frame for `key`, calling `compute()` and caching its result on a miss."""
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            self.put(key, df)
+        return df
+
+    def invalidate(self, predicate=None):
+        """
+        Drop cached frames.
+
+        :param predicate: Callable receiving a key and returning True for the entries to drop.
+                          When None, the whole cache is cleared.
+        """
+        with self.lock:
+            for key in [key for key in self.entries if predicate is None or predicate(key)]:
+                self.total_bytes -= self.entries.pop(key)[1]
+
+
+frame_cache = FrameCache()
+
+
+###############################################################################
+########################### Classe SnapshotStore ##############################
+###############################################################################
+
+def code_version(source_dir=None):
+    """
+    Fingerprint of the code that produces the datasets: a hash of every source file of the project
+    (or the ALPHA_TRADER_CODE_VERSION environment variable, when set, e.g. to a release tag).
+    """
+    version = os.getenv('ALPHA_TRADER_CODE_VERSION')
+    if version:
+        return version
+
+    source_dir = source_dir or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(source_dir, '**', '*.py'), recursive=True)):
+        digest.update(os.path.relpath(path, source_dir).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class SnapshotStore:
+    """
+    Immutable, content-addressed snapshots of DataFrames, stored as uncompressed Arrow IPC files.
+
+    The key is a hash of everything that determines the content (request parameters, endpoints,
+    code version), so a snapshot never has to be invalidated: a change in any input gives a new key.
+    Float columns are written with their NaNs as NaN values rather than Arrow nulls, so on load
+    the numeric columns are served straight from the memory-mapped file, without a copy (and
+    read-only), and reading a snapshot back costs milliseconds.
+    """
+
+    METADATA_KEY = b'alpha_trader'
+
+    def __init__(self, snapshot_dir=None):
+        self.snapshot_dir = snapshot_dir or os.getenv(
+            'ALPHA_TRADER_SNAPSHOT_DIR', os.path.join(os.path.expanduser('~'), '.alpha_trader', 'snapshots'))
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    @staticmethod
+    def key(**fields):
+        """Content address of a dataset described by `fields` (JSON-serialisable values)."""
+        payload = json.dumps(fields, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, f"{key}.arrow")
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def _read_table(self, key):
+        """The memory-mapped Arrow table stored under `key`, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, 'r') as source:
+                return ipc.open_file(source).read_all()
+        except Exception as e:
+            logging.warning(f"Discarding unreadable snapshot {path}: {e}")
+            return None
+
+    @staticmethod
+    def _to_frame(table):
+        # One block per column and no nulls: numeric columns are views on the mapped file
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def load(self, key):
+        """
+        :return: The DataFrame stored under `key` (index included), or None when there is none.
+                 Its numeric columns are read-only views on the memory-mapped snapshot.
+        """
+        table = self._read_table(key)
+        return None if table is None else self._to_frame(table)
+
+    def store(self, key, df, metadata=None):
+        """
+        Write `df` under `key`. An existing snapshot is never overwritten.
+
+        :param metadata: Optional dict saved alongside (e.g. the fields the key was computed from).
+        :return: Path of the snapshot.
+        """
+        path = self._path(key)
+        if os.path.exists(path):
+            return path
+
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        # from_pandas turns NaNs into nulls, which to_pandas can only convert back with a copy
+        columns = [pa.array(df[name].to_numpy(), type=column.type, from_pandas=False)
+                   if column.null_count and pa.types.is_floating(column.type) and name in df.columns
+                   and df[name].dtype.kind == 'f' else column
+                   for name, column in zip(table.column_names, table.columns)]
+        table = pa.Table.from_arrays(columns, schema=table.schema)
+        if metadata:
+            schema_metadata = dict(table.schema.metadata or {})
+            schema_metadata[self.METADATA_KEY] = json.dumps(metadata, default=str).encode()
+            table = table.replace_schema_metadata(schema_metadata)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    def metadata(self, key):
+        """The metadata dict saved with a snapshot, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with pa.memory_map(path, 'r') as source:
+            schema_metadata = ipc.open_file(source).schema.metadata or {}
+        return json.loads(schema_metadata.get(self.METADATA_KEY, b'null'))
+
+    def get_or_compute(self, key, compute, metadata=None):
+        """Load the snapshot for `key`, or compute the frame and freeze it."""
+        df = self.load(key)
+        if df is None:
+            df = compute()
+            if df is not None:
+                self.store(key, df, metadata=metadata)
+        else:
+            logging.info(f"Loaded dataset snapshot {key}.")
+        return df
@@ -12,21 +12,33 @@ Autor: Valter Rebelo
 
 import os
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
-import requests
 import re
 import logging
-from binance.spot import Spot
-from pybit.unified_trading import HTTP
-import time
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import warnings
 from dotenv import load_dotenv
+from dataCache import GlassnodeCache, SnapshotStore, code_version, frame_cache
+from dataQuality import repair_frame
+from featureStore import FeatureStore
+from httpFixtures import wrap_client, wrap_transport
+from klineDownloader import KlineDownloader, BinanceKlineSource, BybitKlineSource
+from klineStream import BinanceStreamProtocol, BybitStreamProtocol, KlineStream, rest_kline_to_bar
+from lazyImport import LazyModule
+from marketContext import MarketConditionState, continuous_context, detect_bottoms, detect_tops, label_regimes, market_conditions
+from panelIndicators import to_long, to_panel, trigger_indicators
+from rollingQuantile import rolling_quantile
+from streamingIndicators import TriggerIndicatorState
+from utils import utils
 
 load_dotenv()
 warnings.filterwarnings('ignore')
 
+# Only compute_triggers needs it, and importing it takes longer than a short live cycle
+ta = LazyModule('pandas_ta')
+
 
 ###############################################################################
 ######################### Classe DataManager ##################################
@@ -34,22 +46,95 @@ warnings.filterwarnings('ignore')
 
 class DataManager:
     
-    def __init__(self):
+    def __init__(self, use_cache=True, cache_dir=None, max_concurrency=8, transport=None, compact=False, snapshot_dir=None,
+                 max_fill=6):
+        """
+        :param use_cache: Memoize fetched and derived frames in process memory (see `invalidate_memory_cache`).
+        :param cache_dir: Opt-in on-disk Parquet cache of the Glassnode metrics, so later runs only download
+                          the new bars (default: GLASSNODE_CACHE_DIR; no disk cache when neither is set).
+        :param compact: Opt-in compact mode: klines are parsed as float32 and get_data returns float32
+                        prices and features (int8 for small integer columns), roughly halving memory.
+        :param snapshot_dir: Where get_data(..., snapshot=True) keeps its dataset snapshots
+                             (default: ALPHA_TRADER_SNAPSHOT_DIR or ~/.alpha_trader/snapshots).
+        :param max_fill: Missing bars forward filled by the data-quality stage: the first `max_fill` bars
+                         of each gap are filled, the rest stays NaN (see dataQuality.repair_frame). The
+                         report of each repair this manager runs is kept in `quality_reports`; frames
+                         served from the memory cache were repaired earlier and add no report.
+        """
         self.glassnode_api_key = os.getenv('GLASSNODE_API_KEY')
         self.bybit_api_key = os.getenv('BYBIT_API_KEY')
         self.bybit_api_secret = os.getenv('BYBIT_API_SECRET')
-        self.bybit_session = HTTP(testnet=False, api_key=self.bybit_api_key, api_secret=self.bybit_api_secret)
-        self.binance_session = Spot()
+        cache_dir = cache_dir or os.getenv('GLASSNODE_CACHE_DIR')
+        self.cache = GlassnodeCache(cache_dir) if use_cache and cache_dir else None
+        self.frame_cache = frame_cache if use_cache else None
+        self.max_concurrency = max_concurrency
+        self.compact = compact
+        self.max_fill = max_fill
+        self.quality_reports = {}
+        self.snapshot_dir = snapshot_dir
+        self._snapshots = None
+        self.float_dtype = np.float32 if compact else np.float64
+        self.clients_lock = threading.Lock()
+        self._transport = transport
+        self._bybit_session = None
+        self._binance_session = None
         logging.basicConfig(level=logging.INFO)
 
+    # The HTTP transport and the exchange clients (and their libraries) are created on first use,
+    # so a run served from the caches never pays for them
+
+    @property
+    def transport(self):
+        with self.clients_lock:
+            if self._transport is None:
+                from httpTransport import HttpTransport
+                self._transport = wrap_transport(lambda: HttpTransport(pool_size=self.max_concurrency))
+            return self._transport
+
+    @transport.setter
+    def transport(self, transport):
+        self._transport = transport
+
+    @property
+    def bybit_session(self):
+        with self.clients_lock:
+            if self._bybit_session is None:
+                def client():
+                    from pybit.unified_trading import HTTP
+                    return HTTP(testnet=False, api_key=self.bybit_api_key, api_secret=self.bybit_api_secret)
+                self._bybit_session = wrap_client(client, 'bybit')
+            return self._bybit_session
+
+    @bybit_session.setter
+    def bybit_session(self, session):
+        self._bybit_session = session
+
+    @property
+    def binance_session(self):
+        with self.clients_lock:
+            if self._binance_session is None:
+                def client():
+                    from binance.spot import Spot
+                    return Spot()
+                self._binance_session = wrap_client(client, 'binance')
+            return self._binance_session
+
+    @binance_session.setter
+    def binance_session(self, session):
+        self._binance_session = session
+
     @staticmethod
     def datetime_to_unix(date):
         """Convert a datetime object to a Unix timestamp."""
         return int(date.timestamp())
 
-    def _fetch_glassnode_data(self, endpoint, start, end, frequency):
+    @staticmethod
+    def _metric_name(endpoint):
+        return re.search(r'/([^/]*)$', endpoint).group(1)
+
+    def _request_glassnode_data(self, endpoint, start, end, frequency, asset='BTC'):
         params = {
-            'a': 'BTC',
+            'a': asset,
             's': self.datetime_to_unix(start),
             'u': self.datetime_to_unix(end),
             'i': frequency,
@@ -59,39 +144,96 @@ class DataManager:
         
         base_url = 'https://api.glassnode.com/v1/metrics'
         url = f"{base_url}/{endpoint}"
-        name = re.search(r'/([^/]*)$', endpoint).group(1)
-
-        for attempt in range(3):
-            try:
-                response = requests.get(url, params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    df = pd.DataFrame(data)
-                    if 't' in df.columns:
-                        df['t'] = pd.to_datetime(df['t'], unit='s')
-                    df.rename(columns={'v': name}, inplace=True)
-                    logging.info(f"Successfully fetched data for endpoint: {endpoint}")
-                    return df
-                else:
-                    logging.error(f"Failed to fetch data: {response.status_code} - {response.text}")
-            except Exception as e:
-                logging.error(f"Attempt {attempt + 1}: Exception occurred while fetching data: {e}")
-
-        raise Exception(f"Failed to fetch data after 3 attempts for endpoint: {endpoint}")
+        name = self._metric_name(endpoint)
+
+        # Retries, backoff and rate-limit waits are handled by the transport
+        response = self.transport.get(url, params=params)
+
+        if response.status_code == 200:
+            data = response.json()
+            df = pd.DataFrame(data)
+            if 't' in df.columns:
+                df['t'] = pd.to_datetime(df['t'], unit='s')
+            df.rename(columns={'v': name}, inplace=True)
+            logging.info(f"Successfully fetched data for endpoint: {endpoint}")
+            return df
+
+        logging.error(f"Failed to fetch data: {response.status_code} - {response.text}")
+        raise Exception(f"Failed to fetch data for endpoint: {endpoint} ({response.status_code})")
+
+    def _fetch_glassnode_data(self, endpoint, start, end, frequency, asset='BTC'):
+        if self.cache is None:
+            return self._request_glassnode_data(endpoint, start, end, frequency, asset)
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        cached, coverage_start = self.cache.load(endpoint, asset, frequency)
+
+        if cached is None or cached.empty:
+            df = self._request_glassnode_data(endpoint, start, end, frequency, asset)
+            if df is not None and not df.empty:
+                self.cache.update(endpoint, asset, frequency, None, [df], start)
+            return df
+
+        # Only request what the cache does not cover: history older than the first request
+        # and the bars from the last cached one onwards (the last bar may have been provisional)
+        new_frames = []
+        if start < coverage_start:
+            new_frames.append(self._request_glassnode_data(endpoint, start, coverage_start, frequency, asset))
+            coverage_start = start
+
+        last_cached = cached['t'].max()
+        if end > last_cached:
+            new_frames.append(self._request_glassnode_data(endpoint, last_cached, end, frequency, asset))
+
+        if new_frames:
+            cached = self.cache.update(endpoint, asset, frequency, cached, new_frames, coverage_start)
+        else:
+            logging.info(f"Serving endpoint {endpoint} from cache.")
+
+        return cached[(cached['t'] >= start) & (cached['t'] <= end)].reset_index(drop=True)
     
-    def _fetch_and_merge_glassnode_data(self, endpoints, start, end, frequency):
+    def _fetch_endpoint(self, endpoint, start, end, frequency, asset='BTC'):
+        try:
+            return self._fetch_glassnode_data(endpoint, start, end, frequency, asset)
+        except Exception as e:
+            logging.error(f"Failed to fetch data for endpoint: {endpoint} ({asset}) with error: {e}")
+            raise
+
+    def _fetch_and_merge_glassnode_data(self, endpoints, start, end, frequency, asset='BTC'):
+        if self.frame_cache is None:
+            return self._merge_glassnode_data(endpoints, start, end, frequency, asset)
+
+        # Shared by every DataManager in the process, so strategies and environments built over
+        # the same range download and merge the endpoints only once
+        key = ('glassnode', tuple(endpoints), pd.Timestamp(start), pd.Timestamp(end), frequency, asset)
+        merged_df = self.frame_cache.get(key)
+        if merged_df is None:
+            merged_df = self._merge_glassnode_data(endpoints, start, end, frequency, asset)
+            # Do not keep a partial merge around when one of the endpoints returned no data
+            if merged_df is not None and all(self._metric_name(endpoint) in merged_df.columns for endpoint in endpoints):
+                self.frame_cache.put(key, merged_df)
+        return merged_df
+
+    def _memoize(self, key, compute):
+        if self.frame_cache is None:
+            return compute()
+        return self.frame_cache.get_or_compute(key, compute)
+
+    def _merge_glassnode_data(self, endpoints, start, end, frequency, asset='BTC'):
         data_frames = []
 
-        for endpoint in endpoints:
-            try:
-                df = self._fetch_glassnode_data(endpoint, start, end, frequency)
-                if df is not None and not df.empty:
-                    data_frames.append(df.set_index('t'))
-                else:
-                    logging.warning(f"No data found for endpoint: {endpoint}")
-            except Exception as e:
-                logging.error(f"Failed to fetch data for endpoint: {endpoint} with error: {e}")
+        # Endpoints are fetched concurrently, but executor.map yields results in the order of
+        # `endpoints`, so the merged column order does not depend on which request finishes first.
+        # A failed endpoint raises here rather than leaving its column out of the merge
+        workers = max(1, min(self.max_concurrency, len(endpoints)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda endpoint: self._fetch_endpoint(endpoint, start, end, frequency, asset), endpoints))
+
+        for endpoint, df in zip(endpoints, results):
+            if df is not None and not df.empty:
+                data_frames.append(df.set_index('t'))
+            else:
+                logging.warning(f"No data found for endpoint: {endpoint}")
 
         if data_frames:
             merged_df = pd.concat(data_frames, axis=1, join='outer')
@@ -103,18 +245,19 @@ class DataManager:
             logging.warning("No data frames to merge.")
             return None
     
-    def get_trigger_data(self, start, end, frequency='1h'):
-        short_term_endpoints = [
+    @staticmethod
+    def trigger_endpoints():
+        return [
             os.getenv('BTC_PRICE'),
             os.getenv('SSR'),
             os.getenv('CVD'),
             os.getenv('SUPPLY_IN_PROFIT'),
             os.getenv('BTC_HASH_RATE')
         ]
-        return self._fetch_and_merge_glassnode_data(short_term_endpoints, start, end, frequency)
 
-    def get_context_data(self, start, end, frequency='24h'):
-        contextual_endpoints = [
+    @staticmethod
+    def context_endpoints():
+        return [
             os.getenv('BTC_PRICE'),
             os.getenv('BTC_REALIZED_PRICE'),
             os.getenv('PUELL_MULTIPLE'),
@@ -123,63 +266,26 @@ class DataManager:
             os.getenv('ENTITY_ADJ_DORMANCY_FLOW'),
             os.getenv('SUPPLY_IN_PROFIT')
         ]
-        return self._fetch_and_merge_glassnode_data(contextual_endpoints, start, end, frequency)
+
+    def get_trigger_data(self, start, end, frequency='1h', asset='BTC'):
+        return self._fetch_and_merge_glassnode_data(self.trigger_endpoints(), start, end, frequency, asset)
+
+    def get_context_data(self, start, end, frequency='24h', asset='BTC'):
+        return self._fetch_and_merge_glassnode_data(self.context_endpoints(), start, end, frequency, asset)
 
     def get_bybit_data(self, symbol='BTCUSDT', interval=60, start_time=None, end_time=None):
         try:
             start_time_unix = self.datetime_to_unix(start_time) * 1000 if start_time else None
             end_time_unix = self.datetime_to_unix(end_time) * 1000 if end_time else None
-            all_data = []
-            fetched_rows = 0
-
-            while end_time_unix > start_time_unix:
-                params = {
-                    'category': 'spot',
-                    'symbol': symbol,
-                    'interval': interval,
-                    'start': start_time_unix,
-                    'end': end_time_unix,
-                    'limit': 1000
-                }
-
-                response = self.bybit_session.get_kline(**params)
-
-                if response['retCode'] == 0:
-                    data = response['result']['list']
-                    if not data:
-                        logging.info("No more data returned.")
-                        break
-
-                    df = pd.DataFrame(data, columns=['start_time', 'open', 'high', 'low', 'close', 'volume', 'turnover'])
-                    df['start_time'] = pd.to_datetime(df['start_time'], unit='ms')
-                    all_data.append(df)
-                    fetched_rows += len(df)
-
-                    logging.info(f"Fetched {len(df)} rows, total fetched: {fetched_rows}")
-
-                    if len(df) < 1000:
-                        logging.info("Fetched less than 1000 rows, ending loop.")
-                        break  # All data within the range has been retrieved
-
-                    # Update end_time_unix for the next call to avoid overlapping data
-                    earliest_timestamp = df['start_time'].iloc[-1].timestamp() * 1000
-                    end_time_unix = int(earliest_timestamp) - (interval * 60 * 1000)  # Decrement by interval in milliseconds
-                    #logging.info(f"Updated end_time_unix to {end_time_unix} for the next API call.")
-
-                    # Wait for 5 seconds before the next API call
-                    time.sleep(1)
-
-                else:
-                    logging.error(f"Failed to fetch ByBit data: {response['retMsg']}")
-                    break
-
-            if all_data:
-                # Concatenate all data frames
-                final_df = pd.concat(all_data).drop_duplicates().sort_index()
-                final_df.set_index('start_time', inplace=True)
+
+            downloader = KlineDownloader(BybitKlineSource(self.bybit_session, symbol, interval),
+                                         max_workers=self.max_concurrency)
+            data = downloader.download(start_time_unix, end_time_unix)
+
+            if data:
+                final_df = utils.klines_to_frame(data, columns=['open', 'high', 'low', 'close', 'volume', 'turnover'],
+                                                 index_name='start_time', dtype=self.float_dtype)
                 final_df.drop(columns='volume', inplace=True)
-                final_df = final_df.astype(float)  # Convert all columns to float
-                #logging.info(f"Successfully fetched {fetched_rows} rows of ByBit data.")
                 return final_df
             
             else:
@@ -193,82 +299,122 @@ class DataManager:
     def get_binance_data(self, symbol='BTCUSDT', interval='1h', start_time=None, end_time=None):
             start_time_unix = self.datetime_to_unix(start_time) * 1000 if start_time else None
             end_time_unix = self.datetime_to_unix(end_time) * 1000 if end_time else None
-            all_data = []
-            fetched_rows = 0
-
-            while start_time_unix < end_time_unix:
-                klines = self.binance_session.klines(
-                    symbol=symbol,
-                    interval=interval,
-                    startTime=start_time_unix,
-                    endTime=end_time_unix,
-                    limit=1000
-                )
-
-                if not klines:
-                    logging.info("No more data returned.")
-                    break
-
-                data = []
-                for kline in klines:
-                    data.append({
-                        'start_time': pd.to_datetime(kline[0], unit='ms'),
-                        'open': float(kline[1]),
-                        'high': float(kline[2]),
-                        'low': float(kline[3]),
-                        'close': float(kline[4]),
-                        'volume': float(kline[5])
-                    })
-
-                df = pd.DataFrame(data)
-                all_data.append(df)
-                fetched_rows += len(df)
-
-                logging.info(f"Fetched {len(df)} rows, total fetched: {fetched_rows}")
-
-                if len(df) < 1000:
-                    logging.info("Fetched less than 1000 rows, ending loop.")
-                    break  # All data within the range has been retrieved
-
-                # Update start_time_unix for the next call to avoid overlapping data
-                last_timestamp = df['start_time'].iloc[-1].timestamp() * 1000
-                start_time_unix = int(last_timestamp) + (3600 * 1000)  # Increment by 1 hour in milliseconds
-                #logging.info(f"Updated start_time_unix to {start_time_unix} for the next API call.")
-
-                # Wait for 5 seconds before the next API call
-                time.sleep(1)
-
-            if all_data:
-                # Concatenate all data frames
-                final_df = pd.concat(all_data).drop_duplicates().sort_index()
-                final_df.set_index('start_time', inplace=True)
-                #xfinal_df.drop(columns='volume', inplace=True)
-                final_df = final_df.astype(float)  # Convert all columns to float
-                #logging.info(f"Successfully fetched {fetched_rows} rows of Binance data.")
-                return final_df
+
+            downloader = KlineDownloader(BinanceKlineSource(self.binance_session, symbol, interval),
+                                         max_workers=self.max_concurrency)
+            klines = downloader.download(start_time_unix, end_time_unix)
+
+            if klines:
+                return utils.klines_to_frame(klines, columns=['open', 'high', 'low', 'close', 'volume'],
+                                             index_name='start_time', dtype=self.float_dtype)
             else:
                 logging.warning("No data was fetched from Binance.")
                 return None
 
 
-    def compute_triggers(self, start, end):
-        start = datetime.strptime(start, '%Y-%m-%d')
-        end = datetime.strptime(end, '%Y-%m-%d')
-        
-        # Retrieve trigger data and ByBit data
-        trigger_data = self.get_trigger_data((start - timedelta(hours=8640)), end)
-        binance_data = self.get_binance_data(start_time=(start - timedelta(hours=8640/2)), end_time=end)
-        binance_data.rename_axis('t', inplace=True)
-        
+    def kline_stream(self, symbol='BTCUSDT', interval=None, exchange='binance', since=None, **kwargs):
+        """
+        Live source of closed bars over WebSocket, backfilled through this manager's REST clients.
+
+        :param interval: Binance interval (default '1h') or Bybit interval in minutes (default 60); a
+                         Binance-style interval on Bybit, or the reverse, raises a ValueError.
+        :param since: Datetime of the last bar already held (e.g. `state.last_timestamp`); the bars
+                      closed after it are backfilled when the stream connects.
+        :param kwargs: Passed to KlineStream (queue, trades, reconnect_delay, ...).
+        :return: KlineStream; run it with `await stream.run()` and read bars from `stream.queue`.
+        """
+        if exchange == 'binance':
+            interval = '1h' if interval is None else interval
+            protocol = BinanceStreamProtocol(symbol, interval)
+            source = lambda: BinanceKlineSource(self.binance_session, symbol, interval)
+        elif exchange == 'bybit':
+            interval = 60 if interval is None else interval
+            protocol = BybitStreamProtocol(symbol, interval)
+            source = lambda: BybitKlineSource(self.bybit_session, symbol, interval)
+        else:
+            raise ValueError(f"Unknown exchange: {exchange}")
+
+        def backfill(start_ms, end_ms):
+            klines = KlineDownloader(source(), max_workers=self.max_concurrency).download(start_ms, end_ms)
+            return [rest_kline_to_bar(kline) for kline in klines]
+
+        # Naive timestamps are UTC, as in the frames returned by get_data
+        since_ms = self.datetime_to_unix(pd.Timestamp(since)) * 1000 if since is not None else None
+        return KlineStream(protocol, backfill=backfill, since_ms=since_ms, **kwargs)
+
+    def _get_trigger_inputs(self, glassnode_start, binance_start, end, asset='BTC', symbol='BTCUSDT'):
+        # Retrieve trigger data and Binance data
+        trigger_data = self.get_trigger_data(glassnode_start, end, asset=asset)
+        binance_data = self.get_binance_data(symbol=symbol, start_time=binance_start, end_time=end)
         
-        # Merge ByBit data with trigger data
+        # Merge Binance data with trigger data
         if binance_data is not None:
+            binance_data.rename_axis('t', inplace=True)
             trigger_data = trigger_data.merge(binance_data, left_index=True, right_index=True, how='outer')
+
+        return trigger_data
+
+    def build_trigger_state(self, start, end, srs_window=240, srs_quantile=0.5):
+        """
+        Warm up a TriggerIndicatorState over the same history compute_triggers(start, end) uses.
+        Persist it with `state.save(path)` and keep it current with `update_triggers`.
+
+        :param srs_window: Rolling window of the SRS quantile, as in compute_triggers.
+        :param srs_quantile: Quantile of the SRS baseline, as in compute_triggers.
+        """
+        start = datetime.strptime(start, '%Y-%m-%d')
+        end = datetime.strptime(end, '%Y-%m-%d')
+
+        state = TriggerIndicatorState(srs_window=srs_window, srs_quantile=srs_quantile)
+        trigger_data = self._get_trigger_inputs(start - timedelta(hours=8640), start - timedelta(hours=8640/2), end)
+        raw, repaired = self._repair_with_tail(trigger_data, None, '1h', 'triggers')
+        state.repair_tail = self._tail(raw)
+        state.update_frame(repaired)
+        return state
+
+    def update_triggers(self, state, end=None):
+        """
+        Advance `state` with the bars closed since `state.last_timestamp`, fetching only those bars.
+
+        :param state: TriggerIndicatorState from build_trigger_state (or TriggerIndicatorState.load).
+        :param end: Datetime up to which bars are fetched. Defaults to now (UTC).
+        :return: DataFrame with the new bars, in the same format as compute_triggers.
+        """
+        if state.last_timestamp is None:
+            raise ValueError("The trigger state has not consumed any bar yet; warm it up with build_trigger_state")
+        # Naive UTC, like the timestamps of the fetched frames
+        end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+        since = state.last_timestamp + timedelta(hours=1)
+        new_data = self._get_trigger_inputs(since, since, end)
+        new_data = new_data[(new_data.index > state.last_timestamp) & (new_data.index + timedelta(hours=1) <= end)]
+
+        # Same repair as compute_triggers, continued from the raw bars the previous update ended with
+        raw, new_data = self._repair_with_tail(new_data, state.repair_tail, '1h', 'triggers')
+        raw, new_data = raw[raw.index > state.last_timestamp], new_data[new_data.index > state.last_timestamp]
+
+        # Only closed bars whose on-chain inputs are already published (before any fill); the rest is picked up next time
+        complete = raw[TriggerIndicatorState.INPUT_COLUMNS].dropna()
+        if complete.empty:
+            return new_data.iloc[0:0]
+        new_data = new_data[new_data.index <= complete.index.max()]
+        state.repair_tail = self._tail(pd.concat([state.repair_tail, raw[raw.index <= complete.index.max()]]))
+
+        new_data = new_data.join(state.update_frame(new_data))
+        new_data.drop(columns=['ssr_oscillator', 'profit_relative', 'price_usd_close', 'hash_rate_mean', 'spot_cvd_sum'], inplace=True)
+        return new_data
+
+    def compute_triggers(self, start, end, srs_window=240, srs_quantile=0.5):
+        start = datetime.strptime(start, '%Y-%m-%d')
+        end = datetime.strptime(end, '%Y-%m-%d')
         
+        trigger_data = self._get_trigger_inputs(start - timedelta(hours=8640), start - timedelta(hours=8640/2), end)
+
+        # Regular hourly grid, no duplicates, bounded fill, before any indicator sees the data
+        trigger_data = self._repair(trigger_data, '1h', 'triggers')
         
         # Calculate indicators
         trigger_data['rsi_ssr_smoothed'] = ta.ema(ta.rsi(trigger_data['ssr_oscillator'], length=336), length=800)
-        trigger_data['rsi_ssr_smoothed_median'] = trigger_data['rsi_ssr_smoothed'].rolling(window=240).median()
+        trigger_data['rsi_ssr_smoothed_median'] = rolling_quantile(trigger_data['rsi_ssr_smoothed'], window=srs_window, quantile=srs_quantile)
         trigger_data['srs'] = trigger_data['rsi_ssr_smoothed'] - trigger_data['rsi_ssr_smoothed_median']
         trigger_data['hash_30'] = trigger_data['hash_rate_mean'].rolling(window=30).mean()
         trigger_data['hash_60'] = trigger_data['hash_rate_mean'].rolling(window=60).mean()
@@ -285,47 +431,82 @@ class DataManager:
         
         return trigger_data    
     
-    @staticmethod
-    def determine_context(row):
-        if row['bottom_detection'] != 0 and (row['top_detection'] == 0 or row.name < row.index[row['top_detection'] != 0].max()):
-            return int(1)
-        elif row['top_detection'] != 0 and (row['bottom_detection'] == 0 or row.name < row.index[row['bottom_detection'] != 0].max()):
-            return int(0)
+    def build_context_state(self, end):
+        """
+        Warm up a MarketConditionState over the context history compute_context(..., end) uses,
+        including the last bull/bear regime of compute_context_boolean. Persist it with
+        `state.save(path)` and keep it current with `update_context`.
+        """
+        end = datetime.strptime(end, '%Y-%m-%d')
+
+        state = MarketConditionState()
+        raw, context_data = self._repair_with_tail(self.get_context_data(pd.to_datetime('2011-08-1'), end), None,
+                                                   '24h', 'context')
+        state.repair_tail = self._tail(raw)
+        context_data = context_data.join(state.update_frame(context_data))
+        regimes = label_regimes(detect_tops(context_data), detect_bottoms(context_data)).dropna()
+        if not regimes.empty:
+            state.regime = regimes.iloc[-1]
+        return state
+
+    def update_context(self, state, end=None, boolean=False):
+        """
+        Advance `state` with the daily bars closed since `state.last_timestamp`, fetching only those bars.
+
+        :param state: MarketConditionState from build_context_state (or MarketConditionState.load).
+        :param end: Datetime up to which bars are fetched. Defaults to now (UTC).
+        :param boolean: Return the bull/bear context of compute_context_boolean instead of the continuous one.
+        :return: DataFrame with the new bars, in the same format as compute_context (or compute_context_boolean).
+        """
+        if state.last_timestamp is None:
+            raise ValueError("The context state has not consumed any bar yet; warm it up with build_context_state")
+        # Naive UTC, like the timestamps of the fetched frames
+        end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+        since = state.last_timestamp + timedelta(days=1)
+        new_data = self.get_context_data(since, end)
+        new_data = new_data[(new_data.index > state.last_timestamp) & (new_data.index + timedelta(days=1) <= end)]
+
+        # Same repair as compute_context, continued from the raw bars the previous update ended with
+        raw, new_data = self._repair_with_tail(new_data, state.repair_tail, '24h', 'context')
+        raw, new_data = raw[raw.index > state.last_timestamp], new_data[new_data.index > state.last_timestamp]
+
+        # Only closed bars whose inputs are already published (before any fill); the rest is picked up next time
+        complete = raw[['price_usd_close', 'price_realized_usd', 'profit_relative']].dropna()
+        if complete.empty:
+            return new_data.iloc[0:0]
+        new_data = new_data[new_data.index <= complete.index.max()]
+        state.repair_tail = self._tail(pd.concat([state.repair_tail, raw[raw.index <= complete.index.max()]]))
+
+        new_data = new_data.join(state.update_frame(new_data))
+        if boolean:
+            # Bars without a new top or bottom keep the regime of the previous update
+            regimes = label_regimes(detect_tops(new_data), detect_bottoms(new_data))
+            context = pd.concat([pd.Series([state.regime]), regimes], ignore_index=True).ffill().iloc[1:]
+            new_data['context'] = context.to_numpy()
+            state.regime = new_data['context'].iloc[-1]
         else:
-            return np.nan
+            new_data['context'] = continuous_context(new_data['mvrv_z_score'], new_data['mayer_multiple'],
+                                                     new_data['net_unrealized_profit_loss_account_based'],
+                                                     new_data['28d_mkt_gradient'])
+        new_data.drop(columns=['price_usd_close'], inplace=True)
+        return new_data
 
     def compute_context(self, start, end):
         start = datetime.strptime(start, '%Y-%m-%d')
         end = datetime.strptime(end, '%Y-%m-%d')
         
         # Retrieve context data
-        context_data = self.get_context_data(pd.to_datetime('2011-08-1'), end)
+        context_data = self._repair(self.get_context_data(pd.to_datetime('2011-08-1'), end), '24h', 'context')
 
         # Market condition calculations
-        gradient_numerator = (context_data['price_usd_close'].diff(28) - context_data['price_realized_usd'].diff(28))
-        gradient_mean = gradient_numerator.expanding().mean()
-        gradient_std = gradient_numerator.expanding().std()
-        context_data['28d_mkt_gradient'] = (gradient_numerator - gradient_mean) / gradient_std
-
-        context_data['mayer_multiple'] = context_data['price_usd_close'] / context_data['price_usd_close'].rolling(200).mean()
-        context_data['price_profit_corr'] = context_data['price_usd_close'].rolling(7).corr(context_data['profit_relative'])
-
-        # Simple linear scaling function
-        def linear_scale(value, low, high):
-            # Values below low map to 0, above high map to 1, in between scale linearly
-            return np.clip((value - low) / (high - low), 0, 1)
-
-        # Normalize metrics to 0-1 based on chosen thresholds:
-        # Thresholds chosen from top detection conditions and reasoning about extremes.
-        # Adjust if necessary after backtesting.
-        mvrv_norm = linear_scale(context_data['mvrv_z_score'], 0.0, 3.8)  # 0 to 3.8 range
-        mayer_norm = linear_scale(context_data['mayer_multiple'], 1.0, 1.3)  # 1.0 to 1.3 range
-        nupl_norm = linear_scale(context_data['net_unrealized_profit_loss_account_based'], 0.0, 0.6)  # 0.0 to 0.6 range
-        gradient_norm = linear_scale(context_data['28d_mkt_gradient'], 0.0, 7.0)  # 0.0 to 7.0 range
+        context_data = context_data.assign(**market_conditions(
+            context_data['price_usd_close'], context_data['price_realized_usd'], context_data['profit_relative']))
 
         # Combine into one continuous context measure:
-        # Average all four normalized values
-        context_data['context'] = (mvrv_norm + mayer_norm + nupl_norm + gradient_norm) / 4.0
+        # Average of mvrv, mayer, nupl and gradient normalized to 0-1 on the top detection thresholds
+        context_data['context'] = continuous_context(context_data['mvrv_z_score'], context_data['mayer_multiple'],
+                                                     context_data['net_unrealized_profit_loss_account_based'],
+                                                     context_data['28d_mkt_gradient'])
 
         # Drop unnecessary columns
         context_data.drop(columns=['price_usd_close'], inplace=True)
@@ -342,45 +523,256 @@ class DataManager:
         end = datetime.strptime(end, '%Y-%m-%d')
         
         # Retrieve context data
-        context_data = self.get_context_data(pd.to_datetime('2011-08-1'), end)
+        context_data = self._repair(self.get_context_data(pd.to_datetime('2011-08-1'), end), '24h', 'context')
 
         # Market condition calculations
-        context_data['28d_mkt_gradient'] = (context_data['price_usd_close'].diff(28) - context_data['price_realized_usd'].diff(28) - 
-                                            (context_data['price_usd_close'].diff(28) - context_data['price_realized_usd'].diff(28)).expanding().mean()) / \
-                                            (context_data['price_usd_close'].diff(28) - context_data['price_realized_usd'].diff(28)).expanding().std()
-        
-        context_data['mayer_multiple'] = context_data['price_usd_close'] / context_data['price_usd_close'].rolling(200).mean()
-        context_data['price_profit_corr'] = context_data['price_usd_close'].rolling(7).corr(context_data['profit_relative'])
+        context_data = context_data.assign(**market_conditions(
+            context_data['price_usd_close'], context_data['price_realized_usd'], context_data['profit_relative']))
 
         # Detect market tops and bottoms
-        context_data['top_detection'] = (np.where(context_data['mvrv_z_score'] > 3.8, 1, 0) * 
-                                         np.where(context_data['mayer_multiple'] >= 1.3, 1, 0) *
-                                         np.where(context_data['net_unrealized_profit_loss_account_based'] >= 0.6, 1, 0) *
-                                         np.where(context_data['28d_mkt_gradient'] >= 7, 1, 0)) * context_data['price_usd_close']
-        
-        context_data['bottom_detection'] = (np.where(context_data['mvrv_z_score'] <= 0, 1, 0) * 
-                                            np.where(context_data['mayer_multiple'] <= 0.8, 1, 0) *
-                                            np.where(context_data['price_usd_close'] <= context_data['price_realized_usd'], 1, 0) *
-                                            np.where(context_data['net_unrealized_profit_loss_account_based'] <= 0, 1, 0) *
-                                            np.where(context_data['puell_multiple'] <= 0.5, 1, 0) *
-                                            np.where(context_data['dormancy_flow'] <= 200000, 1, 0)) * context_data['price_usd_close']
+        context_data['top_detection'] = detect_tops(context_data)
+        context_data['bottom_detection'] = detect_bottoms(context_data)
 
         # Apply context determination
-        context_data['context'] = context_data.apply(self.determine_context, axis=1)
-        context_data['context'].fillna(method='ffill', inplace=True)
+        context_data['context'] = label_regimes(context_data['top_detection'], context_data['bottom_detection']).ffill()
         context_data.drop(columns=['top_detection', 'bottom_detection', 'price_usd_close'], inplace=True)
         context_data = context_data[context_data.index >= start]
         
         return context_data
 
-    def get_data(self, start, end, contextualize=True, boolean=False):
-        
-        trigger_data = self.compute_triggers(start=start, end=end)
+    def _repair(self, df, frequency, name):
+        """
+        Run the data-quality stage on `df`, keeping its report in `self.quality_reports[name]` (only computed
+        frames are repaired, so a memoized one leaves the report of its name as it was).
+        """
+        if df is None:
+            return df
+        df, self.quality_reports[name] = repair_frame(df, frequency=frequency, max_fill=self.max_fill, name=name)
+        return df
+
+    def _repair_with_tail(self, df, tail, frequency, name):
+        """
+        `_repair` for a stream of bars: `df` is repaired after the raw grid bars `tail` that preceded
+        it, so the bounded fill counts the missing bars across calls.
+
+        :return: Tuple (bars on the grid before the fill, repaired bars), both starting with `tail`.
+        """
+        if tail is not None:
+            df = pd.concat([tail, df])
+        raw, report = repair_frame(df, frequency=frequency, max_fill=0, name=name)
+        repaired = raw.ffill(limit=self.max_fill) if self.max_fill else raw
+        report.remaining = repaired.isna().sum()
+        report.filled = report.missing - report.remaining
+        self.quality_reports[name] = report
+        return raw, repaired
+
+    def _tail(self, raw):
+        """The raw bars a later repair needs to continue a gap: the last `max_fill` ones."""
+        return raw.iloc[len(raw) - self.max_fill:] if self.max_fill else raw.iloc[0:0]
+
+    @staticmethod
+    def _compact(df):
+        """Downcast a get_data frame for compact mode, logging the memory saved."""
+        compact_df = utils.compact_frame(df)
+        before, after = utils.frame_nbytes(df), utils.frame_nbytes(compact_df)
+        logging.info(f"Compact mode: {before / 1024 ** 2:.1f} MB -> {after / 1024 ** 2:.1f} MB "
+                     f"({1 - after / max(before, 1):.0%} saved).")
+        return compact_df
+
+    @staticmethod
+    def _asset_symbols(assets):
+        """Normalize `assets` to a dict {Glassnode asset: Binance symbol} (a list maps 'ETH' to 'ETHUSDT')."""
+        if isinstance(assets, dict):
+            return dict(assets)
+        return {asset: f"{asset}USDT" for asset in assets}
+
+    def _map_assets(self, fetch, assets):
+        """Run `fetch(asset, symbol)` for every asset concurrently, returning {asset: result}."""
+        workers = max(1, min(self.max_concurrency, len(assets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda item: fetch(*item), assets.items()))
+        return dict(zip(assets, results))
+
+    @staticmethod
+    def _span(df):
+        """First and last timestamps of an asset's frame (NaT for a missing asset)."""
+        if df is None or df.empty:
+            return pd.NaT, pd.NaT
+        return df.index[0], df.index[-1]
+
+    def _within_spans(self, long_data, frames):
+        """Keep the (t, asset) rows of `long_data` inside the span of that asset's own frame."""
+        spans = pd.DataFrame([self._span(frames.get(asset)) for asset in frames], index=list(frames),
+                             columns=['first', 'last'])
+        t = long_data.index.get_level_values('t')
+        asset_spans = spans.reindex(long_data.index.get_level_values('asset'))
+        return long_data[(t >= asset_spans['first'].to_numpy()) & (t <= asset_spans['last'].to_numpy())]
+
+    def compute_trigger_panel(self, start, end, assets, srs_window=240, srs_quantile=0.5):
+        """
+        compute_triggers for several assets: the inputs of every asset are fetched concurrently
+        (through the same caches as the single-asset path) and the indicators are computed
+        column-wise over time x asset frames.
+
+        :param assets: Dict {Glassnode asset: Binance symbol}, or a list of Glassnode assets.
+        :return: DataFrame indexed by (t, asset) with the compute_triggers columns.
+        """
+        assets = self._asset_symbols(assets)
+        start = datetime.strptime(start, '%Y-%m-%d')
+        end = datetime.strptime(end, '%Y-%m-%d')
+        glassnode_start, binance_start = start - timedelta(hours=8640), start - timedelta(hours=8640/2)
+
+        frames = self._map_assets(
+            lambda asset, symbol: self._repair(self._get_trigger_inputs(glassnode_start, binance_start, end, asset, symbol),
+                                               '1h', f"triggers:{asset}"), assets)
+        panel = to_panel(frames)
+
+        # Assets whose history starts later get their EMAs seeded on their own first rows, as in compute_triggers
+        starts = panel.index.searchsorted([self._span(frames.get(asset))[0] for asset in assets])
+        indicators = trigger_indicators(panel['ssr_oscillator'], panel['hash_rate_mean'], panel['spot_cvd_sum'],
+                                        srs_window=srs_window, srs_quantile=srs_quantile, start=starts)
+
+        # Same columns as compute_triggers: the OHLCV fields followed by the indicators
+        dropped = ['ssr_oscillator', 'profit_relative', 'price_usd_close', 'hash_rate_mean', 'spot_cvd_sum']
+        fields = {field: panel[field] for field in panel.columns.unique(level=0) if field not in dropped}
+        fields.update(indicators)
+
+        trigger_data = self._within_spans(to_long(fields), frames)
+        return trigger_data[trigger_data.index.get_level_values('t') >= start]
+
+    def compute_context_panel(self, start, end, assets, boolean=False):
+        """
+        compute_context (or compute_context_boolean) for several assets, column-wise over
+        time x asset frames.
+
+        :param assets: Dict {Glassnode asset: Binance symbol}, or a list of Glassnode assets.
+        :return: DataFrame indexed by (t, asset) with the compute_context columns.
+        """
+        assets = self._asset_symbols(assets)
+        start = datetime.strptime(start, '%Y-%m-%d')
+        end = datetime.strptime(end, '%Y-%m-%d')
+
+        frames = self._map_assets(
+            lambda asset, symbol: self._repair(self.get_context_data(pd.to_datetime('2011-08-1'), end, asset=asset),
+                                               '24h', f"context:{asset}"), assets)
+        panel = to_panel(frames)
+
+        fields = {field: panel[field] for field in panel.columns.unique(level=0)}
+        fields.update(market_conditions(panel['price_usd_close'], panel['price_realized_usd'], panel['profit_relative']))
 
         if boolean:
-            context_data = self.compute_context_boolean(start=start,end=end)
+            fields['context'] = label_regimes(detect_tops(fields), detect_bottoms(fields)).ffill()
+        else:
+            fields['context'] = continuous_context(fields['mvrv_z_score'], fields['mayer_multiple'],
+                                                   fields['net_unrealized_profit_loss_account_based'],
+                                                   fields['28d_mkt_gradient'])
+        del fields['price_usd_close']
+
+        # Filter the data to the requested range (compute_context_boolean does not cut the end)
+        context_data = self._within_spans(to_long(fields), frames)
+        t = context_data.index.get_level_values('t')
+        in_range = (t >= start) if boolean else (t >= start) & (t <= end)
+        return context_data[in_range]
+
+    def get_panel_data(self, start, end, assets, contextualize=True, boolean=False):
+        """
+        get_data for several assets in one pass.
+
+        :param assets: Dict {Glassnode asset: Binance symbol}, or a list of Glassnode assets.
+        :return: DataFrame indexed by (asset, t); `panel.loc[asset]` has the same layout as get_data.
+        """
+        assets = self._asset_symbols(assets)
+        key_assets = tuple(assets.items())
+
+        trigger_data = self._memoize(('triggers', tuple(self.trigger_endpoints()), start, end, self.compact, self.max_fill,
+                                      key_assets),
+                                     lambda: self.compute_trigger_panel(start=start, end=end, assets=assets))
+        context_kind = 'context_boolean' if boolean else 'context'
+        context_data = self._memoize((context_kind, tuple(self.context_endpoints()), start, end, self.max_fill, key_assets),
+                                     lambda: self.compute_context_panel(start=start, end=end, assets=assets, boolean=boolean))
+
+        trigger_data = trigger_data.reset_index().sort_values('t', kind='stable')
+        context_data = context_data.reset_index().sort_values('t', kind='stable')
+        context_data['t'] = context_data['t'].dt.tz_localize(None)  # Ensure no timezone differences
+
+        # Merge each asset's triggers with its own context
+        if contextualize:
+            full_data = pd.merge_asof(trigger_data, context_data[['t', 'asset', 'context']], on='t', by='asset', direction='forward')
         else:
-            context_data = self.compute_context(start=start,end=end)
+            full_data = pd.merge_asof(trigger_data, context_data, on='t', by='asset', direction='forward')
+            full_data.drop(columns='context', inplace=True)
+
+        full_data = full_data.set_index(['asset', 't']).sort_index()
+
+        # Trigger columns were repaired with a bounded fill; only the daily context is carried forward
+        context_columns = [column for column in full_data.columns if column not in trigger_data.columns]
+        full_data[context_columns] = full_data[context_columns].groupby(level='asset').ffill()
+        return self._compact(full_data) if self.compact else full_data
+
+    def build_feature_store(self, path, start, end, overwrite=False, **kwargs):
+        """
+        Write get_data(start, end, **kwargs) once to a memory-mapped FeatureStore at `path`, for
+        strategies and environments running in parallel processes to attach to (feature_store=path).
+        """
+        return FeatureStore.create(path, self.get_data(start, end, **kwargs), overwrite=overwrite)
+
+    @staticmethod
+    def invalidate_memory_cache(predicate=None):
+        """
+        Drop frames memoized in process memory (the on-disk Parquet cache is kept).
+
+        :param predicate: Callable receiving a cache key and returning True for the entries to drop.
+                          Keys are tuples whose first item is 'glassnode', 'triggers', 'context' or
+                          'context_boolean' (panel entries end with the (asset, symbol) pairs).
+                          When None, everything is dropped.
+        """
+        frame_cache.invalidate(predicate)
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            self._snapshots = SnapshotStore(self.snapshot_dir)
+        return self._snapshots
+
+    def snapshot_fields(self, start, end, contextualize=True, boolean=False, assets=None):
+        """Everything that determines the output of get_data, i.e. what its snapshot key is computed from."""
+        return {
+            'start': start, 'end': end, 'contextualize': contextualize, 'boolean': boolean,
+            'assets': None if assets is None else self._asset_symbols(assets), 'compact': self.compact,
+            'max_fill': self.max_fill,
+            'trigger_endpoints': self.trigger_endpoints(), 'context_endpoints': self.context_endpoints(),
+            'code_version': code_version(),
+        }
+
+    def get_data(self, start, end, contextualize=True, boolean=False, assets=None, snapshot=False):
+        """
+        Hourly triggers merged with the daily market context.
+
+        :param assets: None for the BTC pipeline. A list of Glassnode assets (or a dict {asset: Binance
+                       symbol}) returns a multi-asset panel indexed by (asset, t), see get_panel_data.
+        :param snapshot: Freeze the result as an immutable snapshot keyed by the parameters, the
+                         endpoints and the code version, and load it from there on later calls
+                         (only use it for ranges that are already closed).
+        """
+        if snapshot:
+            fields = self.snapshot_fields(start, end, contextualize, boolean, assets)
+            return self.snapshots.get_or_compute(
+                SnapshotStore.key(**fields),
+                lambda: self.get_data(start, end, contextualize=contextualize, boolean=boolean, assets=assets),
+                metadata=fields)
+
+        if assets is not None:
+            return self.get_panel_data(start, end, assets, contextualize=contextualize, boolean=boolean)
+
+        trigger_data = self._memoize(('triggers', tuple(self.trigger_endpoints()), start, end, self.compact, self.max_fill),
+                                     lambda: self.compute_triggers(start=start, end=end))
+
+        if boolean:
+            context_data = self._memoize(('context_boolean', tuple(self.context_endpoints()), start, end, self.max_fill),
+                                         lambda: self.compute_context_boolean(start=start,end=end))
+        else:
+            context_data = self._memoize(('context', tuple(self.context_endpoints()), start, end, self.max_fill),
+                                         lambda: self.compute_context(start=start,end=end))
 
         trigger_data.reset_index(inplace=True)
         context_data.reset_index(inplace=True)
@@ -393,9 +785,11 @@ class DataManager:
             full_data = pd.merge_asof(trigger_data, context_data, on='t', direction='forward')
             full_data.drop(columns='context', inplace=True)
         
-        full_data.ffill(inplace=True)
+        # Trigger columns were repaired with a bounded fill; only the daily context is carried forward
+        context_columns = [column for column in full_data.columns if column not in trigger_data.columns]
+        full_data[context_columns] = full_data[context_columns].ffill()
         full_data.set_index('t', inplace=True)
-   
-        return full_data
+
+        return self._compact(full_data) if self.compact else full_data
     
  
@@ -1,8 +1,6 @@
-import importlib
-from pybit.unified_trading import HTTP
 import os
 from utils import utils
-importlib.reload(utils)
+from httpFixtures import wrap_client
 from datetime import datetime
 import pandas as pd
 
@@ -15,11 +13,28 @@ class BybitWrapper():
         if self.demo:   
             self.api_key = api_key or os.getenv("BYBIT_API_KEY_TEST")
             self.api_secret = api_secret or os.getenv("BYBIT_API_SECRET_TEST")
-            self.session = HTTP(api_key=self.api_key, api_secret=self.api_secret, demo=demo, log_requests=True)
         else:
             self.api_key = api_key or os.getenv("BYBIT_API_KEY")
             self.api_secret = api_secret or os.getenv("BYBIT_API_SECRET")
-            self.session = HTTP(api_key=self.api_key, api_secret=self.api_secret, demo=demo, log_requests=True)
+
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        Live session, or a recording / replaying stand-in when ALPHA_TRADER_FIXTURES is set.
+        Created (and pybit imported) on first use.
+        """
+        if self._session is None:
+            def client():
+                from pybit.unified_trading import HTTP
+                return HTTP(api_key=self.api_key, api_secret=self.api_secret, demo=self.demo, log_requests=True)
+            self._session = wrap_client(client, 'bybit_demo' if self.demo else 'bybit')
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
         
 
     ###########################################################################
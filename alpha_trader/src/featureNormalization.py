@@ -0,0 +1,192 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Normalização das features de estado do ambiente de trading (z-score ajustado no treino, z-score móvel,
+          log-retorno), calculada uma única vez para todo o dataset e opcionalmente guardada em disco, indexada
+          pelo hash do dataset, para que os passos do ambiente não façam nenhuma aritmética.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from dataCache import SnapshotStore
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+###############################################################################
+############################### Transformações ################################
+###############################################################################
+
+def log_returns(values):
+    """log(x_t / x_t-1) per column; 0 on the first row and where the ratio is not positive."""
+    returns = np.zeros_like(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.log(values[1:] / values[:-1])
+    return returns
+
+
+def rolling_zscore(values, window=720):
+    """
+    (x - mean) / std over the trailing `window` rows (current row included, so no lookahead).
+    Rows before `window // 4` observations are available are NaN.
+    """
+    rolling = pd.DataFrame(values).rolling(window=window, min_periods=max(2, window // 4))
+    return ((pd.DataFrame(values) - rolling.mean()) / rolling.std()).to_numpy()
+
+
+def zscore(values, train_rows):
+    """
+    (x - mean) / std with the mean and std of the first `train_rows` rows (the training split) only.
+
+    :return: Tuple (normalized values, means, stds).
+    """
+    train = values[:train_rows]
+    means = np.nanmean(train, axis=0)
+    stds = np.nanstd(train, axis=0)
+    stds = np.where(np.isfinite(stds) & (stds > 0), stds, 1.)
+    return (values - means) / stds, means, stds
+
+
+def dataset_hash(df):
+    """Hash of the index, column names and values of a frame."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in df.columns]).encode())
+    digest.update(np.ascontiguousarray(pd.DatetimeIndex(df.index).asi8 if isinstance(df.index, pd.DatetimeIndex)
+                                       else np.arange(len(df))).tobytes())
+    digest.update(np.ascontiguousarray(df.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:32]
+
+
+###############################################################################
+########################### Classe FeatureNormalizer ##########################
+###############################################################################
+
+class FeatureNormalizer:
+    """
+    Normalize the state feature columns of a dataset once, ahead of the environment steps.
+
+    Each column gets one transform:
+    - 'zscore': standardized with the mean and std of the training split only (fit on train);
+    - 'rolling_zscore': standardized with the trailing `window` rows;
+    - 'log_return': log(x_t / x_t-1);
+    - None: left as is.
+
+    By default the prices get 'log_return' and the other columns `default`. NaNs (indicator warm-up,
+    rolling warm-up) become 0. With a `cache_dir`, the normalized matrix is saved there, keyed by the
+    dataset hash and the settings, and memory-mapped back on the next run. The 'zscore' means and stds
+    fitted on each column set are kept in `stats[columns][column]`.
+
+        env = TradingEnvironment(None, None, 10000., data=df, normalizer=FeatureNormalizer(train_fraction=0.7))
+    """
+
+    VERSION = 1
+    TRANSFORMS = ('zscore', 'rolling_zscore', 'log_return', None)
+
+    def __init__(self, transforms=None, default='zscore', window=720, train_fraction=0.7, train_end=None,
+                 cache_dir=None, use_cache=True):
+        """
+        :param transforms: Dict {column: transform} overriding the defaults.
+        :param default: Transform of the non-price columns not in `transforms`.
+        :param window: Rows of the 'rolling_zscore' window.
+        :param train_fraction: Leading fraction of the rows used to fit 'zscore' (ignored when `train_end` is given).
+        :param train_end: Last timestamp of the training split.
+        :param cache_dir: Directory of the normalized matrices (default: ALPHA_TRADER_NORMALIZATION_DIR; no disk
+                          cache when neither is set).
+        :param use_cache: False to never use a disk cache.
+        """
+        self.transforms = dict(transforms or {})
+        unknown = {transform for transform in [default, *self.transforms.values()] if transform not in self.TRANSFORMS}
+        if unknown:
+            raise ValueError(f"Unknown transforms {sorted(map(str, unknown))}; expected one of {self.TRANSFORMS}")
+        self.default = default
+        self.window = window
+        self.train_fraction = train_fraction
+        self.train_end = train_end
+        cache_dir = cache_dir or os.getenv('ALPHA_TRADER_NORMALIZATION_DIR')
+        self.cache_dir = cache_dir if use_cache else None
+        self.stats = {}
+
+    def column_transforms(self, columns):
+        """The transform applied to each of `columns`."""
+        return {column: self.transforms.get(column, 'log_return' if column in PRICE_COLUMNS else self.default)
+                for column in columns}
+
+    def train_rows(self, index):
+        if self.train_end is not None:
+            return int(np.searchsorted(index, pd.Timestamp(self.train_end), side='right'))
+        return max(1, int(len(index) * self.train_fraction))
+
+    def _key(self, df):
+        return SnapshotStore.key(dataset=dataset_hash(df), transforms=self.column_transforms(df.columns),
+                                 window=self.window, train_rows=self.train_rows(df.index), version=self.VERSION)
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _compute(self, df):
+        values = df.to_numpy(dtype=np.float64)
+        normalized = values.copy()
+        transforms = self.column_transforms(df.columns)
+        train_rows = self.train_rows(df.index)
+        stats = {}
+
+        # One vectorized pass per transform over all the columns that use it
+        for transform in ('zscore', 'rolling_zscore', 'log_return'):
+            columns = [i for i, column in enumerate(df.columns) if transforms[column] == transform]
+            if not columns:
+                continue
+            if transform == 'zscore':
+                normalized[:, columns], means, stds = zscore(values[:, columns], train_rows)
+                stats.update({df.columns[i]: {'mean': float(mean), 'std': float(std)}
+                              for i, mean, std in zip(columns, means, stds)})
+            elif transform == 'rolling_zscore':
+                normalized[:, columns] = rolling_zscore(values[:, columns], window=self.window)
+            else:
+                normalized[:, columns] = log_returns(values[:, columns])
+
+        normalized[~np.isfinite(normalized)] = 0.
+        return np.ascontiguousarray(normalized), stats
+
+    def transform(self, df):
+        """
+        Normalize `df` (rows x state feature columns), or load the result cached for the same data and settings.
+
+        :return: Contiguous float64 array shaped like `df` (a read-only memory map when loaded from the cache).
+        """
+        columns = tuple(map(str, df.columns))
+        if self.cache_dir is None:
+            normalized, self.stats[columns] = self._compute(df)
+            return normalized
+
+        key = self._key(df)
+        array_path, stats_path = self._paths(key)
+        if os.path.exists(array_path) and os.path.exists(stats_path):
+            try:
+                with open(stats_path) as f:
+                    self.stats[columns] = json.load(f)['stats']
+                logging.info(f"Loaded normalized features {key}.")
+                return np.load(array_path, mmap_mode='r').view(np.ndarray)
+            except Exception as e:
+                logging.warning(f"Discarding unreadable normalized features {array_path}: {e}")
+
+        normalized, self.stats[columns] = self._compute(df)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.tmp"
+        with open(array_path + tmp_suffix, 'wb') as f:
+            np.save(f, normalized)
+        with open(stats_path + tmp_suffix, 'w') as f:
+            json.dump({'columns': list(columns), 'transforms': self.column_transforms(df.columns),
+                       'window': self.window, 'train_rows': self.train_rows(df.index), 'stats': self.stats[columns]}, f)
+        os.replace(stats_path + tmp_suffix, stats_path)
+        os.replace(array_path + tmp_suffix, array_path)
+        return normalized
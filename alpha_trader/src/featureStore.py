@@ -0,0 +1,150 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Armazenamento colunar em arquivos mapeados em memória (np.memmap) do dataset de features, gravado
+          uma única vez e compartilhado em modo somente leitura por vários processos (backtests e ambientes).
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import os
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+
+###############################################################################
+############################# Classe FeatureStore #############################
+###############################################################################
+
+class FeatureStore:
+    """
+    A get_data frame written once as one .npy file per column (plus the index), then attached
+    read-only by any number of processes.
+
+    Attaching memory-maps the files: no unpickling and no copy, the pages are loaded on demand
+    and shared through the OS page cache, so 32 workers over the same store hold a single copy
+    of the data. Only the store path travels to the workers, which makes a FeatureStore cheap
+    to pickle.
+
+    Columns are read-only views over the memory maps, so they stay shared as long
+    as they are not modified in place (adding new columns is fine); string columns are stored as
+    categorical codes.
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, self.META_FILE)) as f:
+            self.meta = json.load(f)
+
+    def __len__(self):
+        return self.meta['length']
+
+    def __repr__(self):
+        return f"<FeatureStore {self.path!r}: {len(self)} rows x {len(self.columns)} columns>"
+
+    def __reduce__(self):
+        return (FeatureStore, (self.path,))
+
+    @property
+    def columns(self):
+        return [column['name'] for column in self.meta['columns']]
+
+    @staticmethod
+    def _write_array(directory, file_name, values):
+        array = np.lib.format.open_memmap(os.path.join(directory, file_name), mode='w+', dtype=values.dtype, shape=values.shape)
+        array[:] = values
+        array.flush()
+        del array
+
+    @staticmethod
+    def _column_spec(directory, position, name, series):
+        """Write one column (or index level) and return its metadata entry."""
+        file_name = f"{position:04d}.npy"
+        spec = {'name': name, 'file': file_name}
+
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            categorical = series.astype('category')
+            spec['categories'] = [str(category) for category in categorical.cat.categories]
+            values = categorical.cat.codes.to_numpy()
+        elif isinstance(series.dtype, pd.DatetimeTZDtype):
+            spec['tz'] = str(series.dt.tz)
+            values = series.dt.tz_convert(None).to_numpy()
+        else:
+            values = series.to_numpy()
+
+        FeatureStore._write_array(directory, file_name, np.ascontiguousarray(values))
+        return spec
+
+    @classmethod
+    def create(cls, path, df, overwrite=False):
+        """
+        Write `df` to `path` (a directory). The files are written to a temporary directory and moved
+        in place at the end, so readers never see a partial store.
+
+        :param overwrite: Replace an existing store. Processes still attached to the old files keep
+                          reading them until they detach (the old inodes stay alive).
+        :return: The FeatureStore.
+        """
+        if os.path.exists(path) and not overwrite:
+            raise FileExistsError(f"Feature store already exists: {path}")
+
+        tmp_path = f"{path.rstrip(os.sep)}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_path)
+        try:
+            index = df.index.to_frame(index=False)
+            index_specs = [cls._column_spec(tmp_path, i, name, index[name]) for i, name in enumerate(index.columns)]
+            column_specs = [cls._column_spec(tmp_path, len(index_specs) + i, name, df[name]) for i, name in enumerate(df.columns)]
+
+            meta = {'length': len(df), 'index': index_specs, 'index_names': list(df.index.names), 'columns': column_specs}
+            with open(os.path.join(tmp_path, cls.META_FILE), 'w') as f:
+                json.dump(meta, f, default=str)
+
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return cls(path)
+
+    def _load(self, spec):
+        # Plain ndarray view over the map (the memmap stays alive as its base)
+        values = np.load(os.path.join(self.path, spec['file']), mmap_mode='r').view(np.ndarray)
+        if 'categories' in spec:
+            return pd.Categorical.from_codes(values, categories=spec['categories'])
+        if 'tz' in spec:
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(spec['tz'])
+        return values
+
+    def attach(self, columns=None):
+        """
+        Map the store into this process.
+
+        :param columns: Subset of columns to attach (default: all).
+        :return: DataFrame backed by read-only memory maps.
+        """
+        wanted = set(self.columns if columns is None else columns)
+        missing = wanted - set(self.columns)
+        if missing:
+            raise KeyError(f"Columns not in the feature store: {sorted(missing)}")
+
+        # The index is small next to the columns: string levels are materialized back to their values
+        levels = [np.asarray(level) if isinstance(level, pd.Categorical) else level
+                  for level in map(self._load, self.meta['index'])]
+        names = self.meta['index_names']
+        if len(levels) == 1:
+            index = pd.Index(levels[0], name=names[0])
+        else:
+            index = pd.MultiIndex.from_arrays(levels, names=names)
+
+        data = {spec['name']: self._load(spec) for spec in self.meta['columns'] if spec['name'] in wanted}
+        return pd.DataFrame(data, index=index, columns=[c for c in self.columns if c in wanted], copy=False)
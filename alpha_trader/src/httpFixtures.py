@@ -0,0 +1,212 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Gravação e reprodução de respostas HTTP (Glassnode) e dos clientes das exchanges (Binance Spot e
+          pybit HTTP), para rodar o DataManager e o BybitWrapper offline, de forma determinística.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+
+
+# Request fields that must not end up in fixture files (nor in their keys)
+SECRET_FIELDS = {'api_key', 'api_secret', 'apiKey', 'secret'}
+
+
+class FixtureNotFound(KeyError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+###############################################################################
+############################# Classe FixtureStore #############################
+###############################################################################
+
+class FixtureStore:
+    """
+    Directory of gzip-compressed JSON recordings, one file per distinct request.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def _clean(value):
+        if isinstance(value, dict):
+            return {k: FixtureStore._clean(v) for k, v in value.items() if k not in SECRET_FIELDS}
+        if isinstance(value, (list, tuple)):
+            return [FixtureStore._clean(v) for v in value]
+        return value
+
+    def request_key(self, kind, target, params):
+        """
+        :return: Tuple (key, cleaned request) identifying a call independently of the credentials used.
+        """
+        request = {'kind': kind, 'target': target, 'params': self._clean(params)}
+        key = hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()[:32]
+        return key, request
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def save(self, key, request, response):
+        with gzip.open(self._path(key), 'wt', encoding='utf-8') as f:
+            json.dump({'request': request, 'response': response}, f, default=str)
+
+    def load(self, key, request):
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FixtureNotFound(f"No recording for {request} in {self.directory}")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)['response']
+
+
+###############################################################################
+######################### Transportes HTTP (Glassnode) ########################
+###############################################################################
+
+class RecordingTransport:
+    """Forward requests to a real transport and record every response."""
+
+    def __init__(self, transport, store):
+        self.transport = transport
+        self.store = store
+
+    def get(self, url, params=None, **kwargs):
+        response = self.transport.get(url, params=params, **kwargs)
+        key, request = self.store.request_key('http', url, params or {})
+        self.store.save(key, request, {'status_code': response.status_code,
+                                       'headers': dict(response.headers),
+                                       'text': response.text})
+        return response
+
+
+class ReplayTransport:
+    """Serve recorded responses, optionally after an injected latency (in seconds)."""
+
+    def __init__(self, store, latency=0.):
+        self.store = store
+        self.latency = latency
+
+    def get(self, url, params=None, **kwargs):
+        key, request = self.store.request_key('http', url, params or {})
+        recorded = self.store.load(key, request)
+        if self.latency:
+            time.sleep(self.latency)
+
+        from requests.models import Response  # Only needed on replay; requests is slow to import
+
+        response = Response()
+        response.status_code = recorded['status_code']
+        response.headers.update(recorded['headers'])
+        response._content = recorded['text'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+###############################################################################
+#################### Clientes das Exchanges (Spot / pybit) ####################
+###############################################################################
+
+class RecordingClient:
+    """
+    Proxy around an exchange client (`binance.spot.Spot`, `pybit.unified_trading.HTTP`) that records
+    the result of every method call.
+    """
+
+    def __init__(self, client, store, name):
+        self.client = client
+        self.store = store
+        self.name = name
+
+    def __getattr__(self, method):
+        attribute = getattr(self.client, method)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            key, request = self.store.request_key('client', f"{self.name}.{method}", {'args': list(args), 'kwargs': kwargs})
+            self.store.save(key, request, result)
+            return result
+
+        return call
+
+
+class ReplayClient:
+    """Stand-in for an exchange client, answering every method call from recordings."""
+
+    def __init__(self, store, name, latency=0.):
+        self.store = store
+        self.name = name
+        self.latency = latency
+
+    def __getattr__(self, method):
+        if method.startswith('__'):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            key, request = self.store.request_key('client', f"{self.name}.{method}", {'args': list(args), 'kwargs': kwargs})
+            result = self.store.load(key, request)
+            if self.latency:
+                time.sleep(self.latency)
+            return result
+
+        return call
+
+
+###############################################################################
+################################ Configuração #################################
+###############################################################################
+
+def fixture_settings():
+    """
+    Read the fixture configuration from the environment:
+
+    - ALPHA_TRADER_FIXTURES: 'record' or 'replay' (unset: live requests, nothing recorded);
+    - ALPHA_TRADER_FIXTURES_DIR: where recordings live (default: ./fixtures);
+    - ALPHA_TRADER_FIXTURES_LATENCY: seconds added to every replayed call (default: 0).
+
+    :return: Tuple (mode, store, latency); (None, None, 0.) when fixtures are disabled.
+    """
+    mode = os.getenv('ALPHA_TRADER_FIXTURES')
+    if not mode:
+        return None, None, 0.
+    if mode not in ('record', 'replay'):
+        raise ValueError(f"ALPHA_TRADER_FIXTURES must be 'record' or 'replay', got {mode!r}")
+
+    store = FixtureStore(os.getenv('ALPHA_TRADER_FIXTURES_DIR', os.path.join(os.getcwd(), 'fixtures')))
+    latency = float(os.getenv('ALPHA_TRADER_FIXTURES_LATENCY', 0.))
+    logging.info(f"Fixtures in {mode} mode ({store.directory}).")
+    return mode, store, latency
+
+
+def wrap_transport(transport_factory):
+    """Build the HTTP transport for the configured fixture mode."""
+    mode, store, latency = fixture_settings()
+    if mode == 'replay':
+        return ReplayTransport(store, latency=latency)
+    if mode == 'record':
+        return RecordingTransport(transport_factory(), store)
+    return transport_factory()
+
+
+def wrap_client(client_factory, name):
+    """Build an exchange client for the configured fixture mode (the real client is not created on replay)."""
+    mode, store, latency = fixture_settings()
+    if mode == 'replay':
+        return ReplayClient(store, name, latency=latency)
+    if mode == 'record':
+        return RecordingClient(client_factory(), store, name)
+    return client_factory()
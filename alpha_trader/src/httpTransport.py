@@ -0,0 +1,166 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Camada HTTP compartilhada (sessão com pool de conexões, timeouts, backoff exponencial com jitter
+          e respeito aos cabeçalhos de limite de requisições) usada pelo DataManager.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RateLimitError(requests.RequestException):
+    """The server asked for a longer wait than HttpTransport.max_server_wait."""
+
+    def __init__(self, message, wait, response=None):
+        super().__init__(message, response=response)
+        self.wait = wait
+
+
+###############################################################################
+############################ Classe HttpTransport #############################
+###############################################################################
+
+class HttpTransport:
+    """
+    Pooled `requests.Session` with keep-alive, timeouts and retries.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with full-jitter exponential
+    backoff; when the server says how long to wait (Retry-After, or an exhausted
+    X-RateLimit-Remaining with X-RateLimit-Reset) that wait is used instead, in full. A successful
+    response that exhausts the quota (X-RateLimit-Remaining: 0) holds back the next requests to the
+    same host until X-RateLimit-Reset, instead of letting them fail with 429.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_base=0.5, backoff_max=30., timeout=(5., 30.),
+                 max_server_wait=900.):
+        """
+        :param pool_size: Keep-alive connections kept per host.
+        :param max_retries: Retries after the first attempt.
+        :param backoff_base: Upper bound, in seconds, of the first backoff; doubles on each retry.
+        :param backoff_max: Cap, in seconds, for any single backoff (not for the waits asked by the server).
+        :param timeout: (connect, read) timeouts in seconds.
+        :param max_server_wait: Longest wait asked by the server that is honoured; above it RateLimitError is raised.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.max_server_wait = max_server_wait
+        self.resume_at = {}
+        self.resume_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _rate_limit_wait(response):
+        """Seconds until the quota resets when the response says it is exhausted, or None."""
+        reset = response.headers.get('X-RateLimit-Reset')
+        if reset and response.headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                reset = float(reset)
+            except ValueError:
+                return None
+            # Either an epoch timestamp or a number of seconds, depending on the API
+            wait = reset - time.time() if reset > 1e9 else reset
+            return max(0., wait)
+        return None
+
+    def _server_wait(self, response):
+        """Seconds the server asked us to wait, or None."""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(0., float(retry_after))
+            except ValueError:
+                try:
+                    return max(0., parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    return None
+        return self._rate_limit_wait(response)
+
+    def _check_server_wait(self, wait, url, response=None):
+        if wait > self.max_server_wait:
+            raise RateLimitError(f"{url}: the server asked to wait {wait:.0f}s, more than max_server_wait="
+                                 f"{self.max_server_wait:.0f}s", wait, response=response)
+
+    def _throttle(self, url):
+        """Wait until the quota of the host of `url` has reset, when a previous response exhausted it."""
+        host = urlsplit(url).netloc
+        with self.resume_lock:
+            resume_at = self.resume_at.get(host)
+        if resume_at is None:
+            return
+        wait = resume_at - time.monotonic()
+        if wait > 0:
+            self._check_server_wait(wait, url)
+            logging.info(f"Rate limit of {host} exhausted, waiting {wait:.2f}s")
+            time.sleep(wait)
+        with self.resume_lock:
+            if self.resume_at.get(host) == resume_at:
+                del self.resume_at[host]
+
+    def _hold_back(self, url, response):
+        """Remember when the quota resets if `response` (a successful one) exhausted it."""
+        wait = self._rate_limit_wait(response)
+        if wait:
+            host = urlsplit(url).netloc
+            with self.resume_lock:
+                self.resume_at[host] = max(self.resume_at.get(host, 0.), time.monotonic() + wait)
+
+    def get(self, url, params=None, **kwargs):
+        """
+        GET with retries.
+
+        :return: The last `requests.Response` (successful, a non-retryable error, or the last retryable one).
+        :raises requests.RequestException: When every attempt failed at the connection level.
+        :raises RateLimitError: When the server asks for a wait longer than `max_server_wait`.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            self._throttle(url)
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self._backoff(attempt)
+                logging.warning(f"Attempt {attempt + 1}: {type(e).__name__} for {url}, retrying in {wait:.2f}s")
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    self._hold_back(url, response)
+                    return response
+                if attempt == self.max_retries:
+                    return response
+                wait = self._server_wait(response)
+                if wait is None:
+                    wait = self._backoff(attempt)
+                else:
+                    self._check_server_wait(wait, url, response)
+                logging.warning(f"Attempt {attempt + 1}: HTTP {response.status_code} for {url}, retrying in {wait:.2f}s")
+
+            time.sleep(wait)
+
+    def close(self):
+        self.session.close()
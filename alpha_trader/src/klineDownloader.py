@@ -0,0 +1,241 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Download paralelo de klines (Binance e Bybit) em fatias de tempo, respeitando os limites de requisição de cada exchange.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+###############################################################################
+########################### Limites por Exchange ##############################
+###############################################################################
+
+# Requests per second and burst size for the kline endpoints, kept below the published limits:
+# - Binance spot: 6000 request weight per minute per IP, /api/v3/klines costs 2 -> 50 req/s.
+# - Bybit v5 market data: 600 requests per 5 seconds per IP -> 120 req/s.
+EXCHANGE_RATE_LIMITS = {
+    'binance': {'rate': 40., 'capacity': 40},
+    'bybit': {'rate': 100., 'capacity': 100},
+}
+
+BARS_PER_REQUEST = 1000
+
+_INTERVAL_UNITS_MS = {'s': 1000, 'm': 60 * 1000, 'h': 3600 * 1000, 'd': 86400 * 1000, 'w': 7 * 86400 * 1000}
+
+
+def interval_to_ms(interval):
+    """
+    Convert a Binance ('1m', '1h', '1d', ...) or Bybit (1, 60, 'D', 'W') interval to milliseconds.
+
+    Monthly intervals (Binance '1M', Bybit 'M') have no fixed length, so the fixed-width time shards
+    cannot cover them and they are rejected with a ValueError.
+    """
+    if isinstance(interval, int) or str(interval).isdigit():
+        return int(interval) * 60 * 1000
+    interval = str(interval)
+    if interval.endswith('M'):
+        raise ValueError(f"Monthly kline interval {interval!r} is not supported: months have no fixed length")
+    if interval in ('D', 'W'):
+        return _INTERVAL_UNITS_MS[interval.lower()]
+    unit_ms = _INTERVAL_UNITS_MS.get(interval[-1:])
+    if unit_ms is None or not interval[:-1].isdigit():
+        raise ValueError(f"Unknown kline interval {interval!r}")
+    return int(interval[:-1]) * unit_ms
+
+
+def plan_shards(start_ms, end_ms, interval_ms, bars_per_request=BARS_PER_REQUEST):
+    """
+    Split the inclusive range [start_ms, end_ms] into windows of at most `bars_per_request` bars.
+
+    :return: List of (shard_start_ms, shard_end_ms) tuples, both inclusive.
+    """
+    shard_span = interval_ms * bars_per_request
+    shards = []
+    shard_start = start_ms
+    while shard_start <= end_ms:
+        shard_end = min(shard_start + shard_span - 1, end_ms)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end + 1
+    return shards
+
+
+###############################################################################
+############################ Classe TokenBucket ###############################
+###############################################################################
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens are added per second, up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available and take them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(exchange):
+    """
+    Return the process-wide token bucket for an exchange, so concurrent downloads share the same budget.
+    """
+    with _rate_limiters_lock:
+        if exchange not in _rate_limiters:
+            _rate_limiters[exchange] = TokenBucket(**EXCHANGE_RATE_LIMITS[exchange])
+        return _rate_limiters[exchange]
+
+
+###############################################################################
+############################# Fontes de Klines ################################
+###############################################################################
+
+class BinanceKlineSource:
+    """Fetch one window of klines from a `binance.spot.Spot` client."""
+
+    exchange = 'binance'
+
+    def __init__(self, client, symbol, interval):
+        self.client = client
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+
+    def fetch(self, start_ms, end_ms):
+        return self.client.klines(symbol=self.symbol, interval=self.interval,
+                                  startTime=start_ms, endTime=end_ms, limit=BARS_PER_REQUEST)
+
+
+class BybitKlineSource:
+    """Fetch one window of klines from a `pybit.unified_trading.HTTP` session."""
+
+    exchange = 'bybit'
+
+    def __init__(self, session, symbol, interval, category='spot'):
+        self.session = session
+        self.symbol = symbol
+        self.interval = interval
+        self.category = category
+        self.interval_ms = interval_to_ms(interval)
+
+    def fetch(self, start_ms, end_ms):
+        response = self.session.get_kline(category=self.category, symbol=self.symbol, interval=self.interval,
+                                          start=start_ms, end=end_ms, limit=BARS_PER_REQUEST)
+        if response['retCode'] != 0:
+            raise RuntimeError(f"Failed to fetch ByBit data: {response['retMsg']}")
+        return response['result']['list']
+
+
+###############################################################################
+########################## Classe KlineDownloader #############################
+###############################################################################
+
+class KlineDownloader:
+    """
+    Download a kline range by splitting it into shards up front and fetching them in parallel
+    under the exchange's rate limiter. The result is de-duplicated and sorted by open time.
+    """
+
+    def __init__(self, source, max_workers=8, rate_limiter=None, retries=3):
+        self.source = source
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or get_rate_limiter(source.exchange)
+        self.retries = retries
+
+    def _fetch_shard(self, shard):
+        for attempt in range(self.retries):
+            self.rate_limiter.acquire()
+            try:
+                return self.source.fetch(*shard)
+            except Exception as e:
+                logging.error(f"Attempt {attempt + 1}: Exception occurred while fetching klines {shard}: {e}")
+        raise Exception(f"Failed to fetch klines after {self.retries} attempts for window: {shard}")
+
+    def download(self, start_ms, end_ms):
+        """
+        :param start_ms: Range start, Unix time in milliseconds (inclusive).
+        :param end_ms: Range end, Unix time in milliseconds (inclusive).
+        :return: List of raw klines (as returned by the exchange), sorted by open time.
+        """
+        shards = plan_shards(start_ms, end_ms, self.source.interval_ms)
+        if not shards:
+            return []
+
+        workers = max(1, min(self.max_workers, len(shards)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(self._fetch_shard, shards))
+
+        klines = {}
+        for page in pages:
+            for kline in page:
+                klines[int(kline[0])] = kline
+
+        logging.info(f"Fetched {len(klines)} klines in {len(shards)} shards from {self.source.exchange}.")
+        return [klines[t] for t in sorted(klines)]
+
+
+###############################################################################
+######################### Respostas Gravadas (offline) ########################
+###############################################################################
+
+class RecordedKlines:
+    """
+    Offline stand-in for the exchange clients, serving a recorded list of klines with the
+    same windowing semantics as the real endpoints. Usable both as a `Spot` client
+    (`klines`) and as a pybit `HTTP` session (`get_kline`).
+    """
+
+    def __init__(self, klines, latency=0.):
+        self.klines_data = sorted(klines, key=lambda kline: int(kline[0]))
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, latency=0.):
+        with open(path) as f:
+            return cls(json.load(f), latency=latency)
+
+    def _window(self, start, end, limit):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [kline for kline in self.klines_data if start <= int(kline[0]) <= end]
+
+    def klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        # Binance returns the oldest `limit` bars of the window, ascending
+        return self._window(startTime, endTime, limit)[:limit]
+
+    def get_kline(self, category=None, symbol=None, interval=None, start=None, end=None, limit=200):
+        # Bybit returns the newest `limit` bars of the window, descending
+        window = self._window(start, end, limit)[::-1][:limit]
+        return {'retCode': 0, 'retMsg': 'OK', 'result': {'symbol': symbol, 'category': category, 'list': window}}
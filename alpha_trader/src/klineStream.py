@@ -0,0 +1,267 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Fonte de dados de mercado em tempo real: assinatura dos canais de kline e de trades via WebSocket
+          (Binance e Bybit), emissão das barras fechadas numa fila asyncio e preenchimento das lacunas via
+          REST ao reconectar. Inclui um servidor WebSocket local (mock) para testes e execução offline.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import asyncio
+import json
+import logging
+import time
+from klineDownloader import interval_to_ms
+from utils import utils
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def rest_kline_to_bar(kline):
+    """
+    Bar dict from a REST kline row (Binance and Bybit rows both start with open time, open, high,
+    low, close and volume).
+    """
+    return {'t': int(kline[0]), **{field: float(value) for field, value in zip(BAR_FIELDS, kline[1:6])}}
+
+
+def bars_to_frame(bars, index_name='start_time'):
+    """DataFrame of bars in the get_binance_data / get_bybit_data layout."""
+    return utils.klines_to_frame([[bar['t']] + [bar[field] for field in BAR_FIELDS] for bar in bars],
+                                 columns=BAR_FIELDS, index_name=index_name)
+
+
+###############################################################################
+########################### Protocolos das Exchanges ##########################
+###############################################################################
+
+class BinanceStreamProtocol:
+    """Binance spot streams `<symbol>@kline_<interval>` and `<symbol>@trade`."""
+
+    exchange = 'binance'
+    URL = 'wss://stream.binance.com:9443/ws'
+
+    def __init__(self, symbol, interval='1h', url=None):
+        if isinstance(interval, int) or str(interval).isdigit():
+            raise ValueError(f"Binance kline intervals are strings such as '1h', got {interval!r}")
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.url = url or self.URL
+
+    def subscribe_message(self):
+        stream = self.symbol.lower()
+        return {'method': 'SUBSCRIBE', 'params': [f"{stream}@kline_{self.interval}", f"{stream}@trade"], 'id': 1}
+
+    def parse(self, message):
+        """
+        :return: List of events: ('bar', bar, closed) or ('trade', trade).
+        """
+        event = message.get('e')
+        if event == 'kline':
+            kline = message['k']
+            bar = {'t': int(kline['t']), 'open': float(kline['o']), 'high': float(kline['h']),
+                   'low': float(kline['l']), 'close': float(kline['c']), 'volume': float(kline['v'])}
+            return [('bar', bar, bool(kline['x']))]
+        if event == 'trade':
+            return [('trade', {'t': int(message['T']), 'price': float(message['p']), 'quantity': float(message['q'])})]
+        return []
+
+
+class BybitStreamProtocol:
+    """Bybit v5 public topics `kline.<interval>.<symbol>` and `publicTrade.<symbol>`."""
+
+    exchange = 'bybit'
+    URL = 'wss://stream.bybit.com/v5/public/spot'
+
+    def __init__(self, symbol, interval=60, url=None):
+        if not (isinstance(interval, int) or str(interval).isdigit() or interval in ('D', 'W')):
+            raise ValueError(f"Bybit kline intervals are minutes (60) or 'D'/'W', got {interval!r}")
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.url = url or self.URL
+
+    def subscribe_message(self):
+        return {'op': 'subscribe', 'args': [f"kline.{self.interval}.{self.symbol}", f"publicTrade.{self.symbol}"]}
+
+    def parse(self, message):
+        topic = message.get('topic', '')
+        if topic.startswith('kline.'):
+            return [('bar', {'t': int(item['start']), 'open': float(item['open']), 'high': float(item['high']),
+                             'low': float(item['low']), 'close': float(item['close']), 'volume': float(item['volume'])},
+                     bool(item['confirm'])) for item in message['data']]
+        if topic.startswith('publicTrade.'):
+            return [('trade', {'t': int(item['T']), 'price': float(item['p']), 'quantity': float(item['v'])})
+                    for item in message['data']]
+        return []
+
+
+###############################################################################
+############################## Classe KlineStream #############################
+###############################################################################
+
+class KlineStream:
+    """
+    Subscribe to the kline and trade channels of an exchange and put every closed bar in `queue`
+    as soon as the exchange reports it closed, in time order and exactly once.
+
+    On every (re)connection, and whenever the live stream skips a bar, the missing closed bars are
+    fetched through `backfill` (REST) before live bars are emitted, so a consumer never sees a gap.
+    Trades are put in `trades` when a queue is given.
+
+        stream = data_manager.kline_stream('BTCUSDT', since=state.last_timestamp)
+        asyncio.create_task(stream.run())
+        bar = await stream.queue.get()   # {'t': open time in ms, 'open', 'high', 'low', 'close', 'volume'}
+    """
+
+    def __init__(self, protocol, backfill=None, since_ms=None, queue=None, trades=None,
+                 reconnect_delay=1., max_reconnect_delay=30., clock=time.time):
+        """
+        :param protocol: BinanceStreamProtocol or BybitStreamProtocol.
+        :param backfill: Callable (start_ms, end_ms) -> list of bars, run in a worker thread.
+        :param since_ms: Open time of the last bar the consumer already has; bars after it are backfilled
+                         on the first connection.
+        :param queue: asyncio.Queue receiving closed bars (created when None).
+        :param trades: Optional asyncio.Queue receiving trades.
+        :param clock: Returns the current Unix time in seconds.
+        """
+        self.protocol = protocol
+        self.backfill = backfill
+        self.last_emitted = since_ms
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self.trades = trades
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.clock = clock
+        self.connections = 0
+        self.stopped = False
+        self.websocket = None
+
+    async def _emit(self, bar):
+        if self.last_emitted is not None:
+            if bar['t'] <= self.last_emitted:
+                return
+            if bar['t'] > self.last_emitted + self.protocol.interval_ms:
+                await self._backfill(until_ms=bar['t'] - 1)
+        self.last_emitted = bar['t']
+        await self.queue.put(bar)
+
+    async def _backfill(self, until_ms=None):
+        """Emit the closed bars after `last_emitted` (up to `until_ms`) fetched from REST."""
+        if self.backfill is None or self.last_emitted is None:
+            return
+        now_ms = int(self.clock() * 1000)
+        start_ms = self.last_emitted + self.protocol.interval_ms
+        end_ms = min(until_ms, now_ms) if until_ms is not None else now_ms
+        if start_ms > end_ms:
+            return
+
+        try:
+            bars = await asyncio.get_running_loop().run_in_executor(None, self.backfill, start_ms, end_ms)
+        except Exception as e:
+            logging.error(f"Backfill of {self.protocol.symbol} from {start_ms} to {end_ms} failed: {e}")
+            return
+
+        closed = [bar for bar in bars if start_ms <= bar['t'] and bar['t'] + self.protocol.interval_ms <= now_ms]
+        for bar in sorted(closed, key=lambda bar: bar['t']):
+            if bar['t'] > self.last_emitted:
+                self.last_emitted = bar['t']
+                await self.queue.put(bar)
+        logging.info(f"Backfilled {len(closed)} {self.protocol.symbol} bars from {self.protocol.exchange} REST.")
+
+    async def _consume(self, websocket):
+        async for raw in websocket:
+            for event in self.protocol.parse(json.loads(raw)):
+                if event[0] == 'bar':
+                    if event[2]:
+                        await self._emit(event[1])
+                elif self.trades is not None:
+                    await self.trades.put(event[1])
+
+    async def run(self):
+        """Stream until `stop()` is called (or the task is cancelled), reconnecting with exponential backoff."""
+        import websockets  # Only live runs need it
+
+        delay = self.reconnect_delay
+        while not self.stopped:
+            try:
+                async with websockets.connect(self.protocol.url) as websocket:
+                    self.websocket = websocket
+                    self.connections += 1
+                    await websocket.send(json.dumps(self.protocol.subscribe_message()))
+                    # Bars closed while we were away; live messages are buffered meanwhile
+                    await self._backfill()
+                    delay = self.reconnect_delay
+                    await self._consume(websocket)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                logging.warning(f"{self.protocol.exchange} stream disconnected: {type(e).__name__}: {e}")
+            finally:
+                self.websocket = None
+
+            if self.stopped:
+                break
+            logging.info(f"Reconnecting to the {self.protocol.exchange} stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def stop(self):
+        """Stop streaming: `run()` returns once the current connection is closed."""
+        self.stopped = True
+        if self.websocket is not None:
+            asyncio.ensure_future(self.websocket.close())
+
+
+###############################################################################
+########################## Servidor Local (mock) ##############################
+###############################################################################
+
+class MockKlineServer:
+    """
+    Local WebSocket server replaying scripted exchange messages, for tests and offline runs.
+
+    Connection i receives `sessions[i]` (a list of messages, sent after the subscription request);
+    every session but the last then drops the connection, to exercise reconnects.
+
+        async with MockKlineServer([[msg1, msg2], [msg3]]) as server:
+            stream = KlineStream(BinanceStreamProtocol('BTCUSDT', url=server.url), ...)
+    """
+
+    def __init__(self, sessions, message_delay=0.):
+        self.sessions = sessions
+        self.message_delay = message_delay
+        self.subscriptions = []
+        self.server = None
+        self.url = None
+
+    async def _handler(self, websocket):
+        self.subscriptions.append(json.loads(await websocket.recv()))
+        connection = len(self.subscriptions) - 1
+        messages = self.sessions[connection] if connection < len(self.sessions) else []
+
+        for message in messages:
+            if self.message_delay:
+                await asyncio.sleep(self.message_delay)
+            await websocket.send(json.dumps(message))
+
+        if connection < len(self.sessions) - 1:
+            await websocket.close()
+        else:
+            await websocket.wait_closed()
+
+    async def __aenter__(self):
+        import websockets
+
+        self.server = await websockets.serve(self._handler, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
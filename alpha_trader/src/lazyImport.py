@@ -0,0 +1,47 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Importação preguiçosa de bibliotecas pesadas (pandas_ta, plotly, matplotlib), carregadas apenas no
+          primeiro uso, para reduzir o tempo de inicialização dos scripts de curta duração.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import importlib
+import threading
+
+
+###############################################################################
+############################## Classe LazyModule ##############################
+###############################################################################
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+        ta = LazyModule('pandas_ta')   # nothing imported yet
+        ta.rsi(close, length=14)       # pandas_ta is imported here, once
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
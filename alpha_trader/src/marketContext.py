@@ -0,0 +1,262 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Cálculo do contexto de mercado: métricas de condição de mercado em uma única passada (com estado
+          retomável) e rotulagem vetorizada de regimes (bull ou bear) a partir dos eventos de topo e fundo.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import math
+import pickle
+from collections import deque
+import numpy as np
+import pandas as pd
+from streamingIndicators import StreamingRollingMean
+
+NaN = float('nan')
+
+
+###############################################################################
+########################## Rotulagem de Regimes ###############################
+###############################################################################
+
+def label_regimes(top_detection, bottom_detection):
+    """
+    Label each bar as bull (1) or bear (0) from top/bottom detection events, in O(n).
+
+    A bottom event starts a bull regime and a top event starts a bear regime; the regime of a bar
+    is given by whichever event happened last. Bars before the first event are NaN, and a bar where
+    both events fire at once is treated as no decision (NaN until the next event), so a forward
+    fill keeps the previous regime.
+
+    :param top_detection: Series, non-zero where a market top was detected (NaN counts as no event).
+                          A DataFrame (one column per asset) labels every column at once.
+    :param bottom_detection: Series aligned with `top_detection`, non-zero where a bottom was detected.
+    :return: Float Series with values 1, 0 or NaN, indexed like `top_detection` (a DataFrame
+             shaped like `top_detection` for DataFrame input).
+    """
+    top = np.nan_to_num(np.asarray(top_detection, dtype=float)) != 0
+    bottom = np.nan_to_num(np.asarray(bottom_detection, dtype=float)) != 0
+    positions = np.arange(len(top)).reshape((-1,) + (1,) * (top.ndim - 1))
+
+    # Position of the most recent event of each kind up to every bar (-1 = none yet)
+    last_top = np.maximum.accumulate(np.where(top, positions, -1), axis=0)
+    last_bottom = np.maximum.accumulate(np.where(bottom, positions, -1), axis=0)
+
+    context = np.where(last_bottom > last_top, 1., np.where(last_top > last_bottom, 0., np.nan))
+    if isinstance(top_detection, pd.DataFrame):
+        return pd.DataFrame(context, index=top_detection.index, columns=top_detection.columns)
+    return pd.Series(context, index=getattr(top_detection, 'index', None), name='context')
+
+
+###############################################################################
+######################### Regras de Contexto ##################################
+###############################################################################
+
+def linear_scale(value, low, high):
+    """Values below low map to 0, above high map to 1, in between scale linearly."""
+    return np.clip((value - low) / (high - low), 0, 1)
+
+
+def continuous_context(mvrv_z_score, mayer_multiple, nupl, gradient):
+    """
+    Continuous context measure in [0, 1] used by `compute_context`: the average of the four
+    metrics normalized on the thresholds of the top detection conditions.
+
+    Works element-wise, on Series or on time x asset DataFrames.
+    """
+    # Thresholds chosen from top detection conditions and reasoning about extremes.
+    # Adjust if necessary after backtesting.
+    mvrv_norm = linear_scale(mvrv_z_score, 0.0, 3.8)  # 0 to 3.8 range
+    mayer_norm = linear_scale(mayer_multiple, 1.0, 1.3)  # 1.0 to 1.3 range
+    nupl_norm = linear_scale(nupl, 0.0, 0.6)  # 0.0 to 0.6 range
+    gradient_norm = linear_scale(gradient, 0.0, 7.0)  # 0.0 to 7.0 range
+    return (mvrv_norm + mayer_norm + nupl_norm + gradient_norm) / 4.0
+
+
+def detect_tops(context_data):
+    """
+    Market top events used by `compute_context_boolean`: the close price where every top condition
+    holds, 0 elsewhere.
+
+    :param context_data: Mapping of metric name to Series (a DataFrame of context metrics) or to
+                         time x asset DataFrames (a panel).
+    """
+    return (np.where(context_data['mvrv_z_score'] > 3.8, 1, 0) *
+            np.where(context_data['mayer_multiple'] >= 1.3, 1, 0) *
+            np.where(context_data['net_unrealized_profit_loss_account_based'] >= 0.6, 1, 0) *
+            np.where(context_data['28d_mkt_gradient'] >= 7, 1, 0)) * context_data['price_usd_close']
+
+
+def detect_bottoms(context_data):
+    """Market bottom events used by `compute_context_boolean`, in the same format as `detect_tops`."""
+    return (np.where(context_data['mvrv_z_score'] <= 0, 1, 0) *
+            np.where(context_data['mayer_multiple'] <= 0.8, 1, 0) *
+            np.where(context_data['price_usd_close'] <= context_data['price_realized_usd'], 1, 0) *
+            np.where(context_data['net_unrealized_profit_loss_account_based'] <= 0, 1, 0) *
+            np.where(context_data['puell_multiple'] <= 0.5, 1, 0) *
+            np.where(context_data['dormancy_flow'] <= 200000, 1, 0)) * context_data['price_usd_close']
+
+
+def market_conditions(price, realized_price, profit_relative, gradient_lag=28, mayer_window=200, corr_window=7):
+    """
+    Batch version of MarketConditionState over Series or time x asset DataFrames, computed column-wise
+    with pandas' compiled window kernels (same definitions, up to floating-point rounding). Used by
+    `compute_context` and `compute_context_boolean`; the state is only for incremental updates.
+
+    :return: Dict with the OUTPUT_COLUMNS of MarketConditionState, each shaped like `price`.
+    """
+    gradient_numerator = price.diff(gradient_lag) - realized_price.diff(gradient_lag)
+    expanding = gradient_numerator.expanding()
+    return {
+        '28d_mkt_gradient': (gradient_numerator - expanding.mean()) / expanding.std(),
+        'mayer_multiple': price / price.rolling(mayer_window).mean(),
+        'price_profit_corr': price.rolling(corr_window).corr(profit_relative),
+    }
+
+
+###############################################################################
+###################### Classe MarketConditionState ############################
+###############################################################################
+
+class MarketConditionState:
+    """
+    Incremental version of `market_conditions`, one daily bar at a time:
+
+    - '28d_mkt_gradient': expanding z-score of the 28-day price gradient minus the 28-day realized
+      price gradient, with Welford accumulators for the expanding mean and standard deviation;
+    - 'mayer_multiple': price over its 200-day moving average;
+    - 'price_profit_corr': 7-day rolling correlation between price and supply in profit, from
+      running sums over the window.
+
+    The accumulators are kept between calls, so a state saved after the last bar extends the
+    expanding statistics with new bars without replaying the full history (see
+    `DataManager.build_context_state` and `DataManager.update_context`). `regime` holds the last
+    bull (1) / bear (0) label of `compute_context_boolean`, carried over to the next update, and
+    `repair_tail` the last input bars on the daily grid before the bounded fill (see
+    `TriggerIndicatorState`).
+    """
+
+    OUTPUT_COLUMNS = ['28d_mkt_gradient', 'mayer_multiple', 'price_profit_corr']
+
+    def __init__(self, gradient_lag=28, mayer_window=200, corr_window=7):
+        self.prices = deque(maxlen=gradient_lag + 1)
+        self.realized_prices = deque(maxlen=gradient_lag + 1)
+        self.gradient_count = 0
+        self.gradient_mean = 0.
+        self.gradient_m2 = 0.
+        self.price_mean = StreamingRollingMean(mayer_window)
+        self.corr_pairs = deque(maxlen=corr_window)
+        self.corr_nans = 0
+        self.corr_updates = 0
+        self.corr_shift = (0., 0.)
+        self.corr_sums = [0.] * 5
+        self.regime = NaN
+        self.repair_tail = None
+        self.last_timestamp = None
+
+    def _gradient_zscore(self):
+        if len(self.prices) < self.prices.maxlen:
+            return NaN
+        numerator = (self.prices[-1] - self.prices[0]) - (self.realized_prices[-1] - self.realized_prices[0])
+        if numerator != numerator:
+            return NaN
+
+        # Welford update of the expanding mean / variance, current bar included
+        self.gradient_count += 1
+        delta = numerator - self.gradient_mean
+        self.gradient_mean += delta / self.gradient_count
+        self.gradient_m2 += delta * (numerator - self.gradient_mean)
+
+        if self.gradient_count < 2 or self.gradient_m2 <= 0:
+            return NaN
+        return (numerator - self.gradient_mean) / math.sqrt(self.gradient_m2 / (self.gradient_count - 1))
+
+    def _corr_accumulate(self, pair, sign):
+        """Add (sign=1) or remove (sign=-1) a pair from the running sums of x, y, x², y² and xy."""
+        x, y = pair[0] - self.corr_shift[0], pair[1] - self.corr_shift[1]
+        sums = self.corr_sums
+        sums[0] += sign * x
+        sums[1] += sign * y
+        sums[2] += sign * x * x
+        sums[3] += sign * y * y
+        sums[4] += sign * x * y
+
+    def _price_profit_corr(self, price, profit_relative):
+        pair = (price, profit_relative)
+        if len(self.corr_pairs) == self.corr_pairs.maxlen:
+            evicted = self.corr_pairs[0]
+            if evicted[0] != evicted[0] or evicted[1] != evicted[1]:
+                self.corr_nans -= 1
+            else:
+                self._corr_accumulate(evicted, -1)
+        self.corr_pairs.append(pair)
+        if price != price or profit_relative != profit_relative:
+            self.corr_nans += 1
+        else:
+            self._corr_accumulate(pair, 1)
+
+        # Once per window, rebuild the sums around the current values, so the rounding of the
+        # additions and removals does not accumulate and the squares stay small
+        self.corr_updates += 1
+        if self.corr_updates % self.corr_pairs.maxlen == 0 and not self.corr_nans:
+            self.corr_shift = (pair[0], pair[1])
+            self.corr_sums = [0.] * 5
+            for window_pair in self.corr_pairs:
+                self._corr_accumulate(window_pair, 1)
+
+        n = len(self.corr_pairs)
+        if n < self.corr_pairs.maxlen or self.corr_nans:
+            return NaN
+        sum_x, sum_y, sum_xx, sum_yy, sum_xy = self.corr_sums
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x * sum_x / n
+        var_y = sum_yy - sum_y * sum_y / n
+        if var_x <= 0 or var_y <= 0:
+            return NaN
+        return cov / math.sqrt(var_x * var_y)
+
+    def update(self, timestamp, price, realized_price, profit_relative):
+        """
+        Consume one daily bar.
+
+        :return: Dict with the OUTPUT_COLUMNS values for this bar.
+        """
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            raise ValueError(f"Bars must be fed in time order: {timestamp} <= {self.last_timestamp}")
+        self.last_timestamp = timestamp
+
+        price, realized_price, profit_relative = float(price), float(realized_price), float(profit_relative)
+        self.prices.append(price)
+        self.realized_prices.append(realized_price)
+
+        return {
+            '28d_mkt_gradient': self._gradient_zscore(),
+            'mayer_multiple': price / self.price_mean.update(price),
+            'price_profit_corr': self._price_profit_corr(price, profit_relative),
+        }
+
+    def update_frame(self, data):
+        """
+        Consume every row of `data` (indexed by time, with 'price_usd_close', 'price_realized_usd'
+        and 'profit_relative').
+
+        :return: DataFrame with the OUTPUT_COLUMNS, indexed like `data`.
+        """
+        columns = data[['price_usd_close', 'price_realized_usd', 'profit_relative']].itertuples(index=False)
+        rows = [self.update(t, *values) for t, values in zip(data.index, columns)]
+        return pd.DataFrame(rows, index=data.index, columns=self.OUTPUT_COLUMNS)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
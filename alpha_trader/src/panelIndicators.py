@@ -0,0 +1,109 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Indicadores de gatilho calculados coluna a coluna sobre painéis (tempo x ativo), reproduzindo o
+          pandas_ta, para processar vários ativos em uma única passada vetorizada.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import numpy as np
+import pandas as pd
+from rollingQuantile import rolling_quantile
+
+
+###############################################################################
+############################ Indicadores em Painel ############################
+###############################################################################
+
+def ema(close, length=10, start=None):
+    """
+    `pandas_ta.ema` for a Series or a DataFrame (one column per asset): the first `length` values
+    are replaced by their mean (SMA seed), then an exponential mean with span=`length`, adjust=False.
+
+    :param start: Row position where each column's own series begins (an int, or one per column;
+                  default 0). In a panel of assets starting on different dates, the seed of each
+                  column is then taken over its own first `length` rows, as pandas_ta would on
+                  that asset's frame alone.
+    """
+    frame = (close.to_frame() if close.ndim == 1 else close).astype(np.float64)
+    for i, column_start in enumerate(np.broadcast_to(0 if start is None else start, frame.shape[1])):
+        seed_row = int(column_start) + length - 1
+        sma_nth = frame.iloc[column_start:seed_row + 1, i].mean()
+        frame.iloc[:seed_row, i] = np.nan
+        if seed_row < len(frame):
+            frame.iloc[seed_row, i] = sma_nth
+
+    result = frame.ewm(span=length, adjust=False).mean()
+    return result if close.ndim > 1 else result.iloc[:, 0].rename(close.name)
+
+
+def rma(close, length=10):
+    """Wilder's moving average, as in `pandas_ta.rma`."""
+    return close.ewm(alpha=1. / length, min_periods=length).mean()
+
+
+def rsi(close, length=14, scalar=100., drift=1):
+    """`pandas_ta.rsi` for a Series or a DataFrame (one column per asset)."""
+    negative = close.diff(drift)
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+
+    positive_avg = rma(positive, length=length)
+    negative_avg = rma(negative, length=length)
+    return scalar * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def trigger_indicators(ssr_oscillator, hash_rate_mean, spot_cvd_sum, srs_window=240, srs_quantile=0.5, start=None):
+    """
+    The indicators of `DataManager.compute_triggers`, computed over whole panels at once.
+
+    :param ssr_oscillator: DataFrame indexed by time with one column per asset (a Series also works).
+    :param hash_rate_mean: Same shape as `ssr_oscillator`.
+    :param spot_cvd_sum: Same shape as `ssr_oscillator`.
+    :param start: Row position where each asset's own frame begins, for the EMA seeds (see `ema`).
+    :return: Dict {'srs', 'hash_ribbon', 'cvd_ema24'} of frames shaped like the inputs.
+    """
+    rsi_ssr_smoothed = ema(rsi(ssr_oscillator, length=336), length=800, start=start)
+    rsi_ssr_smoothed_median = rolling_quantile(rsi_ssr_smoothed, window=srs_window, quantile=srs_quantile)
+
+    return {
+        'srs': rsi_ssr_smoothed - rsi_ssr_smoothed_median,
+        'hash_ribbon': hash_rate_mean.rolling(window=30).mean() - hash_rate_mean.rolling(window=60).mean(),
+        'cvd_ema24': ema(spot_cvd_sum, length=24, start=start),
+    }
+
+
+###############################################################################
+############################ Formatação de Painéis ############################
+###############################################################################
+
+def to_panel(frames, fields=None):
+    """
+    Align per-asset frames on a common time index.
+
+    :param frames: Dict {asset: DataFrame indexed by time}; None entries are treated as empty.
+    :param fields: Columns to keep. Fields missing for an asset are filled with NaN.
+    :return: DataFrame with (field, asset) columns, so `panel[field]` is a time x asset frame.
+    """
+    assets = list(frames)
+    available = {asset: df for asset, df in frames.items() if df is not None}
+    panel = pd.concat(available, axis=1).swaplevel(axis=1) if available else pd.DataFrame()
+    if fields is None:
+        fields = list(dict.fromkeys(panel.columns.get_level_values(0)))
+    return panel.reindex(columns=pd.MultiIndex.from_product([fields, assets])).sort_index()
+
+
+def to_long(fields, index_name='t'):
+    """
+    Stack a dict {field: time x asset frame} into a long frame indexed by (time, asset).
+    """
+    wide = pd.concat(fields, axis=1)
+    long = wide.stack(level=1, future_stack=True)
+    long.index.names = [index_name, 'asset']
+    return long
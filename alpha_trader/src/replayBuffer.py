@@ -0,0 +1,221 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Buffer de replay de experiências com capacidade fixa (anel) para o TradingEnvironment: transições em
+          arrays compactos (float32/int8), estados referenciados pelo índice da janela no ambiente, opção de
+          armazenamento em arquivos mapeados em memória e amostragem vetorizada uniforme ou priorizada (sum-tree).
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import os
+import json
+import numpy as np
+
+
+###############################################################################
+################################ Classe SumTree ###############################
+###############################################################################
+
+class SumTree:
+    """
+    Binary tree of priorities in a flat array (node i has children 2i and 2i + 1, leaves start at
+    `leaf_count`), so that sampling proportionally to the priorities and updating them are
+    O(log capacity) and vectorized over a whole batch.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.leaf_count = 1 << max(0, int(capacity - 1).bit_length())
+        self.depth = self.leaf_count.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_count)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def priorities(self, indices):
+        return self.tree[self.leaf_count + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """Set the priority of the leaves `indices` and refresh their ancestors, one tree level at a time."""
+        nodes = self.leaf_count + np.asarray(indices, dtype=np.int64)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Leaf index of each value in [0, total): the leaf whose cumulative priority range contains it."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= np.where(go_right, left_sum, 0.)
+            nodes = left + go_right
+        return np.minimum(nodes - self.leaf_count, self.capacity - 1)
+
+
+###############################################################################
+############################## Classe ReplayBuffer ############################
+###############################################################################
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of (state, action, reward, next_state, done) transitions.
+
+    States are not stored: a transition keeps the environment steps whose windows are the state and
+    the next state (int32), the action (int8), the reward (float32) and the done flag (int8), about
+    14 bytes per transition whatever the state size. The states are gathered from the environment's
+    feature windows when a batch is sampled.
+
+        buffer = ReplayBuffer(1_000_000, environment=env, prioritized=True)
+        step = env.current_step
+        state, reward, done = env.step(action)
+        buffer.add(step, action, reward, env.current_step, done)
+        batch = buffer.sample(256)           # batch['states'] is (256, stateSize * features) float32
+        buffer.update_priorities(batch['indices'], td_errors)
+
+    With a `path`, the arrays are memory-mapped files in that directory, so the buffer can outgrow
+    the RAM and be reopened later (call `flush()` to persist the ring position).
+    """
+
+    FIELDS = {'step': np.int32, 'next_step': np.int32, 'action': np.int8, 'reward': np.float32, 'done': np.int8}
+    META_FILE = 'meta.json'
+
+    def __init__(self, capacity, environment=None, path=None, prioritized=False, alpha=0.6, epsilon=1e-6, seed=None):
+        """
+        :param environment: TradingEnvironment (or VectorTradingEnvironment's `environment`) the steps refer to;
+                            needed to return states from `sample`.
+        :param path: Optional directory of memory-mapped storage (created, or reopened when it already holds a buffer).
+        :param prioritized: Sample proportionally to priority ** alpha (sum-tree) instead of uniformly.
+        :param epsilon: Added to the absolute TD errors so no transition gets a zero priority.
+        """
+        self.capacity = capacity
+        self.environment = environment
+        self.path = path
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.cursor = 0
+        self.size = 0
+
+        if path is None:
+            self.storage = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.FIELDS.items()}
+        else:
+            self.storage = self._open(path)
+
+        self.tree = SumTree(capacity) if prioritized else None
+        self.max_priority = 1.
+        if self.tree is not None and self.size:
+            # Priorities are not persisted: reopened transitions start equal
+            self.tree.update(np.arange(self.size), self.max_priority)
+
+    def __len__(self):
+        return self.size
+
+    def _open(self, path):
+        meta_path = os.path.join(path, self.META_FILE)
+        mode = 'w+'
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['capacity'] != self.capacity:
+                raise ValueError(f"Replay buffer at {path} has capacity {meta['capacity']}, not {self.capacity}")
+            self.cursor, self.size, mode = meta['cursor'], meta['size'], 'r+'
+        os.makedirs(path, exist_ok=True)
+        return {name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode=mode, dtype=dtype,
+                                                shape=(self.capacity,))
+                for name, dtype in self.FIELDS.items()}
+
+    def flush(self):
+        """Write the memory-mapped arrays and the ring position to disk (no-op in memory)."""
+        if self.path is None:
+            return
+        for values in self.storage.values():
+            values.flush()
+        tmp_path = os.path.join(self.path, f"{self.META_FILE}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'capacity': self.capacity, 'cursor': self.cursor, 'size': self.size}, f)
+        os.replace(tmp_path, os.path.join(self.path, self.META_FILE))
+
+    def add(self, step, action, reward, next_step, done):
+        """Store one transition, overwriting the oldest one when the buffer is full."""
+        self.add_batch([step], [action], [reward], [next_step], [done])
+
+    def add_batch(self, steps, actions, rewards, next_steps, dones):
+        """
+        Store a batch of transitions (e.g. one VectorTradingEnvironment step) in ring order.
+
+        :return: Buffer indices the transitions were written to.
+        """
+        count = len(steps)
+        if count > self.capacity:
+            raise ValueError(f"Cannot add {count} transitions to a buffer of capacity {self.capacity}")
+        indices = (self.cursor + np.arange(count)) % self.capacity
+        for name, values in zip(self.FIELDS, (steps, next_steps, actions, rewards, dones)):
+            self.storage[name][indices] = values
+
+        self.cursor = int((self.cursor + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
+        if self.tree is not None:
+            # New transitions are sampled at least once before their TD error is known
+            self.tree.update(indices, self.max_priority ** self.alpha)
+        return indices
+
+    def _sample_indices(self, batch_size):
+        if not self.prioritized:
+            return self.rng.integers(0, self.size, batch_size), None
+        # Stratified: one uniform draw per equal slice of the total priority
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+        probabilities = self.tree.priorities(indices) / self.tree.total
+        return indices, probabilities
+
+    def sample(self, batch_size, beta=0.4):
+        """
+        Draw a batch of transitions (with replacement).
+
+        :param beta: Importance-sampling exponent of the prioritized weights.
+        :return: Dict of arrays: 'indices', 'steps', 'next_steps', 'actions', 'rewards', 'dones', 'weights'
+                 and, when the buffer has an environment, 'states' and 'next_states' (float32).
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+
+        indices, probabilities = self._sample_indices(batch_size)
+        if probabilities is None:
+            weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            weights = (self.size * probabilities) ** -beta
+            weights = (weights / weights.max()).astype(np.float32)
+
+        batch = {
+            'indices': indices,
+            'steps': self.storage['step'][indices],
+            'next_steps': self.storage['next_step'][indices],
+            'actions': self.storage['action'][indices],
+            'rewards': self.storage['reward'][indices],
+            'dones': self.storage['done'][indices],
+            'weights': weights,
+        }
+        if self.environment is not None:
+            batch['states'] = self.environment.observations(batch['steps']).astype(np.float32)
+            batch['next_states'] = self.environment.observations(batch['next_steps']).astype(np.float32)
+        return batch
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of sampled transitions from their TD errors: (|td_error| + epsilon) ** alpha."""
+        if self.tree is None:
+            return
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
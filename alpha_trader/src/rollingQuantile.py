@@ -0,0 +1,102 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Mediana / quantil móvel barra a barra (janela ordenada com busca binária), em modo streaming ou em lote.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+from bisect import bisect_left, insort
+from collections import deque
+import numpy as np
+import pandas as pd
+
+NaN = float('nan')
+
+
+###############################################################################
+########################## Classe RollingQuantile #############################
+###############################################################################
+
+class RollingQuantile:
+    """
+    Streaming fixed-window quantile.
+
+    The window is kept sorted: finding the insert/remove position is an O(log w) binary search and
+    the shift that follows is a single memmove, which in CPython is faster than pointer-based
+    O(log w) structures (skiplists, heaps with lazy deletion) for any realistic window length.
+
+    Matches pandas: quantile=0.5 gives `Series.rolling(window).median()` and any other quantile
+    gives `Series.rolling(window).quantile(quantile)` (linear interpolation). NaNs are skipped and
+    the output is NaN until the window holds `min_periods` (default: `window`) observations.
+    """
+
+    def __init__(self, window, quantile=0.5, min_periods=None):
+        if not 0. <= quantile <= 1.:
+            raise ValueError(f"quantile must be in [0, 1], got {quantile}")
+        self.window = window
+        self.quantile = quantile
+        self.min_periods = window if min_periods is None else max(min_periods, 1)
+        self.values = deque()
+        self.sorted_values = []
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            oldest = self.values.popleft()
+            if oldest == oldest:
+                del self.sorted_values[bisect_left(self.sorted_values, oldest)]
+        self.values.append(value)
+        if value == value:
+            insort(self.sorted_values, value)
+
+        sorted_values = self.sorted_values
+        nobs = len(sorted_values)
+        if nobs < self.min_periods:
+            return NaN
+
+        if self.quantile == 0.5:
+            midpoint = nobs // 2
+            if nobs % 2:
+                return sorted_values[midpoint]
+            return (sorted_values[midpoint - 1] + sorted_values[midpoint]) / 2
+
+        if nobs == 1:
+            return sorted_values[0]
+        idx_with_fraction = self.quantile * (nobs - 1)
+        idx = int(idx_with_fraction)
+        if idx_with_fraction == idx:
+            return sorted_values[idx]
+        low = sorted_values[idx]
+        high = sorted_values[idx + 1]
+        return low + (high - low) * (idx_with_fraction - idx)
+
+
+def rolling_quantile(values, window, quantile=0.5, min_periods=None, engine='pandas'):
+    """
+    Batch rolling quantile over a whole series, or over every column of a DataFrame.
+
+    :param values: Series, DataFrame (e.g. one column per asset) or array.
+    :param engine: 'pandas' runs pandas' compiled rolling kernels (fastest for batch work);
+                   'streaming' feeds the values through RollingQuantile, producing exactly what
+                   the streaming path will produce bar by bar.
+    :return: Series, or DataFrame for DataFrame input (indexed like `values` when it is a pandas object).
+    """
+    if isinstance(values, pd.DataFrame):
+        if engine == 'pandas':
+            rolling = values.rolling(window=window, min_periods=min_periods)
+            return rolling.median() if quantile == 0.5 else rolling.quantile(quantile)
+        return values.apply(lambda column: rolling_quantile(column, window, quantile, min_periods, engine))
+
+    series = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=float))
+
+    if engine == 'pandas':
+        rolling = series.rolling(window=window, min_periods=min_periods)
+        return rolling.median() if quantile == 0.5 else rolling.quantile(quantile)
+    if engine == 'streaming':
+        kernel = RollingQuantile(window, quantile=quantile, min_periods=min_periods)
+        return pd.Series([kernel.update(v) for v in series.to_numpy(dtype=float)], index=series.index, name=series.name)
+    raise ValueError(f"Unknown engine: {engine}")
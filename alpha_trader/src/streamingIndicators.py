@@ -0,0 +1,229 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Cálculo incremental (barra a barra) dos indicadores de gatilho (srs, hash_ribbon e cvd_ema24),
+          com estado persistível, reproduzindo o cálculo em lote do pandas / pandas_ta.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import math
+import pickle
+from collections import deque
+import pandas as pd
+from rollingQuantile import RollingQuantile
+
+NaN = float('nan')
+
+
+###############################################################################
+######################### Indicadores Incrementais ############################
+###############################################################################
+
+class StreamingEWM:
+    """
+    Exponentially weighted mean updated one value at a time.
+
+    Follows the recursion of pandas' `Series.ewm(alpha=..., adjust=..., min_periods=...).mean()`
+    (with ignore_na=False) operation by operation, so results match the batch path to the last bit.
+    """
+
+    def __init__(self, alpha, adjust=True, min_periods=0):
+        self.old_wt_factor = 1. - alpha
+        self.new_wt = 1. if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NaN
+        self.old_wt = 1.
+        self.nobs = 0
+        self.started = False
+
+    def update(self, value):
+        is_observation = value == value
+        self.nobs += is_observation
+
+        if not self.started:
+            self.started = True
+            self.weighted = value
+        elif self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = self.old_wt * self.weighted + self.new_wt * value
+                    self.weighted /= (self.old_wt + self.new_wt)
+                if self.adjust:
+                    self.old_wt += self.new_wt
+                else:
+                    self.old_wt = 1.
+        elif is_observation:
+            self.weighted = value
+
+        return self.weighted if self.nobs >= self.min_periods else NaN
+
+
+class StreamingEMA:
+    """
+    Incremental `pandas_ta.ema`: the first `length` values are replaced by their mean (SMA seed),
+    then an exponential mean with span=`length` and adjust=False.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.count = 0
+        self.seed_sum = 0.
+        self.seed_nobs = 0
+        self.ewm = StreamingEWM(alpha=2. / (1. + length), adjust=False)
+
+    def update(self, value):
+        self.count += 1
+        if self.count <= self.length:
+            if value == value:
+                self.seed_sum += value
+                self.seed_nobs += 1
+            if self.count < self.length:
+                return self.ewm.update(NaN)
+            value = self.seed_sum / self.seed_nobs if self.seed_nobs else NaN
+        return self.ewm.update(value)
+
+
+class StreamingRSI:
+    """Incremental `pandas_ta.rsi`: Wilder's moving averages (RMA) of gains and losses."""
+
+    def __init__(self, length, scalar=100.):
+        self.scalar = scalar
+        self.previous = NaN
+        self.positive = StreamingEWM(alpha=1. / length, adjust=True, min_periods=length)
+        self.negative = StreamingEWM(alpha=1. / length, adjust=True, min_periods=length)
+
+    def update(self, value):
+        change = value - self.previous
+        self.previous = value
+
+        positive_avg = self.positive.update(0. if change < 0 else change)
+        negative_avg = self.negative.update(0. if change > 0 else change)
+
+        denominator = positive_avg + abs(negative_avg)
+        if denominator == 0:
+            return NaN
+        return self.scalar * positive_avg / denominator
+
+
+class StreamingRollingMean:
+    """
+    Fixed-window rolling mean with pandas' defaults (min_periods=window), using the same
+    compensated (Kahan) running sum as `Series.rolling(window).mean()`.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.neg_ct = 0
+        self.consecutive_same = 0
+        self.prev_value = NaN
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            oldest = self.values.popleft()
+            if oldest == oldest:
+                y = -oldest - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                self.nobs -= 1
+                self.neg_ct -= math.copysign(1., oldest) < 0
+        self.values.append(value)
+
+        if value == value:
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            self.nobs += 1
+            self.neg_ct += math.copysign(1., value) < 0
+            self.consecutive_same = self.consecutive_same + 1 if value == self.prev_value else 1
+            self.prev_value = value
+
+        if self.nobs < self.window:
+            return NaN
+        if self.consecutive_same >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if (self.neg_ct == 0 and result < 0) or (self.neg_ct == self.nobs and result > 0):
+            return 0.
+        return result
+
+
+###############################################################################
+######################## Classe TriggerIndicatorState #########################
+###############################################################################
+
+class TriggerIndicatorState:
+    """
+    Incremental version of the indicators in `DataManager.compute_triggers`.
+
+    Feed it the merged hourly rows (Glassnode metrics + OHLCV) in time order, one closed bar at a
+    time, instead of recomputing a year of history. Each update is O(1) except for the rolling
+    quantile: an O(log w) bisect on its sorted window followed by an O(w) memmove (see RollingQuantile).
+    The state can be pickled to disk and resumed in the next run. `repair_tail` keeps the last input
+    bars on the hourly grid before the bounded fill, so `DataManager.update_triggers` repairs a gap
+    spanning two updates as `compute_triggers` would repair it in one pass.
+    """
+
+    INPUT_COLUMNS = ['ssr_oscillator', 'hash_rate_mean', 'spot_cvd_sum']
+    OUTPUT_COLUMNS = ['srs', 'hash_ribbon', 'cvd_ema24']
+
+    def __init__(self, rsi_length=336, rsi_ema_length=800, srs_window=240, srs_quantile=0.5,
+                 hash_fast=30, hash_slow=60, cvd_ema_length=24):
+        self.rsi = StreamingRSI(rsi_length)
+        self.rsi_ema = StreamingEMA(rsi_ema_length)
+        self.rsi_median = RollingQuantile(srs_window, quantile=srs_quantile)
+        self.hash_fast = StreamingRollingMean(hash_fast)
+        self.hash_slow = StreamingRollingMean(hash_slow)
+        self.cvd_ema = StreamingEMA(cvd_ema_length)
+        self.repair_tail = None
+        self.last_timestamp = None
+
+    def update(self, timestamp, ssr_oscillator, hash_rate_mean, spot_cvd_sum):
+        """
+        Consume one bar.
+
+        :return: Dict with the 'srs', 'hash_ribbon' and 'cvd_ema24' values for this bar.
+        """
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            raise ValueError(f"Bars must be fed in time order: {timestamp} <= {self.last_timestamp}")
+        self.last_timestamp = timestamp
+
+        rsi_ssr_smoothed = self.rsi_ema.update(self.rsi.update(float(ssr_oscillator)))
+        rsi_ssr_smoothed_median = self.rsi_median.update(rsi_ssr_smoothed)
+
+        return {
+            'srs': rsi_ssr_smoothed - rsi_ssr_smoothed_median,
+            'hash_ribbon': self.hash_fast.update(float(hash_rate_mean)) - self.hash_slow.update(float(hash_rate_mean)),
+            'cvd_ema24': self.cvd_ema.update(float(spot_cvd_sum)),
+        }
+
+    def update_frame(self, data):
+        """
+        Consume every row of `data` (indexed by time, with the INPUT_COLUMNS).
+
+        :return: DataFrame with the OUTPUT_COLUMNS, indexed like `data`.
+        """
+        rows = [self.update(t, *values) for t, values in zip(data.index, data[self.INPUT_COLUMNS].itertuples(index=False))]
+        return pd.DataFrame(rows, index=data.index, columns=self.OUTPUT_COLUMNS)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
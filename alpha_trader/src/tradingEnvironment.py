@@ -10,85 +10,314 @@ Autor: Valter Rebelo
 ###############################################################################
 
 
-import matplotlib.pyplot as plt
+import copy
+import math
+from collections import namedtuple
 from dataManager import DataManager
+from featureStore import FeatureStore
+from lazyImport import LazyModule
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Only render() plots
+plt = LazyModule('matplotlib.pyplot')
+
+# Scalar account state of a TradingEnvironment (see TradingEnvironment.snapshot)
+AccountSnapshot = namedtuple('AccountSnapshot', ['current_step', 'position', 'quantity', 'cash', 'net_worth', 'entry_price',
+                                                 'committed_account', 'reward', 'done',
+                                                 'episode', 'episode_start', 'episode_length'])
 
 ###############################################################################
 ############################## Class TradingEnv ###############################
 ###############################################################################
 
 class TradingEnvironment():
+    """
+    Trading environment over a get_data frame.
+
+    The market data is read once into contiguous NumPy arrays and the account (position, action,
+    nav, cash, net_worth, returns, entry_price, transaction_cost) is kept in NumPy arrays, so a
+    step only touches array elements and Python scalars. Each episode writes its rows into a small
+    episode ledger, committed to the global history (`ledger`, one row per bar) when the episode ends
+    (trade closed or end of the data); `reset` just starts a new episode ledger, without touching the history.
+    The full ledger is materialized as a DataFrame on demand (`data`, `to_frame()`), e.g. for `render`.
+
+    States are rows of a read-only strided view over the feature matrix (`windows`), so building
+    one copies nothing; pass `out` to `_get_state` / `observations` to fill a buffer instead.
+    With a `normalizer` (see featureNormalization.FeatureNormalizer) the feature matrix is normalized
+    once, when it is built, so the states come out normalized at no cost per step.
+
+    For lookahead search, `snapshot()` / `restore()` save and rewind the scalar account, and `fork()`
+    returns an independent environment sharing the (read-only) market data.
+    """
+
+    # State vector columns (those present in the data are used)
+    STATE_COLUMNS_CONTEXTUALIZED = ['close', 'open', 'high', 'low', 'volume', 'srs', 'hash_ribbon', 'cvd_ema24']
+    STATE_COLUMNS_UNCONTEXTUALIZED = ['close', 'open', 'high', 'low', 'volume', 'srs', 'hash_ribbon',
+                                      '28d_mkt_gradient', 'mayer_multiple', 'profit_relative', 'cvd_ema24']
+
+    LEDGER_COLUMNS = ['position', 'action', 'nav', 'cash', 'net_worth', 'returns', 'entry_price', 'transaction_cost']
+
+    def __init__(self, start, end, cash, contextualize=True, stateSize=30, txCosts=0.01, compact=False, feature_store=None,
+                 data=None, normalizer=None):
+        """
+        :param data: get_data frame to trade on (e.g. loaded offline); `start`, `end` and `feature_store` are then ignored.
+        :param normalizer: Optional FeatureNormalizer applied to the state features.
+        """
+        if data is not None:
+            self.market_data = data
+        elif feature_store is not None:
+            # Read-only memory-mapped dataset shared with the other workers (see DataManager.build_feature_store)
+            self.market_data = FeatureStore(feature_store).attach() if isinstance(feature_store, str) else feature_store.attach()
+        else:
+            data_manager = DataManager(compact=compact)
+            self.market_data = data_manager.get_data(start=start, end=end, contextualize=contextualize)
 
-    def __init__(self, start, end, cash, contextualize=True, stateSize=30, txCosts=0.01):
-        
-        data_manager = DataManager()
-        
-        self.data = data_manager.get_data(start=start, end=end, contextualize=contextualize)
-        self.data['position'] = 0
-        self.data['action'] = 0
-        self.data['nav'] = 0.
-        self.data['cash'] = float(cash)
-        self.data['net_worth'] = self.data['nav'] + self.data['cash']
-        self.data['returns'] = 0.
-
-        self.state = self._get_state()
+        self.start = start
+        self.end = end
+        self.contextualize = contextualize
+        self.stateSize = stateSize
+        self.txCosts = txCosts
+        self.initial_cash = float(cash)
+        self.normalizer = normalizer
+
+        # Market data read once; the step loop only indexes these arrays
+        self.close = np.ascontiguousarray(self.market_data['close'].to_numpy(dtype=np.float64))
+        self.context = (self.market_data['context'].to_numpy(dtype=np.float64)
+                        if 'context' in self.market_data.columns else None)
+        self.feature_matrices = {}
+        self.state_columns = self._state_columns(contextualize)
+        self.features, self.windows = self._feature_matrix(contextualize)
+
+        # Global history; cash and net worth of the bars no episode committed are carried forward by to_frame
+        self.integer_dtype = np.int8 if compact else np.int64
+        self.ledger = self._new_ledger(len(self.market_data))
+        self.ledger['cash'][0] = self.ledger['net_worth'][0] = self.initial_cash
+        self.committed_end = 0
+
+        # Account carried from one step to the next, and as of the last committed episode
+        self.position = 0
+        self.cash = self.initial_cash
+        self.net_worth = self.initial_cash
+        self.quantity = 0
+        self.entry_price = np.nan
+        self.committed_account = (0, self.initial_cash, self.initial_cash)
 
         self.reward = 0.
         self.done = 0
-        self.start = start
-        self.end = end
         self.current_step = stateSize
-        self.quantity = 0
-        self.txCosts = txCosts
+        self.episode = self._new_ledger(64)
+        self._start_episode()
+        self.state = self._get_state(contextualize)
+
+    def __len__(self):
+        return len(self.close)
+
+    def _state_columns(self, contextualize):
+        if contextualize:
+            return [col for col in self.market_data.columns if col in self.STATE_COLUMNS_CONTEXTUALIZED]
+        return [col for col in self.STATE_COLUMNS_UNCONTEXTUALIZED if col in self.market_data.columns]
+
+    def _feature_matrix(self, contextualize):
+        """
+        Contiguous (rows x state columns) float64 matrix and its state windows, built once per mode.
+        """
+        if contextualize not in self.feature_matrices:
+            columns = self._state_columns(contextualize)
+            if self.normalizer is not None:
+                features = self.normalizer.transform(self.market_data[columns])
+            else:
+                features = np.ascontiguousarray(self.market_data[columns].to_numpy(dtype=np.float64))
+            self.feature_matrices[contextualize] = (features, self._windows(features, self.stateSize))
+        return self.feature_matrices[contextualize]
+
+    @staticmethod
+    def _windows(features, size):
+        """
+        Read-only view of shape (rows - size + 1, size * columns) whose row i is features[i:i + size].ravel(),
+        i.e. the state at step i + size, without copying the matrix.
+        """
+        columns = features.shape[1]
+        if len(features) < size:
+            return np.empty((0, size * columns))
+        return sliding_window_view(features.reshape(-1), size * columns)[::columns]
+
+    def observations(self, steps, out=None):
+        """
+        States at several steps (each >= stateSize) at once, e.g. for a batched policy.
+
+        :param out: Optional preallocated (len(steps), stateSize * columns) float64 buffer to fill.
+        :return: The stacked states (`out` when given).
+        """
+        # Fancy indexing reads the strided view directly (np.take would first copy all of it)
+        states = self.windows[np.asarray(steps) - self.stateSize]
+        if out is None:
+            return states
+        np.copyto(out, states)
+        return out
+
+    def _new_ledger(self, length):
+        # Compact mode: int8 positions/actions; money accumulators stay float64
+        return {
+            'position': np.zeros(length, dtype=self.integer_dtype),
+            'action': np.zeros(length, dtype=self.integer_dtype),
+            'nav': np.zeros(length),
+            'cash': np.full(length, np.nan),
+            'net_worth': np.full(length, np.nan),
+            'returns': np.zeros(length),
+            'entry_price': np.full(length, np.nan),
+            'transaction_cost': np.zeros(length),
+        }
+
+    def _start_episode(self):
+        """
+        Start an empty episode ledger at the current step. Its arrays are new (of the current capacity), so the
+        rows of the previous episode stay intact for the snapshots that reference them.
+        """
+        self.episode = self._new_ledger(len(self.episode['position']))
+        self.episode_start = self.current_step
+        self.episode_length = 0
+
+    def _grow_episode(self, rows):
+        grown = self._new_ledger(max(2 * len(self.episode['position']), rows))
+        for name, values in self.episode.items():
+            grown[name][:len(values)] = values
+        self.episode = grown
+
+    def _commit_episode(self):
+        """Copy the episode rows to the global ledger (O(episode length))."""
+        start, length = self.episode_start, self.episode_length
+        if self.ledger is not None:
+            for name, values in self.episode.items():
+                self.ledger[name][start:start + length] = values[:length]
+        self.committed_end = start + length
+        self.committed_account = (self.position, self.cash, self.net_worth)
+
+    def to_frame(self):
+        """
+        The market data with the ledger columns (including the episode in progress), as a new DataFrame.
+        """
+        if self.ledger is None:
+            raise ValueError("This environment does not record its history (use fork(history=True))")
+        data = self.market_data.copy()
+        start, length = self.episode_start, self.episode_length
+        for name, values in self.ledger.items():
+            values = values.copy()
+            values[start:start + length] = self.episode[name][:length]
+            data[name] = values
+        # Bars outside any committed episode keep the cash of the bar before them
+        data[['cash', 'net_worth']] = data[['cash', 'net_worth']].ffill()
+        return data
+
+    @property
+    def data(self):
+        """Materialized ledger (see `to_frame`); build it once and reuse it rather than reading it per step."""
+        return self.to_frame()
         
-    def reset(self, contextualize):
+    def snapshot(self):
+        """
+        The scalar account state (step, position, quantity, cash, net worth, entry price, ...), to `restore` later.
+        Nothing is copied: the episode ledger is referenced (its rows up to the snapshot step are never rewritten,
+        as every episode gets new arrays) and the market data and global ledger are not part of it.
+        """
+        return AccountSnapshot(self.current_step, self.position, self.quantity, self.cash, self.net_worth,
+                               self.entry_price, self.committed_account, self.reward, self.done,
+                               self.episode, self.episode_start, self.episode_length)
+
+    def restore(self, snapshot):
+        """
+        Rewind the account and the episode ledger to `snapshot`. When the snapshot was taken in an earlier episode
+        (or by another environment), its episode rows are copied back (O(episode length)). Rows committed to the
+        global history from the snapshot step on are cleared, so a shorter restored branch leaves none of the
+        abandoned one behind.
+
+        :return: The state at the snapshot step.
+        """
+        (self.current_step, self.position, self.quantity, self.cash, self.net_worth, self.entry_price,
+         self.committed_account, self.reward, self.done, episode, episode_start, episode_length) = snapshot
+        if episode is not self.episode:
+            if len(self.episode['position']) < episode_length:
+                self._grow_episode(episode_length)
+            for name, values in episode.items():
+                self.episode[name][:episode_length] = values[:episode_length]
+        self.episode_start, self.episode_length = episode_start, episode_length
+        if self.committed_end > self.current_step:
+            if self.ledger is not None:
+                cleared = self._new_ledger(1)
+                for name, values in self.ledger.items():
+                    values[self.current_step:self.committed_end] = cleared[name][0]
+            self.committed_end = self.current_step
+        self.state = self._get_state()
+        return self.state
+
+    def fork(self, history=False):
+        """
+        Independent copy of the environment at the current step, e.g. to simulate alternative action sequences.
+
+        The market data, feature matrix and state windows are shared; only the account and the episode ledger
+        (a few rows) are copied, so forking costs microseconds whatever the dataset size.
+
+        :param history: Also copy the global ledger, so the fork can be materialized with `to_frame` (O(rows)).
+        """
+        fork = copy.copy(self)
+        fork.episode = {name: values.copy() for name, values in self.episode.items()}
+        fork.ledger = ({name: values.copy() for name, values in self.ledger.items()}
+                       if history and self.ledger is not None else None)
+        return fork
+
+    def reset(self, contextualize=None):
         """
         Resets the environment to start a new episode after the previous trade is closed.
+
+        An episode reset before it ended is discarded: its rows are not committed and the account goes back
+        to where the last committed episode left it.
         """
+        contextualize = self.contextualize if contextualize is None else contextualize
+
         # Advance to the next potential trading action if the current episode ended with a closed trade
         if self.done:
             self.current_step += 1  # Move to the next step after a trade has closed
 
         # Check if we've reached the end of the data
-        if self.current_step >= len(self.data):
+        if self.current_step >= len(self.close):
             self.done = True  # No more data to process, end of data
             return None  # No more states to return, end of episodes
 
-        # Reset the state variables for the new episode
-        self.data['position'][self.current_step:] = 0
-        self.data['action'][self.current_step:] = 0
-        self.data['nav'][self.current_step:] = 0.
-        self.data['cash'][self.current_step:] = self.data['cash'][self.current_step - 1]  # Presume continuity unless specified otherwise
-        self.data['net_worth'][self.current_step:] = self.data['nav'][self.current_step] + self.data['cash'][self.current_step]
-        self.data['returns'][self.current_step:] = 0.
+        # The new episode starts from the account of the last committed episode
+        self.position, self.cash, self.net_worth = self.committed_account
+        self._start_episode()
 
         self.reward = 0
         self.done = False
         self.quantity = 0
 
         # Update the state from the new current step
-        self.state = self._get_state(contextualize=contextualize)  # Assuming you want to contextualize by default
+        self.state = self._get_state(contextualize=contextualize)
         return self.state
 
-    def _get_state(self, contextualize):
-        # List of columns to include in the state vector; this should be defined based on what you consider relevant
-        relevant_columns_contextualized = ['close', 'open', 'high', 'low', 'volume', 'srs', 'hash_ribbon', 'cvd_ema24']
-        
-        relevant_columns_uncontextualized = ['close', 'open', 'high', 'low', 'volume', 'srs', 'hash_ribbon',
-                                             '28d_market_gradient', 'mayer_multiple', 'profit_relative', 'cvd_ema24']
-        if contextualize:
-            state_columns = [col for col in self.data.columns if col in relevant_columns_contextualized]
+    def _get_state(self, contextualize=None, out=None):
+        """
+        The last `stateSize` rows of state features before the current step, flattened.
+
+        :param out: Optional preallocated buffer to copy the state into (the state is a read-only view otherwise).
+        """
+        if contextualize is None or contextualize == self.contextualize:
+            features, windows = self.features, self.windows
         else:
-            state_columns = relevant_columns_uncontextualized  # If not contextualizing, use the pre-defined relevant columns directly
+            features, windows = self._feature_matrix(contextualize)
 
-        # Ensure the state includes enough historical data points
-        start_index = max(0, self.current_step - self.stateSize)
-        state = self.data[state_columns].iloc[start_index:self.current_step].values.flatten()
-        return state.astype(float)
+        if self.current_step >= self.stateSize:
+            state = windows[self.current_step - self.stateSize]
+        else:
+            state = features[:self.current_step].reshape(-1)  # Shorter history at the start of the data
+
+        if out is None:
+            return state
+        out[...] = state
+        return out
 
 
-    def step(self, action, contextualize):
+    def step(self, action, contextualize=None):
         """
         Realiza um passo no ambiente de trading baseado na ação fornecida.
 
@@ -99,47 +328,48 @@ class TradingEnvironment():
         - state: Novo estado do ambiente.
         - reward: Recompensa obtida com a ação.
         - done: Indica se o episódio terminou.
-        - info: Dicionário com informações adicionais.
         """
-
-        current_price = self.data['close'].iloc[self.current_step]
-        market_context = self.data['context'].iloc[self.current_step] if self.contextualize else None
-
-        previous_position = self.data['position'].iloc[self.current_step - 1]
-        previous_cash = self.data['cash'].iloc[self.current_step - 1]
-        previous_net_worth = self.data['net_worth'].iloc[self.current_step - 1]
-        entry_price = self.data['entry_price'].iloc[self.current_step] if previous_position != 0 else current_price
+        contextualize = self.contextualize if contextualize is None else contextualize
+        step = self.current_step
+        row = step - self.episode_start
+        if row >= len(self.episode['position']):
+            self._grow_episode(row + 1)
+        ledger = self.episode
+
+        current_price = float(self.close[step])
+        previous_position = self.position
+        previous_cash = self.cash
+        previous_net_worth = self.net_worth
+        entry_price = self.entry_price if previous_position != 0 else current_price
         transaction_cost_rate = self.txCosts
 
         new_position = previous_position
         new_cash = previous_cash
         transaction_cost = 0
 
-        self.data.at[self.current_step, 'action'] = action
-
-        # Define transaction cost function
-        def calculate_transaction_cost(price, quantity):
-            return price * quantity * transaction_cost_rate
+        ledger['action'][row] = action
+        ledger['entry_price'][row] = np.nan
 
         if contextualize:
+            market_context = self.context[step]
             if market_context == 1:  # Bull market
                 if action == 1:  # Buy or cover short (moving to neutral)
                     if previous_position <= 0:
                         self.quantity = previous_cash / (current_price * (1 + transaction_cost_rate))
-                        transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                        transaction_cost = current_price * self.quantity * transaction_cost_rate
                         new_cash = previous_cash - current_price * self.quantity - transaction_cost
                         new_position = 1 if previous_position == 0 else 0
-                        self.data.at[self.current_step, 'entry_price'] = current_price
+                        self.entry_price = ledger['entry_price'][row] = current_price
 
                 elif action == -1 and previous_position == 1:  # Sell from long (moving to neutral)
-                    transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                    transaction_cost = current_price * self.quantity * transaction_cost_rate
                     new_cash = previous_cash + current_price * self.quantity - transaction_cost
                     self.quantity = 0
                     new_position = 0
 
             elif market_context == 0:  # Bear market
                 if action == 1 and previous_position == -1:  # Cover short (moving to neutral)
-                    transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                    transaction_cost = current_price * self.quantity * transaction_cost_rate
                     new_cash = previous_cash + current_price * self.quantity - transaction_cost
                     self.quantity = 0
                     new_position = 0
@@ -147,84 +377,93 @@ class TradingEnvironment():
                 elif action == -1:  # Go short or stay neutral
                     if previous_position >= 0:
                         self.quantity = previous_cash / (current_price * (1 + transaction_cost_rate))
-                        transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                        transaction_cost = current_price * self.quantity * transaction_cost_rate
                         new_cash = previous_cash - current_price * self.quantity - transaction_cost
                         new_position = -1 if previous_position == 0 else 0
-                        self.data.at[self.current_step, 'entry_price'] = current_price
-        
+                        self.entry_price = ledger['entry_price'][row] = current_price
+
         else:
             # Action logic without context
             if action == 1:  # Buy or go long
                 if previous_position <= 0:
                     self.quantity = previous_cash / (current_price * (1 + transaction_cost_rate))
-                    transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                    transaction_cost = current_price * self.quantity * transaction_cost_rate
                     new_cash = previous_cash - current_price * self.quantity - transaction_cost
                     new_position = 1
-                    self.data.at[self.current_step, 'entry_price'] = current_price
+                    self.entry_price = ledger['entry_price'][row] = current_price
 
             elif action == -1:  # Sell or go short
                 if previous_position >= 0:
-                    transaction_cost = calculate_transaction_cost(current_price, self.quantity)
+                    transaction_cost = current_price * self.quantity * transaction_cost_rate
                     new_cash = previous_cash + current_price * self.quantity - transaction_cost
                     self.quantity = 0
                     new_position = -1 if previous_position == 0 else 0
 
-        # Update state variables
-        self.data.at[self.current_step, 'position'] = new_position
-        self.data.at[self.current_step, 'cash'] = new_cash
-        self.data.at[self.current_step, 'nav'] = self.quantity * current_price
-        self.data.at[self.current_step, 'net_worth'] = self.data.at[self.current_step, 'nav'] + new_cash
-        self.data.at[self.current_step, 'transaction_cost'] = transaction_cost
-
-        # Calculate returns
-        current_net_worth = self.data.at[self.current_step, 'net_worth']
-        self.data.at[self.current_step, 'returns'] = (current_net_worth - previous_net_worth) / previous_net_worth if previous_net_worth != 0 else 0
+        # Update the account and its ledger
+        nav = self.quantity * current_price
+        net_worth = nav + new_cash
+        self.position = new_position
+        self.cash = new_cash
+        self.net_worth = net_worth
+
+        ledger['position'][row] = new_position
+        ledger['cash'][row] = new_cash
+        ledger['nav'][row] = nav
+        ledger['net_worth'][row] = net_worth
+        ledger['transaction_cost'][row] = transaction_cost
+        self.episode_length = row + 1
+        ledger['returns'][row] = (net_worth - previous_net_worth) / previous_net_worth if previous_net_worth != 0 else 0
 
         # Calculate reward only when closing a position
         if previous_position != 0 and new_position == 0:
-            self.reward = np.exp(((current_price * (1 - transaction_cost_rate) - entry_price * (1 + transaction_cost_rate)) /
-                                (entry_price * (1 + transaction_cost_rate))) * (1 if previous_position > 0 else -1))
+            self.reward = math.exp(((current_price * (1 - transaction_cost_rate) - entry_price * (1 + transaction_cost_rate)) /
+                                    (entry_price * (1 + transaction_cost_rate))) * (1 if previous_position > 0 else -1))
             self.done = True
-            self.state = self._get_state()
+            self._commit_episode()
+            self.state = self._get_state(contextualize)
             return self.state, self.reward, self.done
-        
+
         else:
             self.reward = 0  # No reward unless the position is closed
 
         self.current_step += 1
-        self.done = self.current_step >= len(self.data) - 1
-        self.state = self._get_state()
+        self.done = self.current_step >= len(self.close) - 1
+        if self.done:
+            self._commit_episode()
+        self.state = self._get_state(contextualize)
 
         return self.state, self.reward, self.done
 
 
 
     def render(self): 
+        data = self.to_frame()
+
         # Set the Matplotlib figure and subplots
         fig = plt.figure(figsize=(10, 8))
         ax1 = fig.add_subplot(211, ylabel='Price', xlabel='Time')
         ax2 = fig.add_subplot(212, ylabel='Capital', xlabel='Time', sharex=ax1)
 
         # Plot the first graph -> Evolution of the stock market price
-        self.data['close'].plot(ax=ax1, color='blue', lw=2)
+        data['close'].plot(ax=ax1, color='blue', lw=2)
 
-        ax1.plot(self.data.loc[self.data['action'] == 1.0].index, 
-                 self.data['close'][self.data['action'] == 1.0],
+        ax1.plot(data.loc[data['action'] == 1.0].index, 
+                 data['close'][data['action'] == 1.0],
                  '^', markersize=5, color='green')   
         
-        ax1.plot(self.data.loc[self.data['action'] == -1.0].index, 
-                 self.data['close'][self.data['action'] == -1.0],
+        ax1.plot(data.loc[data['action'] == -1.0].index, 
+                 data['close'][data['action'] == -1.0],
                  'v', markersize=5, color='red')
         
         # Plot the second graph -> Evolution of the trading capital
-        self.data['net_worth'].plot(ax=ax2, color='blue', lw=2)
+        data['net_worth'].plot(ax=ax2, color='blue', lw=2)
 
-        ax2.plot(self.data.loc[self.data['action'] == 1.0].index, 
-                 self.data['net_worth'][self.data['action'] == 1.0],
+        ax2.plot(data.loc[data['action'] == 1.0].index, 
+                 data['net_worth'][data['action'] == 1.0],
                  '^', markersize=5, color='green')   
         
-        ax2.plot(self.data.loc[self.data['action'] == -1.0].index, 
-                 self.data['net_worth'][self.data['action'] == -1.0],
+        ax2.plot(data.loc[data['action'] == -1.0].index, 
+                 data['net_worth'][data['action'] == -1.0],
                  'v', markersize=5, color='red')
         
         # Generation of the two legends and plotting
@@ -232,8 +471,3 @@ class TradingEnvironment():
         ax2.legend(["Capital", "Long", "Short"])
         #plt.savefig(''.join(['Figures/', str(self.marketSymbol), '_Rendering', '.png']))
         plt.show()
-
-
-        
-
-        
\ No newline at end of file
@@ -11,9 +11,12 @@ Autor: Valter Rebelo
 import numpy as np
 import pandas as pd
 from tabulate import tabulate
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots  # Certifique-se de que esta importação está presente
+from lazyImport import LazyModule
+
+# Plotly is only needed with visualize=True: imported on first use
+go = LazyModule('plotly.graph_objects')
+px = LazyModule('plotly.express')
+plotly_subplots = LazyModule('plotly.subplots')
 
 ###############################################################################
 ########################### Class PerformanceEstimator #########################
@@ -171,7 +174,7 @@ class PerformanceEstimator:
 
         if self.visualize:
             # Create two subplots, one for close/positions (top) and one for net worth (bottom)
-            fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+            fig = plotly_subplots.make_subplots(rows=2, cols=1, shared_xaxes=True,
                                 vertical_spacing=0.05, 
                                 subplot_titles=("Close Price & Positions", "Net Worth"))
 
@@ -288,6 +291,17 @@ class PerformanceEstimator:
         }
         return performance
 
+    def computeMetrics(self):
+        """
+        The performance indicators as a flat dict of floats (the drawdown and profitability tuples split),
+        e.g. to compare two runs of the same strategy.
+        """
+        performance = self.computePerformance()
+        del performance['Performance History']
+        performance['Max Drawdown'], performance['Max Drawdown Duration'] = performance['Max Drawdown']
+        performance['Profitability'], performance['Profit/Loss Ratio'] = performance['Profitability']
+        return {name: float(value) for name, value in performance.items()}
+
     def displayPerformance(self):
         performance = self.computePerformance()
         
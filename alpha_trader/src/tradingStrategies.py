@@ -5,8 +5,8 @@ import pandas as pd
 
 
 class AlphaTraderLongBiased2(Strategy):
-    def __init__(self, initial_balance, start, end):
-        super().__init__(initial_balance, start, end)
+    def __init__(self, initial_balance, start, end, **kwargs):
+        super().__init__(initial_balance, start, end, **kwargs)
 
     def generate_signals(self):
         # Shorten MA windows to increase sensitivity and frequency of trades
@@ -61,7 +61,7 @@ class AlphaTraderLongBiased2(Strategy):
 
         self.data['asset_returns'] = (self.data['close'] / self.data['open'] - 1).fillna(0)
         self.data['strategy_returns'] = self.data['asset_returns'] * self.data['position']
-        self.data['net_worth'] = self.initial_balance * (1 + self.data['strategy_returns']).cumprod()
+        self.data['net_worth'] = self.compound(self.data['strategy_returns'])
 
         return self.data
 
@@ -73,15 +73,15 @@ class AlphaTraderLongBiased2(Strategy):
     
 
 class BuyNHold(Strategy):
-    def __init__(self, initial_balance, start, end):
-        super().__init__(initial_balance, start, end)
+    def __init__(self, initial_balance, start, end, **kwargs):
+        super().__init__(initial_balance, start, end, **kwargs)
         
     def generate_signals(self):
         # The Buy and Hold strategy takes a position from the start and holds it.
         self.data['position'] = 1  # Always in the market
         self.data['asset_returns'] = (self.data['close'] / self.data['open'] - 1).fillna(0)  # Asset return
         self.data['strategy_returns'] = self.data['asset_returns']  # Strategy returns are the same as asset returns for Buy & Hold
-        self.data['net_worth'] = self.initial_balance * (1 + self.data['strategy_returns']).cumprod()
+        self.data['net_worth'] = self.compound(self.data['strategy_returns'])
         return self.data
     
     def backtest(self, visualize = False):
@@ -111,8 +111,8 @@ class BuyNHold(Strategy):
                 self.wrapper.place_spot_order('BTCUSDT', side='sell')
 
 class AFT01(Strategy):
-    def __init__(self, initial_balance, start, end):
-        super().__init__(initial_balance, start, end)
+    def __init__(self, initial_balance, start, end, **kwargs):
+        super().__init__(initial_balance, start, end, **kwargs)
 
     def generate_signals(self):
         # Calculate EMAs
@@ -167,7 +167,7 @@ class AFT01(Strategy):
         self.data['strategy_returns'] = (self.data['asset_returns'] * self.data['position']) - (self.data['trade_flag'] * fee_rate)
 
         # Compute net worth over time
-        self.data['net_worth'] = self.initial_balance * (1 + self.data['strategy_returns']).cumprod()
+        self.data['net_worth'] = self.compound(self.data['strategy_returns'])
 
         return self.data
 
@@ -205,8 +205,8 @@ class AFT01(Strategy):
 
 
 class AlphaTraderLongBiased(Strategy):
-    def __init__(self, initial_balance, start, end):
-        super().__init__(initial_balance, start, end)
+    def __init__(self, initial_balance, start, end, **kwargs):
+        super().__init__(initial_balance, start, end, **kwargs)
 
     def generate_signals(self):
         # Smooth the context
@@ -249,7 +249,7 @@ class AlphaTraderLongBiased(Strategy):
 
         self.data['asset_returns'] = (self.data['close'] / self.data['open'] - 1).fillna(0)
         self.data['strategy_returns'] = self.data['asset_returns'] * self.data['position']
-        self.data['net_worth'] = self.initial_balance * (1 + self.data['strategy_returns']).cumprod()
+        self.data['net_worth'] = self.compound(self.data['strategy_returns'])
 
         return self.data
 
@@ -260,8 +260,8 @@ class AlphaTraderLongBiased(Strategy):
         return super().apply_strategy()
 
 class AlphaTraderOne(Strategy):
-    def __init__(self, initial_balance, start, end):
-        super().__init__(initial_balance, start, end)
+    def __init__(self, initial_balance, start, end, **kwargs):
+        super().__init__(initial_balance, start, end, **kwargs)
 
 
     def compute_confidence_gauge(self):
@@ -346,7 +346,7 @@ class AlphaTraderOne(Strategy):
         self.data['strategy_returns'] = (self.data['asset_returns'] * self.data['position']) - (self.data['trade_flag'] * fee_rate)
 
         # Net worth calculation
-        self.data['net_worth'] = self.initial_balance * (1 + self.data['strategy_returns']).cumprod()
+        self.data['net_worth'] = self.compound(self.data['strategy_returns'])
 
         return self.data
     
@@ -1,4 +1,5 @@
 from datetime import datetime
+import numpy as np
 import pandas as pd 
 
 def timestamp_to_datetime(timestamp):
@@ -11,29 +12,65 @@ def timestamp_to_datetime(timestamp):
     return datetime.utcfromtimestamp(timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S')
 
 
+def klines_to_frame(klines, columns, index_name='t', dtype=np.float64):
+    """
+    Parse a raw list-of-lists kline payload column-wise, without building a dict per row.
+
+    :param klines: Rows as returned by the exchange, open time (ms) first, then the numeric fields.
+    :param columns: Names of the numeric fields that follow the open time, in payload order.
+    :param index_name: Name of the resulting DatetimeIndex.
+    :param dtype: Float dtype of the columns (np.float32 in compact mode).
+    :return: DataFrame of `dtype` columns indexed by open time, sorted ascending.
+    """
+    if len(klines) == 0:
+        return pd.DataFrame(columns=columns, dtype=dtype, index=pd.DatetimeIndex([], name=index_name))
+
+    raw = np.asarray(klines, dtype=object)
+    index = pd.DatetimeIndex(pd.to_datetime(raw[:, 0].astype(np.int64), unit='ms'), name=index_name)
+    values = raw[:, 1:len(columns) + 1].astype(dtype)
+
+    df = pd.DataFrame(values, index=index, columns=columns)
+    df.sort_index(ascending=True, inplace=True)
+    return df
+
+
+def frame_nbytes(df):
+    """Memory footprint of a DataFrame in bytes, index included."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def compact_frame(df, keep=(), float_dtype=np.float32, int_dtype=np.int8):
+    """
+    Downcast a frame for compact mode: float64 columns to `float_dtype` and int64 columns to
+    `int_dtype` when every value fits (otherwise to the smallest integer type that does).
+
+    :param keep: Columns left untouched (e.g. precision-sensitive accumulators such as 'net_worth').
+    :return: New DataFrame; `df` is not modified.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in keep:
+            continue
+        dtype = df[column].dtype
+        if dtype == np.float64:
+            df[column] = df[column].astype(float_dtype)
+        elif dtype == np.int64:
+            values = df[column]
+            info = np.iinfo(int_dtype)
+            if values.empty or (values.min() >= info.min and values.max() <= info.max):
+                df[column] = values.astype(int_dtype)
+            else:
+                df[column] = pd.to_numeric(values, downcast='integer')
+    return df
+
+
 def parse_klines(response):
     if response.get('retCode') != 0:
         raise ValueError(f"Error in response: {response.get('retMsg', 'Unknown error')}")
 
-    candles = []
-
     # Correctly access 'list' inside 'result'
-    for candle in response.get('result', {}).get('list', []):
-        candles.append({
-            't': timestamp_to_datetime(int(candle[0])),
-            'open': float(candle[1]),
-            'high': float(candle[2]),
-            'low': float(candle[3]),
-            'close': float(candle[4]),
-            'volume': float(candle[5]),
-            'turnover': float(candle[6])
-        })
-
-    # Create DataFrame and set 't' as the index
-    df = pd.DataFrame(candles)
-    df.set_index('t', inplace=True)
-    df.sort_index(ascending=True, inplace=True)
-    return df
+    return klines_to_frame(response.get('result', {}).get('list', []),
+                           columns=['open', 'high', 'low', 'close', 'volume', 'turnover'])
 
 
 def parse_orderbook(response):
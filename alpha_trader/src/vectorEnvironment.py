@@ -0,0 +1,172 @@
+"""
+Projeto: AlfaTrader AI
+Objetivo: Ambiente de trading vetorizado: N episódios independentes sobre os mesmos arrays de mercado, com as
+          regras de contexto (bull/bear) e os custos de transação calculados em lote, para inferência de
+          políticas em lotes grandes.
+Autor: Valter Rebelo
+
+"""
+
+###############################################################################
+################################### Imports ###################################
+###############################################################################
+
+
+import numpy as np
+
+
+###############################################################################
+######################### Classe VectorTradingEnvironment #####################
+###############################################################################
+
+class VectorTradingEnvironment:
+    """
+    N independent TradingEnvironment episodes stepped together.
+
+    The market arrays (close, context, state features) are those of `environment` and are shared,
+    not copied; each episode only owns its account (step, position, quantity, cash, net worth and
+    entry price), held as arrays of shape (N,). A batch step applies the TradingEnvironment.step
+    rules to all the episodes at once with array operations.
+
+        envs = VectorTradingEnvironment(TradingEnvironment(None, None, 10000., data=df), num_envs=256)
+        states = envs.reset()
+        states, rewards, dones = envs.step(policy(states))   # actions of shape (256,)
+
+    Episodes reset automatically, as TradingEnvironment.reset would: after a closed trade the episode
+    continues on the next bar with its cash, and an episode that runs out of data starts over at its
+    first bar with the initial cash. The states returned for finished episodes are therefore the first
+    states of their next episodes.
+    """
+
+    def __init__(self, environment, num_envs, start_steps=None, out=None):
+        """
+        :param environment: TradingEnvironment providing the market data and the settings (stateSize, txCosts,
+                            contextualize, initial cash).
+        :param num_envs: Number of parallel episodes N.
+        :param start_steps: First bar of each episode (N ints >= stateSize). By default the episodes are spread
+                            evenly over the data.
+        :param out: Optional preallocated (N, stateSize * features) float64 buffer the states are written into at
+                    every step and reset (its content is then overwritten by the next call).
+        """
+        self.environment = environment
+        self.num_envs = num_envs
+        self.close = environment.close
+        self.context = environment.context
+        self.features = environment.features
+        self.windows = environment.windows
+        self.out = out
+        self.stateSize = environment.stateSize
+        self.txCosts = environment.txCosts
+        self.contextualize = environment.contextualize
+        self.initial_cash = environment.initial_cash
+
+        length = len(self.close)
+        if start_steps is None:
+            start_steps = np.linspace(self.stateSize, length - 2, num_envs)
+        self.start_steps = np.asarray(start_steps, dtype=np.int64)
+        if self.start_steps.shape != (num_envs,):
+            raise ValueError(f"Expected {num_envs} start steps, got shape {self.start_steps.shape}")
+        if (self.start_steps < self.stateSize).any() or (self.start_steps >= length - 1).any():
+            raise ValueError(f"Start steps must lie in [{self.stateSize}, {length - 2}]")
+
+        self.position_dtype = environment.integer_dtype
+        self.reset()
+
+    def __len__(self):
+        return self.num_envs
+
+    def _get_states(self):
+        """(N, stateSize * features) matrix of the windows ending before each episode's current step."""
+        return self.environment.observations(self.current_steps, out=self.out)
+
+    def _restart(self, mask):
+        """Start the masked episodes over at their first bar with the initial account."""
+        self.current_steps[mask] = self.start_steps[mask]
+        self.position[mask] = 0
+        self.quantity[mask] = 0.
+        self.cash[mask] = self.initial_cash
+        self.net_worth[mask] = self.initial_cash
+        self.entry_price[mask] = np.nan
+
+    def reset(self):
+        """
+        Start every episode over.
+
+        :return: States of shape (N, stateSize * features).
+        """
+        self.current_steps = self.start_steps.copy()
+        self.position = np.zeros(self.num_envs, dtype=self.position_dtype)
+        self.quantity = np.zeros(self.num_envs)
+        self.cash = np.full(self.num_envs, self.initial_cash)
+        self.net_worth = np.full(self.num_envs, self.initial_cash)
+        self.entry_price = np.full(self.num_envs, np.nan)
+        self.rewards = np.zeros(self.num_envs)
+        self.dones = np.zeros(self.num_envs, dtype=bool)
+        self.states = self._get_states()
+        return self.states
+
+    def step(self, actions):
+        """
+        Step every episode with its action (0 hold, 1 buy/long, -1 sell/short).
+
+        :param actions: Array of shape (N,).
+        :return: Tuple (states (N, stateSize * features), rewards (N,), dones (N,)).
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected actions of shape ({self.num_envs},), got {actions.shape}")
+
+        steps = self.current_steps
+        price = self.close[steps]
+        previous_position = self.position
+        rate = self.txCosts
+        entry_price = np.where(previous_position != 0, self.entry_price, price)
+
+        buy = actions == 1
+        sell = actions == -1
+        if self.contextualize:
+            market_context = self.context[steps]
+            bull = market_context == 1
+            bear = market_context == 0
+            open_long = bull & buy & (previous_position <= 0)
+            open_short = bear & sell & (previous_position >= 0)
+            # Position quantities bought with all the cash, and liquidated positions
+            opening = open_long | open_short
+            closing = (bull & sell & (previous_position == 1)) | (bear & buy & (previous_position == -1))
+            opened_position = np.where(open_long, 1, -1) * (previous_position == 0)
+        else:
+            opening = buy & (previous_position <= 0)
+            closing = sell & (previous_position >= 0)
+            opened_position = np.ones(self.num_envs, dtype=np.int64)
+
+        bought = self.cash / (price * (1 + rate))
+        quantity = np.where(opening, bought, np.where(closing, 0., self.quantity))
+        traded = np.where(opening, bought, np.where(closing, self.quantity, 0.))
+        transaction_cost = price * traded * rate
+        cash = self.cash + np.where(opening, -1., np.where(closing, 1., 0.)) * price * traded - transaction_cost
+
+        new_position = np.where(opening, opened_position,
+                                np.where(closing, np.where(self.contextualize | (previous_position != 0), 0, -1),
+                                         previous_position)).astype(self.position_dtype)
+        self.entry_price = np.where(opening, price, self.entry_price)
+        self.quantity = quantity
+        self.cash = cash
+        self.net_worth = quantity * price + cash
+        self.position = new_position
+
+        # Reward only when a position is closed; that ends the episode on the same bar
+        closed = (previous_position != 0) & (new_position == 0)
+        gross = (price * (1 - rate) - entry_price * (1 + rate)) / (entry_price * (1 + rate))
+        self.rewards = np.where(closed, np.exp(gross * np.sign(previous_position)), 0.)
+
+        steps += ~closed
+        self.dones = closed | (steps >= len(self.close) - 1)
+
+        # Auto-reset: next bar with the cash carried over, or back to the first bar at the end of the data
+        if self.dones.any():
+            steps += self.dones
+            self.quantity[self.dones] = 0.
+            self._restart(steps >= len(self.close))
+
+        self.states = self._get_states()
+        return self.states, self.rewards, self.dones
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules under src/ import each other as top-level modules (e.g. `from dataManager import DataManager`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+###############################################################################
+############################ Dados de mercado #################################
+###############################################################################
+
+def make_market_data(n=300, close=None, volatility=0.01, context=None, regime_length=20, seed=0):
+    """
+    Synthetic get_data frame (OHLCV, trigger features, 'mvrv_z_score' and 'context'), one row per hour.
+
+    :param close: Close prices (`n` is then their length); by default a random walk of `volatility` log returns.
+    :param context: Constant context of every row; by default random bull/bear regimes of `regime_length` rows.
+    """
+    rng = np.random.default_rng(seed)
+    if close is None:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    if context is None:
+        context = np.repeat(rng.integers(0, 2, n // regime_length + 1), regime_length)[:n]
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'open': open_, 'high': np.maximum(open_, close) * 1.01, 'low': np.minimum(open_, close) * 0.99, 'close': close,
+        'volume': rng.gamma(2., 5., n),
+        'srs': rng.normal(size=n), 'hash_ribbon': rng.normal(0, 1e18, n), 'cvd_ema24': rng.normal(0, 1e6, n),
+        'mvrv_z_score': rng.normal(size=n), 'context': np.broadcast_to(context, n).astype(float),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='h', name='t'))
+
+
+@pytest.fixture
+def market_data():
+    """The make_market_data factory."""
+    return make_market_data
+
+
+###############################################################################
+############################ Fontes simuladas #################################
+###############################################################################
+
+GLASSNODE_ENDPOINTS = {
+    'BTC_PRICE': 'market/price_usd_close',
+    'SSR': 'indicators/ssr_oscillator',
+    'CVD': 'market/spot_cvd_sum',
+    'SUPPLY_IN_PROFIT': 'supply/profit_relative',
+    'BTC_HASH_RATE': 'mining/hash_rate_mean',
+    'BTC_REALIZED_PRICE': 'market/price_realized_usd',
+    'PUELL_MULTIPLE': 'indicators/puell_multiple',
+    'MVRV_Z_SCORE': 'market/mvrv_z_score',
+    'ENTITY_ADJ_NUPL': 'indicators/net_unrealized_profit_loss_account_based',
+    'ENTITY_ADJ_DORMANCY_FLOW': 'indicators/dormancy_flow',
+}
+
+METRIC_SCALES = {'price_usd_close': 30000., 'price_realized_usd': 20000., 'hash_rate_mean': 5e20,
+                 'spot_cvd_sum': 1e6, 'profit_relative': 0.7}
+
+
+class StubResponse:
+    def __init__(self, rows, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(rows)
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class GlassnodeStub:
+    """
+    Offline Glassnode transport. Every (metric, t) has a fixed value, so overlapping requests agree,
+    and every request is recorded in `requests` as (metric, asset, start, end) timestamps.
+
+    :param starts: Dict {asset: first timestamp with data} (default 2011-08-01 for every asset).
+    :param failing: Metrics answered with HTTP 500.
+    :param latency: Dict {metric: seconds} slowing down some responses, to shuffle completion order.
+    :param missing: Timestamps without a published bar, for every metric.
+    """
+
+    def __init__(self, starts=None, failing=(), latency=None, missing=()):
+        self.starts = {asset: pd.Timestamp(start) for asset, start in (starts or {}).items()}
+        self.failing = set(failing)
+        self.latency = latency or {}
+        self.missing = {int(pd.Timestamp(t).timestamp()) for t in missing}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def values(metric, seconds):
+        phase = sum(map(ord, metric)) % 17
+        wave = np.sin(seconds / 250000. + phase) + 0.3 * np.sin(seconds / 37000. + 2 * phase)
+        return METRIC_SCALES.get(metric, 1.) * (1. + 0.1 * wave)
+
+    def get(self, url, params=None, **kwargs):
+        metric = url.rsplit('/', 1)[1]
+        with self.lock:
+            self.requests.append((metric, params['a'], pd.Timestamp(params['s'], unit='s'),
+                                  pd.Timestamp(params['u'], unit='s')))
+        time.sleep(self.latency.get(metric, 0.))
+        if metric in self.failing:
+            return StubResponse({'error': 'internal error'}, status_code=500)
+
+        step = 3600 if params['i'] == '1h' else 86400
+        first = int(self.starts.get(params['a'], pd.Timestamp('2011-08-01')).timestamp())
+        seconds = np.arange(-(-max(params['s'], first) // step) * step, params['u'] + 1, step)
+        seconds = seconds[~np.isin(seconds, list(self.missing))]
+        return StubResponse([{'t': int(t), 'v': float(v)} for t, v in zip(seconds, self.values(metric, seconds))])
+
+
+def recorded_klines(start, end):
+    """Hourly Binance-style klines from `start` to `end`, with a deterministic close path."""
+    start_ms = int(pd.Timestamp(start).timestamp() * 1000)
+    hours = int((pd.Timestamp(end) - pd.Timestamp(start)) / pd.Timedelta(hours=1)) + 1
+    close = 30000. * (1. + 0.05 * np.sin(np.arange(hours) / 40.))
+    return [[start_ms + i * 3600000, str(c), str(c * 1.01), str(c * 0.99), str(c), '3.0'] for i, c in enumerate(close)]
+
+
+@pytest.fixture
+def glassnode_env(monkeypatch):
+    for name, endpoint in GLASSNODE_ENDPOINTS.items():
+        monkeypatch.setenv(name, endpoint)
+
+
+@pytest.fixture
+def make_data_manager(glassnode_env, monkeypatch):
+    """
+    Factory of DataManagers served by a GlassnodeStub (`manager.transport`, built from `starts`,
+    `failing`, `latency` and `missing`) and by hourly Binance klines recorded over `kline_range`
+    (start, end) or given as `klines`, with no network access.
+    """
+    import dataManager
+    from dataManager import DataManager
+    from klineDownloader import RecordedKlines
+
+    try:
+        import pandas_ta  # noqa: F401
+    except ImportError:
+        # compute_triggers uses pandas_ta; panelIndicators has the same formulations
+        import panelIndicators
+        monkeypatch.setattr(dataManager, 'ta', SimpleNamespace(ema=panelIndicators.ema, rsi=panelIndicators.rsi))
+
+    def make(kline_range=None, klines=None, starts=None, failing=(), latency=None, missing=(), **kwargs):
+        manager = DataManager(transport=GlassnodeStub(starts, failing, latency, missing), **kwargs)
+        if klines is None:
+            klines = recorded_klines(*kline_range) if kline_range else []
+        manager.binance_session = RecordedKlines(klines)
+        return manager
+
+    DataManager.invalidate_memory_cache()
+    yield make
+    DataManager.invalidate_memory_cache()
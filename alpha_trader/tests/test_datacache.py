@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from dataCache import GlassnodeCache, FrameCache, SnapshotStore, code_version
+
+
+def _frame(start, periods):
+    return pd.DataFrame({'t': pd.date_range(start, periods=periods, freq='h'), 'ssr_oscillator': range(periods)})
+
+
+def test_store_and_load_roundtrip(tmp_path):
+    cache = GlassnodeCache(cache_dir=str(tmp_path))
+    df = _frame('2024-01-01', 5)
+    cache.store('indicators/ssr_oscillator', 'BTC', '1h', df, pd.Timestamp('2023-12-31'))
+
+    loaded, coverage_start = cache.load('indicators/ssr_oscillator', 'BTC', '1h')
+
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+    assert coverage_start == pd.Timestamp('2023-12-31')
+
+
+def test_load_missing_entry(tmp_path):
+    cache = GlassnodeCache(cache_dir=str(tmp_path))
+    assert cache.load('market/price_usd_close', 'BTC', '24h') == (None, None)
+
+
+def test_update_appends_and_overwrites_last_bar(tmp_path):
+    cache = GlassnodeCache(cache_dir=str(tmp_path))
+    cached = _frame('2024-01-01', 3)
+    delta = _frame('2024-01-01 02:00', 3)
+    delta['ssr_oscillator'] = [100, 101, 102]
+
+    merged = cache.update('indicators/ssr_oscillator', 'BTC', '1h', cached, [delta], pd.Timestamp('2024-01-01'))
+
+    assert merged['t'].is_monotonic_increasing
+    assert len(merged) == 5
+    assert merged['ssr_oscillator'].tolist() == [0, 1, 100, 101, 102]
+    loaded, _ = cache.load('indicators/ssr_oscillator', 'BTC', '1h')
+    assert len(loaded) == 5
+
+
+def test_frame_cache_returns_copies_and_evicts_lru():
+    df = _frame('2024-01-01', 100)
+    size = int(df.memory_usage(deep=True).sum())
+    cache = FrameCache(max_bytes=2 * size)
+
+    cache.put('a', df)
+    cache.put('b', df)
+    cache.get('a')['ssr_oscillator'] = -1  # mutating a returned frame does not touch the cache
+    cache.put('c', df)  # evicts 'b', the least recently used
+
+    assert cache.get('b') is None
+    assert cache.get('a')['ssr_oscillator'].tolist() == list(range(100))
+    assert cache.total_bytes == 2 * size
+
+
+def test_frame_cache_computes_once_and_invalidates():
+    cache = FrameCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return _frame('2024-01-01', 3)
+
+    cache.get_or_compute(('context', '2024-01-01'), compute)
+    cache.get_or_compute(('context', '2024-01-01'), compute)
+    cache.invalidate(lambda key: key[0] == 'context')
+    cache.get_or_compute(('context', '2024-01-01'), compute)
+
+    assert len(calls) == 2
+
+
+def test_snapshot_roundtrip_is_immutable(tmp_path):
+    store = SnapshotStore(snapshot_dir=str(tmp_path))
+    df = _frame('2024-01-01', 5).set_index('t')
+    key = store.key(start='2024-01-01', end='2024-01-02', endpoints=['indicators/ssr_oscillator'])
+
+    store.store(key, df, metadata={'start': '2024-01-01'})
+    store.store(key, df * 2)
+
+    pd.testing.assert_frame_equal(store.load(key), df)
+    assert store.metadata(key) == {'start': '2024-01-01'}
+    assert store.load(store.key(start='2024-01-01')) is None
+
+
+def test_snapshot_load_is_zero_copy_with_nans(tmp_path):
+    store = SnapshotStore(snapshot_dir=str(tmp_path))
+    df = pd.DataFrame({'close': np.linspace(100., 200., 1000), 'srs': np.linspace(-1., 1., 1000),
+                       'position': np.zeros(1000, dtype=np.int8)},
+                      index=pd.date_range('2024-01-01', periods=1000, freq='h', name='t'))
+    df.iloc[:240, 1] = np.nan  # indicator warm-up
+    store.store('nans', df)
+
+    table = store._read_table('nans')
+    assert table.column('srs').null_count == 0
+    mapped = {name: np.frombuffer(table.column(name).chunk(0).buffers()[1], dtype=df[name].dtype)
+              for name in df.columns}
+    loaded = store._to_frame(table)
+
+    pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+    for name in df.columns:
+        assert np.shares_memory(loaded[name].to_numpy(), mapped[name])
+
+
+def test_snapshot_key_depends_on_every_field():
+    fields = {'start': '2024-01-01', 'end': '2024-02-01', 'assets': {'BTC': 'BTCUSDT'}, 'code_version': 'a'}
+
+    assert SnapshotStore.key(**fields) == SnapshotStore.key(**dict(reversed(list(fields.items()))))
+    assert SnapshotStore.key(**fields) != SnapshotStore.key(**{**fields, 'code_version': 'b'})
+
+
+def test_snapshot_get_or_compute_keeps_multiindex(tmp_path):
+    store = SnapshotStore(snapshot_dir=str(tmp_path))
+    index = pd.MultiIndex.from_product([['BTC', 'ETH'], pd.date_range('2024-01-01', periods=3, freq='h')], names=['asset', 't'])
+    df = pd.DataFrame({'close': range(6)}, index=index, dtype=float)
+    calls = []
+
+    first = store.get_or_compute('panel', lambda: calls.append(1) or df)
+    second = store.get_or_compute('panel', lambda: calls.append(1) or df)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_code_version_tracks_sources(tmp_path, monkeypatch):
+    monkeypatch.delenv('ALPHA_TRADER_CODE_VERSION', raising=False)
+    (tmp_path / 'module.py').write_text('x = 1\n')
+    before = code_version(str(tmp_path))
+    (tmp_path / 'module.py').write_text('x = 2\n')
+
+    assert code_version(str(tmp_path)) != before
+    monkeypatch.setenv('ALPHA_TRADER_CODE_VERSION', 'v1.2')
+    assert code_version(str(tmp_path)) == 'v1.2'
@@ -0,0 +1,204 @@
+import pandas as pd
+import pytest
+
+ENDPOINT = 'market/price_usd_close'
+
+
+def expected(manager, start, end):
+    """The bars of the uncached request, which the cached path must reproduce."""
+    return manager._request_glassnode_data(ENDPOINT, pd.Timestamp(start), pd.Timestamp(end), '24h')
+
+
+def fetch(manager, start, end):
+    manager.transport.requests.clear()
+    return manager._fetch_glassnode_data(ENDPOINT, pd.Timestamp(start), pd.Timestamp(end), '24h')
+
+
+def requested(manager):
+    return [(start, end) for _, _, start, end in manager.transport.requests]
+
+
+def test_disk_cache_is_opt_in(make_data_manager, monkeypatch, tmp_path):
+    monkeypatch.delenv('GLASSNODE_CACHE_DIR', raising=False)
+    assert make_data_manager().cache is None
+
+    assert make_data_manager(cache_dir=str(tmp_path)).cache.cache_dir == str(tmp_path)
+    monkeypatch.setenv('GLASSNODE_CACHE_DIR', str(tmp_path / 'env'))
+    assert make_data_manager().cache.cache_dir == str(tmp_path / 'env')
+    assert make_data_manager(use_cache=False).cache is None
+
+
+@pytest.fixture
+def cached_manager(make_data_manager, tmp_path):
+    manager = make_data_manager(cache_dir=str(tmp_path))
+    df = fetch(manager, '2020-01-10', '2020-01-20')
+    assert requested(manager) == [(pd.Timestamp('2020-01-10'), pd.Timestamp('2020-01-20'))]
+    pd.testing.assert_frame_equal(df, expected(manager, '2020-01-10', '2020-01-20'))
+    return manager
+
+
+def test_request_inside_the_cached_range_is_served_from_disk(cached_manager, make_data_manager):
+    df = fetch(cached_manager, '2020-01-12', '2020-01-18')
+    assert requested(cached_manager) == []
+    pd.testing.assert_frame_equal(df, expected(cached_manager, '2020-01-12', '2020-01-18'))
+
+    # Another manager over the same directory does not download either
+    other = make_data_manager(cache_dir=cached_manager.cache.cache_dir)
+    pd.testing.assert_frame_equal(fetch(other, '2020-01-12', '2020-01-18'), df)
+    assert requested(other) == []
+
+
+def test_request_after_the_last_cached_bar_fetches_only_the_new_bars(cached_manager):
+    df = fetch(cached_manager, '2020-01-15', '2020-01-25')
+    # From the last cached bar on, which may have been provisional
+    assert requested(cached_manager) == [(pd.Timestamp('2020-01-20'), pd.Timestamp('2020-01-25'))]
+    pd.testing.assert_frame_equal(df, expected(cached_manager, '2020-01-15', '2020-01-25'))
+
+
+def test_request_before_the_cached_coverage_fetches_only_the_older_bars(cached_manager):
+    df = fetch(cached_manager, '2020-01-05', '2020-01-15')
+    assert requested(cached_manager) == [(pd.Timestamp('2020-01-05'), pd.Timestamp('2020-01-10'))]
+    pd.testing.assert_frame_equal(df, expected(cached_manager, '2020-01-05', '2020-01-15'))
+
+    # The coverage now starts on 2020-01-05
+    fetch(cached_manager, '2020-01-05', '2020-01-20')
+    assert requested(cached_manager) == []
+
+
+def test_concurrent_merge_matches_sequential_merge(make_data_manager):
+    # The first endpoints answer last, so the requests complete out of order
+    latency = {'price_usd_close': 0.2, 'ssr_oscillator': 0.1}
+    sequential = make_data_manager(max_concurrency=1, latency=latency, use_cache=False)
+    concurrent = make_data_manager(max_concurrency=8, latency=latency, use_cache=False)
+
+    expected_df = sequential.get_trigger_data(pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-05'))
+    merged_df = concurrent.get_trigger_data(pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-05'))
+
+    assert list(merged_df.columns) == ['price_usd_close', 'ssr_oscillator', 'spot_cvd_sum', 'profit_relative',
+                                       'hash_rate_mean']
+    pd.testing.assert_frame_equal(merged_df, expected_df)
+    assert merged_df.index.is_monotonic_increasing
+
+
+@pytest.mark.parametrize('max_concurrency', [1, 8])
+def test_failing_endpoint_propagates(make_data_manager, max_concurrency):
+    manager = make_data_manager(max_concurrency=max_concurrency, failing={'spot_cvd_sum'})
+    with pytest.raises(Exception, match='market/spot_cvd_sum'):
+        manager.get_trigger_data(pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-05'))
+
+    # Nothing partial was memoized: the next call fails again
+    with pytest.raises(Exception, match='market/spot_cvd_sum'):
+        manager.get_trigger_data(pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-05'))
+
+
+def test_update_triggers_requires_a_warmed_up_state(make_data_manager):
+    from streamingIndicators import TriggerIndicatorState
+
+    with pytest.raises(ValueError, match='build_trigger_state'):
+        make_data_manager().update_triggers(TriggerIndicatorState(), end=pd.Timestamp('2024-01-01'))
+
+
+def test_streamed_triggers_match_batch_with_custom_srs_settings(make_data_manager):
+    manager = make_data_manager(kline_range=('2022-06-01', '2023-08-01'), use_cache=False)
+    state = manager.build_trigger_state('2023-06-01', '2023-07-01', srs_window=48, srs_quantile=0.25)
+    assert (state.rsi_median.window, state.rsi_median.quantile) == (48, 0.25)
+
+    streamed = manager.update_triggers(state, end=pd.Timestamp('2023-07-03'))
+    batch = manager.compute_triggers('2023-06-01', '2023-07-03', srs_window=48, srs_quantile=0.25)
+
+    assert streamed.index[0] == pd.Timestamp('2023-07-01 01:00') and len(streamed) == 47
+    pd.testing.assert_frame_equal(streamed[batch.columns], batch.loc[streamed.index], check_freq=False)
+
+
+@pytest.mark.parametrize('boolean', [False, True])
+def test_streamed_context_matches_batch(make_data_manager, tmp_path, boolean):
+    from marketContext import MarketConditionState
+
+    # Days without a published bar on both sides of the last warm-up bar get the same bounded fill
+    manager = make_data_manager(missing=['2023-05-31', '2023-06-04', '2023-06-05'], max_fill=2, use_cache=False)
+    manager.build_context_state('2023-06-01').save(tmp_path / 'context.pkl')
+    state = MarketConditionState.load(tmp_path / 'context.pkl')
+
+    streamed = manager.update_context(state, end=pd.Timestamp('2023-07-01'), boolean=boolean)
+    if boolean:
+        batch = manager.compute_context_boolean('2023-05-01', '2023-07-01')
+    else:
+        batch = manager.compute_context('2023-05-01', '2023-07-01')
+
+    assert streamed.index[0] == pd.Timestamp('2023-06-02') and streamed.index[-1] == pd.Timestamp('2023-06-30')
+    assert state.last_timestamp == pd.Timestamp('2023-06-30')
+    pd.testing.assert_frame_equal(streamed[batch.columns], batch.loc[streamed.index], check_freq=False, rtol=1e-7)
+
+
+def test_update_context_requires_a_warmed_up_state(make_data_manager):
+    from marketContext import MarketConditionState
+
+    with pytest.raises(ValueError, match='build_context_state'):
+        make_data_manager().update_context(MarketConditionState(), end=pd.Timestamp('2024-01-01'))
+
+
+@pytest.mark.parametrize('contextualize', [True, False])
+def test_panel_matches_single_asset_pipeline_for_assets_starting_later(make_data_manager, contextualize):
+    # ETH has no Glassnode history before 2022-09-01 15:00, long after the BTC history starts
+    eth_start = '2022-09-01 15:00'
+    kline_range = ('2022-01-01', '2023-08-01')
+    panel = make_data_manager(kline_range=kline_range, starts={'ETH': eth_start}, use_cache=False).get_panel_data(
+        '2023-06-01', '2023-07-01', ['BTC', 'ETH'], contextualize=contextualize)
+
+    # The single-asset pipeline only fetches BTC, so ETH is served as BTC by a source with ETH's history
+    for asset, starts in [('BTC', None), ('ETH', {'BTC': eth_start})]:
+        single = make_data_manager(kline_range=kline_range, starts=starts, use_cache=False).get_data(
+            '2023-06-01', '2023-07-01', contextualize=contextualize)
+        assert single[['srs', 'cvd_ema24']].notna().all().all()
+        pd.testing.assert_frame_equal(panel.loc[asset], single, check_freq=False, rtol=1e-7)
+
+
+def test_streamed_triggers_repair_gaps_and_duplicates_like_batch(make_data_manager):
+    from tests.conftest import recorded_klines
+
+    # The price gap starts before the last warm-up bar (2023-07-01 00:00) and outlasts max_fill=3, so
+    # the batch fills 23:00, 00:00 and 01:00 only; the on-chain bars of 02:00 and 03:00 are not published
+    gap = pd.date_range('2023-06-30 23:00', '2023-07-01 05:00', freq='h')
+    klines = [kline for kline in recorded_klines('2022-06-01', '2023-08-01')
+              if pd.Timestamp(kline[0], unit='ms') not in gap]
+    duplicate = next(kline for kline in klines if pd.Timestamp(kline[0], unit='ms') == pd.Timestamp('2023-07-02 05:00'))
+    klines.append([duplicate[0], '1.0', '2.0', '0.5', '1.5', '9.0'])
+    manager = make_data_manager(klines=klines, missing=['2023-07-01 02:00', '2023-07-01 03:00'], max_fill=3,
+                                use_cache=False)
+
+    state = manager.build_trigger_state('2023-06-01', '2023-07-01')
+    streamed = manager.update_triggers(state, end=pd.Timestamp('2023-07-03'))
+    batch = manager.compute_triggers('2023-06-01', '2023-07-03')
+
+    assert streamed.index.is_unique and len(streamed) == 47
+    assert streamed.loc['2023-07-01 01:00', 'close'] == batch.loc['2023-07-01 00:00', 'close']
+    assert streamed.loc['2023-07-01 02:00':'2023-07-01 05:00', 'close'].isna().all()
+    assert streamed.loc['2023-07-02 05:00', 'close'] == 1.5
+    pd.testing.assert_frame_equal(streamed[batch.columns], batch.loc[streamed.index], check_freq=False)
+
+
+def test_memoized_and_snapshot_data_depend_on_max_fill(make_data_manager, tmp_path):
+    from tests.conftest import recorded_klines
+
+    # Three hours without price bars: filled with max_fill=6, left as NaN with max_fill=0
+    gap = pd.date_range('2023-07-01 02:00', '2023-07-01 04:00', freq='h')
+    source = dict(klines=[kline for kline in recorded_klines('2022-06-01', '2023-08-01')
+                          if pd.Timestamp(kline[0], unit='ms') not in gap])
+
+    filled = make_data_manager(max_fill=6, **source).get_data('2023-06-01', '2023-07-03', contextualize=False)
+    unfilled_manager = make_data_manager(max_fill=0, **source)
+    unfilled = unfilled_manager.get_data('2023-06-01', '2023-07-03', contextualize=False)
+    assert filled.loc[gap, 'close'].notna().all()
+    assert unfilled.loc[gap, 'close'].isna().all()
+    assert unfilled_manager.quality_reports['triggers'].filled.sum() == 0
+
+    snapshots = [make_data_manager(max_fill=max_fill, snapshot_dir=str(tmp_path), **source).get_data(
+        '2023-06-01', '2023-07-03', contextualize=False, snapshot=True) for max_fill in (6, 0)]
+    pd.testing.assert_frame_equal(snapshots[0], filled, check_freq=False)
+    pd.testing.assert_frame_equal(snapshots[1], unfilled, check_freq=False)
+
+
+@pytest.mark.parametrize('exchange, topic', [('binance', 'btcusdt@kline_1h'), ('bybit', 'kline.60.BTCUSDT')])
+def test_kline_stream_defaults_to_the_hourly_interval_of_each_exchange(make_data_manager, exchange, topic):
+    message = make_data_manager().kline_stream(exchange=exchange).protocol.subscribe_message()
+    assert topic in message.get('params', message.get('args'))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from dataQuality import find_gaps, flag_outliers, repair_frame
+
+
+def _hourly(n, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=n, freq='h', name='t')
+    return pd.DataFrame({'close': 100 + rng.normal(size=n).cumsum(), 'ssr_oscillator': rng.normal(size=n)}, index=index)
+
+
+def test_reindexes_gaps_and_fills_only_short_ones():
+    df = _hourly(100).drop(index=pd.date_range('2024-01-01 10:00', periods=2, freq='h'))
+    df = df.drop(index=pd.date_range('2024-01-02 00:00', periods=8, freq='h'))
+
+    repaired, report = repair_frame(df, max_fill=3)
+
+    assert len(repaired) == 100 and repaired.index.freq == 'h'
+    assert report.missing_bars == 10
+    assert report.gaps['bars'].tolist() == [2, 8]
+    assert report.gaps['start'].tolist() == [pd.Timestamp('2024-01-01 10:00'), pd.Timestamp('2024-01-02 00:00')]
+    assert repaired.loc['2024-01-01 11:00', 'close'] == df.loc['2024-01-01 09:00', 'close']
+    assert repaired.loc['2024-01-02 00:00':'2024-01-02 02:00', 'close'].notna().all()
+    assert repaired.loc['2024-01-02 03:00':'2024-01-02 07:00', 'close'].isna().all()
+    assert report.filled['close'] == 2 + 3 and report.remaining['close'] == 5
+
+
+def test_duplicates_keep_last_and_misaligned_are_snapped():
+    df = _hourly(5)
+    late = pd.DataFrame({'close': [999.], 'ssr_oscillator': [0.]}, index=pd.DatetimeIndex(['2024-01-01 02:00'], name='t'))
+    off_grid = pd.DataFrame({'close': [555.], 'ssr_oscillator': [0.]}, index=pd.DatetimeIndex(['2024-01-01 05:30'], name='t'))
+
+    repaired, report = repair_frame(pd.concat([df, late, off_grid]))
+
+    assert report.duplicates == 1 and report.misaligned == 1
+    assert repaired.loc['2024-01-01 02:00', 'close'] == 999.
+    assert repaired.loc['2024-01-01 05:00', 'close'] == 555.
+    assert repaired.index.is_unique and repaired.index.is_monotonic_increasing
+
+
+def test_clean_frame_is_untouched():
+    df = _hourly(500)
+
+    repaired, report = repair_frame(df)
+
+    pd.testing.assert_frame_equal(repaired, df, check_freq=False)
+    assert report.ok and report.summary()['gaps'] == 0
+
+
+def test_outliers_are_flagged_not_changed():
+    df = _hourly(1000)
+    df.iloc[700, 0] += 500
+
+    repaired, report = repair_frame(df)
+
+    assert report.outliers['close'].iloc[700]
+    assert report.outlier_counts['ssr_oscillator'] == 0
+    assert repaired['close'].iloc[700] == df['close'].iloc[700]
+
+
+def test_find_gaps_on_daily_grid():
+    index = pd.DatetimeIndex(['2024-01-01', '2024-01-02', '2024-01-05'])
+
+    gaps = find_gaps(index, '24h')
+
+    assert gaps.to_dict('records') == [{'start': pd.Timestamp('2024-01-03'), 'end': pd.Timestamp('2024-01-04'), 'bars': 2}]
+
+
+def test_random_drops_are_restored_on_the_grid():
+    df = _hourly(20_000)
+    df = df.iloc[np.random.default_rng(1).random(len(df)) > 0.01]
+
+    repaired, report = repair_frame(df)
+
+    assert len(repaired) == 20_000 and report.missing_bars == 20_000 - len(df)
+    assert flag_outliers(repaired).shape == repaired.shape
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from featureNormalization import FeatureNormalizer, dataset_hash, log_returns, rolling_zscore
+from tradingEnvironment import TradingEnvironment
+
+
+@pytest.fixture
+def data(market_data):
+    return market_data(n=500, regime_length=1, seed=3)
+
+
+def test_transforms(data, tmp_path):
+    columns = ['close', 'volume', 'srs']
+    normalizer = FeatureNormalizer(transforms={'srs': 'rolling_zscore'}, window=40, train_fraction=0.5, cache_dir=str(tmp_path))
+
+    normalized = normalizer.transform(data[columns])
+
+    close, volume, srs = normalized.T
+    np.testing.assert_allclose(close[1:], np.diff(np.log(data['close'].to_numpy())))
+    assert close[0] == 0.
+    # Fit on the first half only
+    assert volume[:250].mean() == pytest.approx(0., abs=1e-12)
+    assert volume[:250].std() == pytest.approx(1.)
+    assert normalizer.stats[tuple(columns)]['volume']['mean'] == pytest.approx(data['volume'].iloc[:250].mean())
+    rolling = data['srs'].rolling(40, min_periods=10)
+    np.testing.assert_allclose(srs[9:], ((data['srs'] - rolling.mean()) / rolling.std()).to_numpy()[9:])
+    assert (srs[:9] == 0).all()
+
+
+def test_train_end_and_invalid_transform(data):
+    assert FeatureNormalizer(train_end='2024-01-05 23:00').train_rows(data.index) == 120
+    with pytest.raises(ValueError):
+        FeatureNormalizer(transforms={'srs': 'minmax'})
+
+
+def test_result_is_cached_by_dataset_hash(data, tmp_path):
+    columns = ['close', 'volume', 'srs']
+    first = FeatureNormalizer(cache_dir=str(tmp_path)).transform(data[columns])
+    assert len(list(tmp_path.glob('*.npy'))) == 1
+
+    cached = FeatureNormalizer(cache_dir=str(tmp_path)).transform(data[columns])
+    np.testing.assert_array_equal(cached, first)
+    assert not cached.flags.owndata and not cached.flags.writeable
+
+    changed = data[columns].copy()
+    changed.iloc[-1, 0] *= 2
+    assert dataset_hash(changed) != dataset_hash(data[columns])
+    FeatureNormalizer(cache_dir=str(tmp_path)).transform(changed)
+    FeatureNormalizer(cache_dir=str(tmp_path), window=100, default='rolling_zscore').transform(data[columns])
+    assert len(list(tmp_path.glob('*.npy'))) == 3
+
+
+def test_environment_states_are_normalized(data, tmp_path):
+    normalizer = FeatureNormalizer(cache_dir=str(tmp_path))
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=10, normalizer=normalizer)
+
+    expected = FeatureNormalizer(use_cache=False).transform(data[env.state_columns])
+    np.testing.assert_allclose(env.features, expected)
+    env.step(0)
+    np.testing.assert_allclose(env.state, expected[1:11].ravel())
+    assert np.shares_memory(env.state, env.features)
+
+
+def test_disk_cache_is_opt_in(data, monkeypatch, tmp_path):
+    monkeypatch.delenv('ALPHA_TRADER_NORMALIZATION_DIR', raising=False)
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    assert FeatureNormalizer().cache_dir is None
+    FeatureNormalizer().transform(data[['close', 'srs']])
+    assert not (tmp_path / 'home').exists()
+
+    monkeypatch.setenv('ALPHA_TRADER_NORMALIZATION_DIR', str(tmp_path / 'env'))
+    FeatureNormalizer().transform(data[['close', 'srs']])
+    assert len(list((tmp_path / 'env').glob('*.npy'))) == 1
+    assert FeatureNormalizer(use_cache=False).cache_dir is None
+
+
+def test_stats_are_kept_per_column_set(data):
+    normalizer = FeatureNormalizer(train_fraction=0.5)
+    env = TradingEnvironment(None, None, 1000., data=data.assign(mayer_multiple=data['srs'] * 2.), stateSize=10,
+                             normalizer=normalizer)
+    env._feature_matrix(False)
+
+    contextualized = tuple(env._state_columns(True))
+    uncontextualized = tuple(env._state_columns(False))
+    assert set(normalizer.stats) == {contextualized, uncontextualized}
+    assert 'mayer_multiple' not in normalizer.stats[contextualized]
+    assert normalizer.stats[uncontextualized]['mayer_multiple']['mean'] == pytest.approx(
+        2 * normalizer.stats[contextualized]['srs']['mean'])
+
+
+def test_helpers_handle_edge_values():
+    values = np.array([[1., 0.], [2., 1.], [2., 2.]])
+    np.testing.assert_allclose(log_returns(values)[:, 0], [0., np.log(2.), 0.])
+    assert np.isinf(log_returns(values)[1, 1])  # NaN/inf are zeroed by the normalizer, not here
+    assert np.isnan(rolling_zscore(values, window=8)[0]).all()
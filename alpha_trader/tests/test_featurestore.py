@@ -0,0 +1,62 @@
+import multiprocessing
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from featureStore import FeatureStore
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(2)
+    index = pd.date_range('2024-01-01', periods=1000, freq='h', name='t')
+    return pd.DataFrame({'close': rng.normal(size=1000).cumsum(), 'srs': rng.normal(size=1000).astype(np.float32),
+                         'context': rng.integers(0, 2, 1000).astype(np.int8)}, index=index)
+
+
+def _worker_sum(store):
+    return float(store.attach(columns=['close'])['close'].sum())
+
+
+def test_attach_roundtrip_is_read_only_and_memory_mapped(tmp_path, data):
+    store = FeatureStore.create(str(tmp_path / 'features'), data)
+
+    attached = store.attach()
+
+    pd.testing.assert_frame_equal(attached, data, check_freq=False)
+    values = attached['close'].to_numpy()
+    assert not values.flags.writeable
+    assert not values.flags.owndata
+    attached['position'] = 0  # new columns can still be added
+    with pytest.raises(ValueError):
+        values[0] = 1.
+
+
+def test_multiindex_and_string_columns(tmp_path):
+    index = pd.MultiIndex.from_product([['BTC', 'ETH'], pd.date_range('2024-01-01', periods=3, freq='h')], names=['asset', 't'])
+    df = pd.DataFrame({'close': np.arange(6.), 'regime': ['bull', 'bear'] * 3}, index=index)
+
+    attached = FeatureStore.create(str(tmp_path / 'panel'), df).attach()
+
+    assert attached.index.equals(df.index)
+    assert attached['regime'].astype(str).tolist() == df['regime'].tolist()
+
+
+def test_create_refuses_to_overwrite_unless_asked(tmp_path, data):
+    path = str(tmp_path / 'features')
+    FeatureStore.create(path, data)
+
+    with pytest.raises(FileExistsError):
+        FeatureStore.create(path, data)
+    store = FeatureStore.create(path, data.iloc[:10], overwrite=True)
+    assert len(store) == 10
+
+
+def test_workers_attach_by_path(tmp_path, data):
+    store = FeatureStore.create(str(tmp_path / 'features'), data)
+
+    assert len(pickle.dumps(store)) < 500
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        results = pool.map(_worker_sum, [store, store])
+
+    assert results == pytest.approx([data['close'].sum()] * 2)
@@ -0,0 +1,56 @@
+import gzip
+import json
+import pytest
+from httpFixtures import (FixtureStore, FixtureNotFound, RecordingTransport, ReplayTransport,
+                          RecordingClient, ReplayClient, wrap_client)
+
+
+class FakeHttpResponse:
+    status_code = 200
+    headers = {'Content-Type': 'application/json'}
+    text = json.dumps([{'t': 1704067200, 'v': 0.42}])
+
+
+class FakeTransport:
+    def get(self, url, params=None, **kwargs):
+        return FakeHttpResponse()
+
+
+class FakeSpot:
+    def klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        return [[startTime, '1.0', '2.0', '0.5', '1.5', '10.0']]
+
+
+def test_http_record_then_replay(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    params = {'a': 'BTC', 's': 1704067200, 'api_key': 'secret-key'}
+
+    RecordingTransport(FakeTransport(), store).get('https://api.glassnode.com/v1/metrics/indicators/ssr_oscillator', params=params)
+    replayed = ReplayTransport(store).get('https://api.glassnode.com/v1/metrics/indicators/ssr_oscillator',
+                                          params={**params, 'api_key': 'another-key'})
+
+    assert replayed.status_code == 200
+    assert replayed.json() == [{'t': 1704067200, 'v': 0.42}]
+    for path in tmp_path.iterdir():
+        with gzip.open(path, 'rt') as f:
+            assert 'secret-key' not in f.read()
+
+
+def test_client_record_then_replay(tmp_path):
+    store = FixtureStore(str(tmp_path))
+
+    recorded = RecordingClient(FakeSpot(), store, 'binance').klines(symbol='BTCUSDT', interval='1h', startTime=1, endTime=2)
+    replayed = ReplayClient(store, 'binance').klines(symbol='BTCUSDT', interval='1h', startTime=1, endTime=2)
+
+    assert replayed == recorded
+    with pytest.raises(FixtureNotFound):
+        ReplayClient(store, 'binance').klines(symbol='ETHUSDT', interval='1h', startTime=1, endTime=2)
+
+
+def test_wrap_client_follows_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('ALPHA_TRADER_FIXTURES', 'replay')
+    monkeypatch.setenv('ALPHA_TRADER_FIXTURES_DIR', str(tmp_path))
+
+    client = wrap_client(lambda: pytest.fail('the live client must not be built on replay'), 'bybit')
+
+    assert isinstance(client, ReplayClient)
@@ -0,0 +1,102 @@
+import pytest
+import requests
+import httpTransport
+from httpTransport import HttpTransport
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(httpTransport.time, 'sleep', recorded.append)
+    return recorded
+
+
+def _transport(monkeypatch, outcomes, **kwargs):
+    transport = HttpTransport(**kwargs)
+    calls = iter(outcomes)
+
+    def fake_get(url, params=None, **_):
+        outcome = next(calls)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(transport.session, 'get', fake_get)
+    return transport
+
+
+def test_honours_retry_after(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(429, {'Retry-After': '7'}), FakeResponse(200)])
+
+    assert transport.get('https://api.glassnode.com/v1/metrics/x').status_code == 200
+    assert waits == [7.]
+
+
+def test_jittered_backoff_on_connection_errors(monkeypatch, waits):
+    transport = _transport(monkeypatch, [requests.ConnectionError(), FakeResponse(503), FakeResponse(200)],
+                           backoff_base=1., backoff_max=30.)
+
+    assert transport.get('https://example.com').status_code == 200
+    assert len(waits) == 2 and 0 <= waits[0] <= 1. and 0 <= waits[1] <= 2.
+
+
+def test_gives_up_after_max_retries(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(500)] * 3, max_retries=2)
+    assert transport.get('https://example.com').status_code == 500
+
+    transport = _transport(monkeypatch, [requests.Timeout()] * 3, max_retries=2)
+    with pytest.raises(requests.Timeout):
+        transport.get('https://example.com')
+
+
+def test_client_errors_are_not_retried(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(401)])
+
+    assert transport.get('https://example.com').status_code == 401
+    assert waits == []
+
+
+def test_rate_limit_reset_header(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(429, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '3'}),
+                                         FakeResponse(200)])
+
+    transport.get('https://example.com')
+
+    assert waits == [3.]
+
+
+def test_long_server_waits_are_honoured_in_full(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(429, {'Retry-After': '120'}), FakeResponse(200)],
+                           backoff_max=30.)
+
+    assert transport.get('https://example.com').status_code == 200
+    assert waits == [120.]
+
+
+def test_server_waits_above_the_maximum_raise(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(429, {'Retry-After': '3600'})], max_server_wait=600.)
+
+    with pytest.raises(httpTransport.RateLimitError) as error:
+        transport.get('https://example.com')
+    assert error.value.wait == 3600. and waits == []
+
+
+def test_exhausted_quota_on_success_throttles_the_next_request(monkeypatch, waits):
+    transport = _transport(monkeypatch, [FakeResponse(200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '5'}),
+                                         FakeResponse(200), FakeResponse(200)])
+
+    transport.get('https://example.com/a')
+    assert waits == []
+
+    # The next request to the same host waits for the reset instead of running into a 429
+    transport.get('https://example.com/b')
+    assert len(waits) == 1 and 4. < waits[0] <= 5.
+
+    transport.get('https://example.com/c')
+    assert len(waits) == 1
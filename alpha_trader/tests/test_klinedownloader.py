@@ -0,0 +1,67 @@
+import pytest
+from klineDownloader import (KlineDownloader, BinanceKlineSource, BybitKlineSource, RecordedKlines,
+                             TokenBucket, plan_shards, interval_to_ms)
+
+HOUR_MS = 3600 * 1000
+START_MS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+def _recorded_klines(n):
+    return [[START_MS + i * HOUR_MS, str(100. + i), str(101. + i), str(99. + i), str(100.5 + i), '1.0', '100.0']
+            for i in range(n)]
+
+
+def test_plan_shards_covers_range_without_overlap():
+    shards = plan_shards(0, 2500 * HOUR_MS - 1, HOUR_MS)
+
+    assert shards == [(0, 1000 * HOUR_MS - 1), (1000 * HOUR_MS, 2000 * HOUR_MS - 1), (2000 * HOUR_MS, 2500 * HOUR_MS - 1)]
+
+
+def test_interval_to_ms():
+    assert interval_to_ms('1h') == HOUR_MS
+    assert interval_to_ms(60) == HOUR_MS
+    assert interval_to_ms('D') == 24 * HOUR_MS
+    assert interval_to_ms('1m') == HOUR_MS // 60
+    assert interval_to_ms('W') == 7 * 24 * HOUR_MS
+
+
+@pytest.mark.parametrize('interval', ['1M', 'M'])
+def test_interval_to_ms_rejects_monthly_intervals(interval):
+    # 'M' is months, not minutes, and a month has no fixed length in milliseconds
+    with pytest.raises(ValueError, match='Monthly'):
+        interval_to_ms(interval)
+    with pytest.raises(ValueError, match='Monthly'):
+        BinanceKlineSource(RecordedKlines([]), 'BTCUSDT', interval)
+
+
+def test_interval_to_ms_rejects_unknown_units():
+    with pytest.raises(ValueError, match='Unknown'):
+        interval_to_ms('1y')
+
+
+@pytest.mark.parametrize('source_cls, interval', [(BinanceKlineSource, '1h'), (BybitKlineSource, 60)])
+def test_download_stitches_shards_in_order(source_cls, interval):
+    recorded = RecordedKlines(_recorded_klines(2500))
+    downloader = KlineDownloader(source_cls(recorded, 'BTCUSDT', interval), max_workers=4,
+                                 rate_limiter=TokenBucket(rate=1000, capacity=1000))
+
+    klines = downloader.download(START_MS, START_MS + 2499 * HOUR_MS)
+
+    assert recorded.calls == 3
+    assert [int(k[0]) for k in klines] == [START_MS + i * HOUR_MS for i in range(2500)]
+
+
+def test_download_retries_failed_shard():
+    class FlakySource(BinanceKlineSource):
+        failures = 1
+
+        def fetch(self, start_ms, end_ms):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError('reset by peer')
+            return super().fetch(start_ms, end_ms)
+
+    source = FlakySource(RecordedKlines(_recorded_klines(10)), 'BTCUSDT', '1h')
+    klines = KlineDownloader(source, rate_limiter=TokenBucket(rate=1000, capacity=1000)).download(START_MS, START_MS + 9 * HOUR_MS)
+
+    assert len(klines) == 10
@@ -0,0 +1,106 @@
+import asyncio
+import pandas as pd
+import pytest
+from klineStream import (BinanceStreamProtocol, BybitStreamProtocol, KlineStream, MockKlineServer,
+                         bars_to_frame, rest_kline_to_bar)
+
+H = 3600000
+T0 = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+def binance_kline(t, close, closed=True):
+    return {'e': 'kline', 'E': t + H, 's': 'BTCUSDT',
+            'k': {'t': t, 'T': t + H - 1, 'i': '1h', 'o': '1', 'h': '2', 'l': '0.5', 'c': str(close), 'v': '3', 'x': closed}}
+
+
+def binance_trade(t, price):
+    return {'e': 'trade', 'E': t, 's': 'BTCUSDT', 'T': t, 'p': str(price), 'q': '0.1'}
+
+
+def rest_row(t, close):
+    return [t, '1', '2', '0.5', str(close), '3', t + H - 1]
+
+
+async def collect(stream, n, timeout=5.):
+    task = asyncio.create_task(stream.run())
+    try:
+        return [await asyncio.wait_for(stream.queue.get(), timeout) for _ in range(n)]
+    finally:
+        stream.stop()
+        task.cancel()
+
+
+def test_emits_only_closed_bars_and_forwards_trades():
+    async def scenario():
+        session = [binance_kline(T0, 10., closed=False), binance_trade(T0 + 10, 10.5),
+                   binance_kline(T0, 11.), binance_kline(T0, 11.), binance_kline(T0 + H, 12.)]
+        async with MockKlineServer([session]) as server:
+            trades = asyncio.Queue()
+            stream = KlineStream(BinanceStreamProtocol('BTCUSDT', '1h', url=server.url), trades=trades)
+            bars = await collect(stream, 2)
+            return bars, trades.get_nowait(), server.subscriptions
+
+    bars, trade, subscriptions = asyncio.run(scenario())
+
+    assert [bar['t'] for bar in bars] == [T0, T0 + H]
+    assert bars[0]['close'] == 11.
+    assert trade == {'t': T0 + 10, 'price': 10.5, 'quantity': 0.1}
+    assert subscriptions[0]['params'] == ['btcusdt@kline_1h', 'btcusdt@trade']
+
+
+def test_reconnect_backfills_missed_bars_through_rest():
+    calls = []
+
+    def backfill(start_ms, end_ms):
+        calls.append((start_ms, end_ms))
+        return [rest_kline_to_bar(rest_row(t, 20. + i)) for i, t in enumerate(range(T0, T0 + 5 * H, H))]
+
+    async def scenario():
+        # The first connection drops after bar 0; bars 1-3 close while disconnected
+        sessions = [[binance_kline(T0, 10.)], [binance_kline(T0 + 4 * H, 30.)]]
+        async with MockKlineServer(sessions) as server:
+            stream = KlineStream(BinanceStreamProtocol('BTCUSDT', '1h', url=server.url), backfill=backfill,
+                                 reconnect_delay=0.01, clock=lambda: (T0 + 4 * H) / 1000)
+            return await collect(stream, 5), stream.connections
+
+    bars, connections = asyncio.run(scenario())
+
+    assert [bar['t'] for bar in bars] == [T0 + i * H for i in range(5)]
+    assert [bar['close'] for bar in bars] == [10., 21., 22., 23., 30.]
+    assert connections == 2
+    assert calls[0] == (T0 + H, T0 + 4 * H)
+
+
+def test_since_backfills_history_before_live_bars():
+    async def scenario():
+        async with MockKlineServer([[binance_kline(T0 + 2 * H, 12.)]]) as server:
+            stream = KlineStream(BinanceStreamProtocol('BTCUSDT', '1h', url=server.url),
+                                 backfill=lambda start, end: [rest_kline_to_bar(rest_row(T0 + H, 11.))],
+                                 since_ms=T0, clock=lambda: (T0 + 2 * H) / 1000)
+            return await collect(stream, 2)
+
+    bars = asyncio.run(scenario())
+
+    assert [bar['t'] for bar in bars] == [T0 + H, T0 + 2 * H]
+
+
+def test_bybit_messages_and_frame_layout():
+    protocol = BybitStreamProtocol('BTCUSDT', 60)
+    message = {'topic': 'kline.60.BTCUSDT', 'data': [{'start': T0, 'end': T0 + H - 1, 'interval': '60', 'open': '1',
+                                                      'close': '2', 'high': '3', 'low': '0.5', 'volume': '4',
+                                                      'turnover': '8', 'confirm': True, 'timestamp': T0 + H}]}
+
+    (kind, bar, closed), = protocol.parse(message)
+    frame = bars_to_frame([bar])
+
+    assert protocol.subscribe_message()['args'] == ['kline.60.BTCUSDT', 'publicTrade.BTCUSDT']
+    assert kind == 'bar' and closed
+    assert frame.index[0] == pd.Timestamp('2024-01-01') and frame.index.name == 'start_time'
+    assert frame.loc[pd.Timestamp('2024-01-01'), 'high'] == 3.
+
+
+def test_intervals_are_checked_per_exchange():
+    with pytest.raises(ValueError, match='Bybit'):
+        BybitStreamProtocol('BTCUSDT', '1h')
+    with pytest.raises(ValueError, match='Binance'):
+        BinanceStreamProtocol('BTCUSDT', 60)
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+from lazyImport import LazyModule
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_module_is_imported_on_first_attribute_access():
+    module = LazyModule('json')
+
+    assert 'not loaded' in repr(module)
+    assert module.dumps([1]) == '[1]'
+    assert 'not loaded' not in repr(module)
+
+
+def test_importing_the_pipeline_does_not_load_heavy_libraries():
+    code = ("import sys, dataManager, executionEngine, tradingPerformance; "
+            "print(sorted(m for m in ('pandas_ta', 'binance', 'pybit', 'requests', 'plotly', 'matplotlib') if m in sys.modules))")
+
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': SRC})
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from marketContext import MarketConditionState, label_regimes, market_conditions
+
+
+def legacy_determine_context(row):
+    # Row-wise rule previously applied by DataManager.compute_context_boolean
+    if row['bottom_detection'] != 0 and (row['top_detection'] == 0 or row.name < row.index[row['top_detection'] != 0].max()):
+        return int(1)
+    elif row['top_detection'] != 0 and (row['bottom_detection'] == 0 or row.name < row.index[row['bottom_detection'] != 0].max()):
+        return int(0)
+    else:
+        return np.nan
+
+
+def _detections(n, seed=0, freq='D'):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2011-08-01', periods=n, freq=freq)
+    price = rng.uniform(1, 70000, n)
+    events = rng.choice([0, 1, 2], size=n, p=[0.96, 0.02, 0.02])
+    return pd.DataFrame({'top_detection': np.where(events == 1, price, 0.),
+                         'bottom_detection': np.where(events == 2, price, 0.)}, index=index)
+
+
+def test_matches_legacy_row_wise_output():
+    data = _detections(2000)
+
+    expected = data.apply(legacy_determine_context, axis=1).ffill()
+    result = label_regimes(data['top_detection'], data['bottom_detection']).ffill()
+
+    pd.testing.assert_series_equal(result, expected.astype(float), check_names=False)
+
+
+def test_simultaneous_events_keep_previous_regime():
+    top = pd.Series([0., 5., 0., 9., 0.])
+    bottom = pd.Series([3., 0., 0., 9., 0.])
+
+    assert label_regimes(top, bottom).ffill().tolist() == [1., 0., 0., 0., 0.]
+
+
+def test_nan_detections_are_not_events():
+    top = pd.Series([np.nan, 0., 2.])
+    bottom = pd.Series([np.nan, 4., 0.])
+
+    result = label_regimes(top, bottom)
+
+    assert np.isnan(result.iloc[0]) and result.iloc[1:].tolist() == [1., 0.]
+
+
+def _context_inputs(n=1500, seed=3):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2011-08-01', periods=n, freq='D')
+    price = np.exp(np.cumsum(rng.normal(0, 0.03, n))) * 1000
+    data = pd.DataFrame({'price_usd_close': price,
+                         'price_realized_usd': pd.Series(price).rolling(90, min_periods=1).mean().to_numpy(),
+                         'profit_relative': rng.uniform(0.3, 1., n)}, index=index)
+    data.iloc[[50, 600], 0] = np.nan
+    return data
+
+
+def _pandas_market_conditions(data):
+    gradient_numerator = data['price_usd_close'].diff(28) - data['price_realized_usd'].diff(28)
+    return pd.DataFrame({
+        '28d_mkt_gradient': (gradient_numerator - gradient_numerator.expanding().mean()) / gradient_numerator.expanding().std(),
+        'mayer_multiple': data['price_usd_close'] / data['price_usd_close'].rolling(200).mean(),
+        'price_profit_corr': data['price_usd_close'].rolling(7).corr(data['profit_relative']),
+    })
+
+
+def test_market_conditions_match_pandas():
+    data = _context_inputs()
+
+    result = MarketConditionState().update_frame(data)
+
+    pd.testing.assert_frame_equal(result, _pandas_market_conditions(data), rtol=1e-9)
+
+
+def test_market_conditions_resume_from_saved_state(tmp_path):
+    data = _context_inputs()
+    state = MarketConditionState()
+    head = state.update_frame(data.iloc[:1000])
+    state.save(tmp_path / 'market.pkl')
+
+    tail = MarketConditionState.load(tmp_path / 'market.pkl').update_frame(data.iloc[1000:])
+
+    pd.testing.assert_frame_equal(pd.concat([head, tail]), _pandas_market_conditions(data), rtol=1e-9)
+
+
+def test_label_regimes_labels_each_column_of_a_panel():
+    rng = np.random.default_rng(5)
+    top = pd.DataFrame(rng.random((500, 3)) > 0.97, columns=['BTC', 'ETH', 'SOL']).astype(float)
+    bottom = pd.DataFrame(rng.random((500, 3)) > 0.97, columns=['BTC', 'ETH', 'SOL']).astype(float)
+
+    result = label_regimes(top, bottom)
+
+    for asset in top.columns:
+        pd.testing.assert_series_equal(result[asset], label_regimes(top[asset], bottom[asset]), check_names=False)
+
+
+def test_market_conditions_panel_matches_state():
+    data = {asset: _context_inputs(seed=seed) for asset, seed in [('BTC', 3), ('ETH', 4)]}
+    panel = {field: pd.DataFrame({asset: df[field] for asset, df in data.items()})
+             for field in ['price_usd_close', 'price_realized_usd', 'profit_relative']}
+
+    result = market_conditions(panel['price_usd_close'], panel['price_realized_usd'], panel['profit_relative'])
+
+    for asset, df in data.items():
+        expected = MarketConditionState().update_frame(df)
+        for column in MarketConditionState.OUTPUT_COLUMNS:
+            pd.testing.assert_series_equal(result[column][asset], expected[column], rtol=1e-9, check_names=False)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from panelIndicators import ema, rsi, to_long, to_panel, trigger_indicators
+from streamingIndicators import StreamingEMA, StreamingRSI, TriggerIndicatorState
+
+
+@pytest.fixture
+def panel_inputs():
+    rng = np.random.default_rng(11)
+    index = pd.date_range('2024-01-01', periods=2500, freq='h')
+    assets = ['BTC', 'ETH', 'SOL']
+    ssr = pd.DataFrame(rng.normal(size=(2500, 3)).cumsum(axis=0), index=index, columns=assets)
+    hash_rate = pd.DataFrame(np.exp(rng.normal(0, 0.01, (2500, 3)).cumsum(axis=0)) * 5e20, index=index, columns=assets)
+    cvd = pd.DataFrame(rng.normal(size=(2500, 3)), index=index, columns=assets)
+    return ssr, hash_rate, cvd
+
+
+def test_ema_and_rsi_match_streaming_per_column(panel_inputs):
+    ssr, _, _ = panel_inputs
+
+    for asset in ssr.columns:
+        rsi_state, ema_state = StreamingRSI(14), StreamingEMA(24)
+        np.testing.assert_allclose(rsi(ssr, length=14)[asset], [rsi_state.update(v) for v in ssr[asset]], rtol=1e-9)
+        np.testing.assert_allclose(ema(ssr, length=24)[asset], [ema_state.update(v) for v in ssr[asset]], rtol=1e-9)
+
+
+def test_ema_seeds_each_column_at_its_own_start(panel_inputs):
+    ssr, _, _ = panel_inputs
+    # ETH and SOL start later: their frames alone would begin at rows 300 and 1000
+    late = ssr.copy()
+    late.iloc[:300, 1] = np.nan
+    late.iloc[:1000, 2] = np.nan
+
+    result = ema(late, length=24, start=[0, 300, 1000])
+
+    for asset, start in zip(ssr.columns, [0, 300, 1000]):
+        expected = ema(ssr[asset].iloc[start:], length=24)
+        pd.testing.assert_series_equal(result[asset].iloc[start:], expected)
+        assert result[asset].iloc[:start + 23].isna().all()
+
+
+def test_trigger_indicators_match_single_asset_state(panel_inputs):
+    ssr, hash_rate, cvd = panel_inputs
+
+    result = trigger_indicators(ssr, hash_rate, cvd)
+
+    for asset in ssr.columns:
+        inputs = pd.DataFrame({'ssr_oscillator': ssr[asset], 'hash_rate_mean': hash_rate[asset], 'spot_cvd_sum': cvd[asset]})
+        expected = TriggerIndicatorState().update_frame(inputs)
+        for column in TriggerIndicatorState.OUTPUT_COLUMNS:
+            np.testing.assert_allclose(result[column][asset], expected[column], rtol=1e-7, atol=1e-9)
+
+
+def test_panel_round_trip_fills_missing_assets_and_fields():
+    index = pd.date_range('2024-01-01', periods=3, freq='h')
+    frames = {'BTC': pd.DataFrame({'close': [1., 2., 3.], 'volume': [4., 5., 6.]}, index=index),
+              'ETH': pd.DataFrame({'close': [7., 8.]}, index=index[1:]),
+              'SOL': None}
+
+    panel = to_panel(frames)
+    long = to_long({field: panel[field] for field in panel.columns.unique(level=0)})
+
+    assert list(panel['close'].columns) == ['BTC', 'ETH', 'SOL']
+    assert long.index.names == ['t', 'asset']
+    assert long.loc[(index[1], 'ETH'), 'close'] == 7.
+    assert np.isnan(long.loc[(index[1], 'ETH'), 'volume'])
+    assert long.xs('SOL', level='asset').isna().all().all()
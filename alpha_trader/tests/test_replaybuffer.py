@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from replayBuffer import ReplayBuffer, SumTree
+from tradingEnvironment import TradingEnvironment
+from vectorEnvironment import VectorTradingEnvironment
+
+
+@pytest.fixture
+def env(market_data):
+    return TradingEnvironment(None, None, 1000., data=market_data(n=400, regime_length=1, seed=4), stateSize=8)
+
+
+def test_ring_buffer_overwrites_the_oldest_transitions():
+    buffer = ReplayBuffer(5)
+    for i in range(7):
+        buffer.add(i, 1, float(i), i + 1, 0)
+
+    assert len(buffer) == 5 and buffer.cursor == 2
+    assert buffer.storage['step'].tolist() == [5, 6, 2, 3, 4]
+    assert {name: values.dtype for name, values in buffer.storage.items()} == ReplayBuffer.FIELDS
+    with pytest.raises(ValueError):
+        buffer.add_batch(np.arange(6), np.zeros(6), np.zeros(6), np.arange(6), np.zeros(6))
+
+
+def test_sampled_states_come_from_the_environment_windows(env):
+    buffer = ReplayBuffer(100, environment=env, seed=0)
+    for action in [1, 0, -1, 0, 0]:
+        step = env.current_step
+        _, reward, done = env.step(action)
+        buffer.add(step, action, reward, env.current_step, done)
+        if done:
+            env.reset()
+
+    batch = buffer.sample(32)
+    assert batch['states'].dtype == np.float32 and batch['states'].shape == (32, 8 * len(env.state_columns))
+    np.testing.assert_allclose(batch['states'], env.observations(batch['steps']), rtol=1e-6)
+    np.testing.assert_allclose(batch['next_states'], env.observations(batch['next_steps']), rtol=1e-6)
+    assert set(batch['actions'].tolist()) <= {1, 0, -1}
+    assert (batch['weights'] == 1).all()
+
+
+def test_vector_environment_batches(env):
+    envs = VectorTradingEnvironment(env, num_envs=16)
+    buffer = ReplayBuffer(1000, environment=env)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        steps = envs.current_steps.copy()
+        actions = rng.integers(-1, 2, 16)
+        _, rewards, dones = envs.step(actions)
+        buffer.add_batch(steps, actions, rewards, envs.current_steps, dones)
+
+    assert len(buffer) == 320
+    np.testing.assert_array_equal(buffer.storage['action'][304:320], actions)
+
+
+def test_memory_mapped_buffer_can_be_reopened(tmp_path):
+    path = str(tmp_path / 'replay')
+    buffer = ReplayBuffer(10, path=path)
+    buffer.add_batch(np.arange(4), [1, -1, 0, 1], [0.5, 0., 0., 1.5], np.arange(1, 5), [0, 0, 0, 1])
+    buffer.flush()
+
+    reopened = ReplayBuffer(10, path=path, prioritized=True)
+    assert len(reopened) == 4 and reopened.cursor == 4
+    assert reopened.storage['reward'][:4].tolist() == [0.5, 0., 0., 1.5]
+    assert isinstance(reopened.storage['step'], np.memmap)
+    assert reopened.tree.total == pytest.approx(4.)
+    with pytest.raises(ValueError):
+        ReplayBuffer(20, path=path)
+
+
+def test_sum_tree_samples_proportionally():
+    tree = SumTree(5)
+    tree.update([0, 1, 2, 3, 4], [1., 0., 3., 0., 4.])
+    assert tree.total == 8.
+    assert tree.find([0., 0.99, 1., 3.99, 4., 7.99]).tolist() == [0, 0, 2, 2, 4, 4]
+
+    tree.update([4, 4], [0., 0.])
+    assert tree.total == 4.
+
+
+def test_prioritized_sampling_follows_td_errors():
+    buffer = ReplayBuffer(100, prioritized=True, alpha=1., seed=0)
+    buffer.add_batch(np.arange(100), np.zeros(100), np.zeros(100), np.arange(100), np.zeros(100))
+    buffer.update_priorities(np.arange(100), np.where(np.arange(100) == 7, 99., 1.))
+
+    batch = buffer.sample(1000)
+    assert (batch['indices'] == 7).mean() == pytest.approx(0.5, abs=0.01)
+    assert batch['weights'].max() == pytest.approx(1.)
+    assert batch['weights'][batch['indices'] == 7].min() < batch['weights'][batch['indices'] != 7].min()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rollingQuantile import RollingQuantile, rolling_quantile
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    values = rng.normal(size=3000)
+    values[rng.choice(3000, 40, replace=False)] = np.nan
+    values[100:110] = 1.  # ties
+    return pd.Series(values, index=pd.date_range('2024-01-01', periods=3000, freq='h'), name='rsi_ssr_smoothed')
+
+
+@pytest.mark.parametrize('window', [1, 2, 240])
+def test_median_matches_pandas(series, window):
+    result = rolling_quantile(series, window, engine='streaming')
+
+    pd.testing.assert_series_equal(result, series.rolling(window).median(), rtol=0, atol=0)
+
+
+@pytest.mark.parametrize('quantile', [0., 0.1, 0.75, 1.])
+def test_quantile_matches_pandas(series, quantile):
+    result = rolling_quantile(series, 50, quantile=quantile, min_periods=10, engine='streaming')
+
+    pd.testing.assert_series_equal(result, series.rolling(50, min_periods=10).quantile(quantile), rtol=0, atol=0)
+
+
+def test_batch_engines_agree(series):
+    pd.testing.assert_series_equal(rolling_quantile(series, 240, quantile=0.3),
+                                   rolling_quantile(series, 240, quantile=0.3, engine='streaming'))
+
+
+def test_invalid_quantile():
+    with pytest.raises(ValueError):
+        RollingQuantile(10, quantile=1.5)
+
+
+def test_kernel_survives_pickling(series):
+    import pickle
+
+    kernel = RollingQuantile(240)
+    head = [kernel.update(v) for v in series.iloc[:1000]]
+    kernel = pickle.loads(pickle.dumps(kernel))
+    tail = [kernel.update(v) for v in series.iloc[1000:]]
+
+    np.testing.assert_array_equal(head + tail, series.rolling(240).median().to_numpy())
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'streaming'])
+def test_frame_is_computed_column_wise(series, engine):
+    frame = pd.DataFrame({'BTC': series, 'ETH': series * 2})
+
+    result = rolling_quantile(frame, 50, quantile=0.25, engine=engine)
+
+    pd.testing.assert_frame_equal(result, frame.rolling(50).quantile(0.25), rtol=1e-12)
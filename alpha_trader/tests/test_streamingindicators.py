@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from streamingIndicators import StreamingEWM, StreamingEMA, StreamingRSI, StreamingRollingMean, TriggerIndicatorState
+
+try:
+    import pandas_ta as ta
+except ImportError:
+    ta = None
+
+
+def _stream(indicator, series):
+    return pd.Series([indicator.update(v) for v in series], index=series.index, name=series.name)
+
+
+def _rsi(close, length):
+    if ta is not None:
+        return ta.rsi(close, length=length)
+    # Same formulation as pandas_ta.rsi (RMA of gains and losses)
+    negative = close.diff()
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = positive.ewm(alpha=1. / length, min_periods=length).mean()
+    negative_avg = negative.ewm(alpha=1. / length, min_periods=length).mean()
+    return 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def _ema(close, length):
+    if ta is not None:
+        return ta.ema(close, length=length)
+    # Same formulation as pandas_ta.ema (SMA seed, adjust=False)
+    close = close.copy()
+    sma_nth = close[0:length].mean()
+    close[:length - 1] = np.nan
+    close.iloc[length - 1] = sma_nth
+    return close.ewm(span=length, adjust=False).mean()
+
+
+@pytest.fixture
+def trigger_inputs():
+    rng = np.random.default_rng(42)
+    n = 2500
+    index = pd.date_range('2023-01-01', periods=n, freq='h')
+    data = pd.DataFrame({
+        'ssr_oscillator': np.cumsum(rng.normal(size=n)),
+        'hash_rate_mean': rng.uniform(5e20, 6e20, n),
+        'spot_cvd_sum': np.cumsum(rng.normal(size=n)) * 1e6,
+    }, index=index)
+    data.iloc[[3, 400, 401, 1800], 0] = np.nan  # gaps from the outer merge with the OHLCV data
+    return data
+
+
+@pytest.mark.parametrize('adjust, min_periods', [(True, 10), (False, 0)])
+def test_ewm_matches_pandas_exactly(trigger_inputs, adjust, min_periods):
+    series = trigger_inputs['ssr_oscillator']
+
+    expected = series.ewm(alpha=0.1, adjust=adjust, min_periods=min_periods).mean()
+
+    pd.testing.assert_series_equal(_stream(StreamingEWM(0.1, adjust, min_periods), series), expected, rtol=0, atol=0)
+
+
+def test_rolling_mean_matches_pandas(trigger_inputs):
+    series = trigger_inputs['ssr_oscillator']
+
+    pd.testing.assert_series_equal(_stream(StreamingRollingMean(30), series), series.rolling(30).mean())
+
+
+def test_rsi_and_ema_match_batch(trigger_inputs):
+    series = trigger_inputs['ssr_oscillator']
+
+    pd.testing.assert_series_equal(_stream(StreamingRSI(336), series), _rsi(series, 336), check_names=False)
+    pd.testing.assert_series_equal(_stream(StreamingEMA(24), series), _ema(series, 24), check_names=False)
+
+
+def test_trigger_state_matches_batch_after_resume(trigger_inputs, tmp_path):
+    data = trigger_inputs
+    rsi_ssr_smoothed = _ema(_rsi(data['ssr_oscillator'], 336), 800)
+    expected = pd.DataFrame({
+        'srs': rsi_ssr_smoothed - rsi_ssr_smoothed.rolling(window=240).median(),
+        'hash_ribbon': data['hash_rate_mean'].rolling(window=30).mean() - data['hash_rate_mean'].rolling(window=60).mean(),
+        'cvd_ema24': _ema(data['spot_cvd_sum'], 24),
+    })
+
+    state = TriggerIndicatorState()
+    head = state.update_frame(data.iloc[:2000])
+    state.save(tmp_path / 'state.pkl')
+    tail = TriggerIndicatorState.load(tmp_path / 'state.pkl').update_frame(data.iloc[2000:])
+
+    pd.testing.assert_frame_equal(pd.concat([head, tail]), expected, rtol=1e-10)
+
+
+def test_trigger_state_rejects_out_of_order_bars(trigger_inputs):
+    state = TriggerIndicatorState()
+    state.update_frame(trigger_inputs.iloc[:10])
+
+    with pytest.raises(ValueError):
+        state.update(trigger_inputs.index[5], 1., 1., 1.)
@@ -0,0 +1,246 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from tradingEnvironment import TradingEnvironment
+
+
+@pytest.fixture
+def data(market_data):
+    return market_data(close=100. + np.arange(20.), context=1.)
+
+
+def test_state_is_flattened_window_before_current_step(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+
+    columns = ['open', 'high', 'low', 'close', 'volume', 'srs', 'hash_ribbon', 'cvd_ema24']
+    assert env.state_columns == columns
+    np.testing.assert_array_equal(env.state, data[columns].iloc[0:5].to_numpy().ravel())
+
+    uncontextualized = TradingEnvironment(None, None, 1000., data=data, stateSize=5, contextualize=False)
+    assert uncontextualized.state.shape == (5 * 8,)
+
+
+def test_long_round_trip_in_bull_market(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5, txCosts=0.01)
+
+    state, reward, done = env.step(1)
+    quantity = 1000. / (105. * 1.01)
+    assert (reward, done, env.current_step, env.position) == (0, False, 6, 1)
+    assert env.quantity == pytest.approx(quantity)
+    assert env.cash == pytest.approx(0., abs=1e-9)
+
+    env.step(0)
+    state, reward, done = env.step(-1)
+    assert done and env.current_step == 7 and env.position == 0
+    assert reward == pytest.approx(math.exp((107. * 0.99 - 105. * 1.01) / (105. * 1.01)))
+    assert env.cash == pytest.approx(quantity * 107. * 0.99)
+
+    ledger = env.to_frame()
+    assert ledger['position'].iloc[5:8].tolist() == [1, 1, 0]
+    assert ledger['action'].iloc[5:8].tolist() == [1, 0, -1]
+    assert ledger['entry_price'].iloc[5] == 105.
+    assert ledger['net_worth'].iloc[4] == 1000.
+    assert ledger['net_worth'].iloc[7] == pytest.approx(env.cash)
+
+    # The next episode starts on the following bar with the cash carried over
+    env.reset()
+    assert env.current_step == 8 and not env.done
+    assert env.to_frame()['cash'].iloc[8:].eq(env.cash).all()
+
+
+def test_short_round_trip_in_bear_market(market_data):
+    env = TradingEnvironment(None, None, 1000., data=market_data(close=[100.] * 5 + [100., 90.] + [90.] * 5, context=0.),
+                             stateSize=5, txCosts=0.)
+
+    env.step(1)  # no long in a bear market
+    assert env.position == 0 and env.cash == 1000.
+    env.step(-1)
+    assert env.position == -1 and env.entry_price == 90.
+    _, reward, done = env.step(1)
+    assert done and reward == pytest.approx(1.)
+
+
+def test_episode_ends_at_last_bar(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    done = False
+    while not done:
+        _, _, done = env.step(0)
+    assert env.current_step == len(data) - 1
+
+
+def test_ledger_is_materialized_on_demand(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5, compact=True)
+
+    frame = env.data
+    assert list(frame.columns[-len(env.LEDGER_COLUMNS):]) == env.LEDGER_COLUMNS
+    assert frame['position'].dtype == np.int8 and frame['net_worth'].dtype == np.float64
+    assert 'position' not in env.market_data.columns
+
+
+def test_states_are_read_only_views_of_the_feature_matrix(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    expected = data[env.state_columns].iloc[3:8].to_numpy().ravel()
+
+    env.current_step = 8
+    state = env._get_state()
+    np.testing.assert_array_equal(state, expected)
+    assert np.shares_memory(state, env.features) and not state.flags.writeable
+
+    out = np.empty_like(expected)
+    assert env._get_state(out=out) is out
+    np.testing.assert_array_equal(out, expected)
+
+    env.current_step = 2  # fewer than stateSize bars available
+    np.testing.assert_array_equal(env._get_state(), data[env.state_columns].iloc[:2].to_numpy().ravel())
+
+    batch = np.empty((3, expected.size))
+    env.observations([8, 5, 19], out=batch)
+    np.testing.assert_array_equal(batch[0], expected)
+    np.testing.assert_array_equal(batch[2], data[env.state_columns].iloc[14:19].to_numpy().ravel())
+
+
+def test_episode_is_committed_when_the_trade_closes(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5, txCosts=0.)
+    env.step(1)
+    env.step(0)
+
+    # In progress: visible in the materialized frame, not yet in the global ledger
+    assert env.to_frame()['position'].iloc[5:7].tolist() == [1, 1]
+    assert env.ledger['position'][5:7].tolist() == [0, 0]
+
+    env.step(-1)
+    assert env.ledger['position'][5:8].tolist() == [1, 1, 0]
+    assert env.ledger['cash'][7] == pytest.approx(1000. * 107. / 105.)
+
+
+def test_reset_discards_an_unfinished_episode(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5, txCosts=0.)
+    env.step(1)
+    env.step(-1)  # closed: 1000 * 106 / 105
+    env.reset()
+    env.step(1)
+    env.step(0)
+
+    env.reset()  # abandons the open trade
+    assert (env.position, env.current_step) == (0, 9)
+    assert env.cash == pytest.approx(1000. * 106. / 105.)
+    frame = env.to_frame()
+    assert frame['position'].iloc[7:].eq(0).all()
+    assert frame['cash'].iloc[7:].eq(env.cash).all()
+
+
+def test_long_episodes_grow_the_episode_ledger(market_data):
+    data = market_data(close=100. + np.arange(300.), context=1.)
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5, txCosts=0.)
+    env.step(1)
+    for _ in range(200):
+        env.step(0)
+    _, reward, done = env.step(-1)
+
+    assert done and reward == pytest.approx(math.exp(306. / 105. - 1))
+    assert env.ledger['position'][5:206].all() and env.ledger['position'][206] == 0
+
+
+def run(env, actions):
+    results = []
+    for action in actions:
+        state, reward, done = env.step(action)
+        results.append((state.copy(), reward, done, env.cash))
+        if done:
+            env.reset()
+    return results
+
+
+def assert_same_results(first, second):
+    assert len(first) == len(second)
+    for (state_a, *rest_a), (state_b, *rest_b) in zip(first, second):
+        np.testing.assert_array_equal(state_a, state_b)
+        assert rest_a == rest_b
+
+
+def test_restore_replays_the_same_trajectory(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(env, [1, 0])
+    snapshot = env.snapshot()
+    frame = env.to_frame()
+
+    first = run(env, [0, -1, 1, 0])  # closes a trade and starts another episode
+    assert env.restore(snapshot) is env.state
+    second = run(env, [0, -1, 1, 0])
+
+    assert_same_results(first, second)
+    env.restore(snapshot)
+    pd.testing.assert_frame_equal(env.to_frame().iloc[:7], frame.iloc[:7])
+    assert (env.current_step, env.position) == (7, 1)
+
+
+def test_restore_clears_the_rows_of_a_longer_abandoned_branch(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(env, [1])
+    snapshot = env.snapshot()
+    run(env, [0, 0, 0, -1])  # commits rows 5-9
+
+    env.restore(snapshot)
+    run(env, [-1])  # closes on row 6
+    frame = env.to_frame()
+
+    np.testing.assert_array_equal(env.ledger['position'][5:10], [1, 0, 0, 0, 0])
+    assert np.isnan(env.ledger['cash'][7:10]).all()
+    reference = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(reference, [1, -1])
+    pd.testing.assert_frame_equal(frame, reference.to_frame())
+    assert frame['cash'].iloc[7:10].tolist() == [frame['cash'].iloc[6]] * 3
+
+
+def test_restore_after_reset_keeps_the_rows_of_the_snapshot_episode(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(env, [1, 0])
+    snapshot = env.snapshot()
+    env.reset()  # discards the open trade
+    run(env, [0, 0])
+
+    env.restore(snapshot)
+    run(env, [0, -1])
+
+    reference = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(reference, [1, 0, 0, -1])
+    frame = env.to_frame()
+    pd.testing.assert_frame_equal(frame, reference.to_frame())
+    assert (frame['position'].iloc[5], frame['action'].iloc[5], frame['entry_price'].iloc[5]) == (1, 1, 105.)
+
+
+def test_forks_share_market_data_and_own_their_account(data):
+    env = TradingEnvironment(None, None, 1000., data=data, stateSize=5)
+    run(env, [1, 0])
+    reference = env.fork(history=True)
+    fork = env.fork()
+
+    assert fork.features is env.features and fork.windows is env.windows and fork.close is env.close
+    assert_same_results(run(fork, [-1, 1, 0, -1]), run(env.fork(), [-1, 1, 0, -1]))
+
+    # The parent did not move
+    assert (env.current_step, env.position, env.cash) == (7, 1, pytest.approx(0., abs=1e-9))
+    pd.testing.assert_frame_equal(env.to_frame(), reference.to_frame())
+    with pytest.raises(ValueError):
+        fork.to_frame()
+
+
+def test_compact_episode_matches_float64(market_data):
+    from utils import utils
+
+    data = market_data(n=400, volatility=0.01, seed=6)
+    actions = np.random.default_rng(6).choice([-1, 0, 1], size=380, p=[0.1, 0.8, 0.1])
+    results = []
+    for frame, compact in [(data, False), (utils.compact_frame(data), True)]:
+        env = TradingEnvironment(None, None, 1000., data=frame, stateSize=10, compact=compact)
+        rewards = [result[1] for result in run(env, actions)]
+        results.append((env.to_frame(), np.array(rewards)))
+
+    (reference, reference_rewards), (compact_frame, compact_rewards) = results
+    assert compact_frame['position'].dtype == np.int8 and compact_frame['close'].dtype == np.float32
+    assert compact_frame['net_worth'].dtype == np.float64
+    np.testing.assert_array_equal(compact_frame['position'], reference['position'])
+    # Short positions leave net worth near 0, where only an absolute tolerance makes sense
+    np.testing.assert_allclose(compact_frame['net_worth'], reference['net_worth'], rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(compact_rewards, reference_rewards, rtol=1e-4)
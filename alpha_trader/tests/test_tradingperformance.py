@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from featureStore import FeatureStore
+from tradingPerformance import PerformanceEstimator
+from tradingStrategies import AlphaTraderLongBiased, BuyNHold
+from utils import utils
+
+
+def strategy_metrics(strategy_class, data, path):
+    FeatureStore.create(str(path), data)
+    strategy = strategy_class(10000., None, None, feature_store=str(path))
+    return strategy.data, PerformanceEstimator(tradingData=strategy.generate_signals()).computeMetrics()
+
+
+@pytest.mark.parametrize('strategy_class', [BuyNHold, AlphaTraderLongBiased])
+def test_compact_mode_keeps_strategy_metrics_within_tolerance(market_data, tmp_path, strategy_class):
+    data = market_data(n=5000, volatility=0.005, seed=5)
+    _, reference = strategy_metrics(strategy_class, data, tmp_path / 'float64')
+    signals, result = strategy_metrics(strategy_class, utils.compact_frame(data), tmp_path / 'compact')
+
+    assert signals['close'].dtype == np.float32 and signals['net_worth'].dtype == np.float64
+    assert set(result) == set(reference) and 'Max Drawdown Duration' in result
+    for name, value in reference.items():
+        assert result[name] == pytest.approx(value, rel=1e-3, abs=1e-9), name
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from utils import utils
+
+
+def test_klines_to_frame_parses_binance_payload():
+    klines = [[1704070800000, '101.0', '102.0', '100.0', '101.5', '2.0', 1704074399999, '203.0', 7, '1.0', '101.0', '0'],
+              [1704067200000, '100.0', '101.0', '99.0', '100.5', '1.0', 1704070799999, '100.5', 5, '0.5', '50.0', '0']]
+
+    df = utils.klines_to_frame(klines, columns=['open', 'high', 'low', 'close', 'volume'], index_name='start_time')
+
+    assert list(df.index) == [pd.Timestamp('2024-01-01 00:00'), pd.Timestamp('2024-01-01 01:00')]
+    assert df.index.name == 'start_time'
+    assert (df.dtypes == np.float64).all()
+    assert df['close'].tolist() == [100.5, 101.5]
+
+
+def test_parse_klines_bybit_response():
+    response = {'retCode': 0, 'result': {'list': [['1704067200000', '100', '101', '99', '100.5', '1', '100.5']]}}
+
+    df = utils.parse_klines(response)
+
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert df.loc['2024-01-01 00:00', 'turnover'] == 100.5
+
+
+def test_klines_to_frame_empty_payload():
+    df = utils.klines_to_frame([], columns=['open', 'close'])
+
+    assert df.empty and list(df.columns) == ['open', 'close']
+
+
+def test_compact_frame_downcasts_and_keeps_accumulators():
+    index = pd.date_range('2024-01-01', periods=4, freq='h', name='t')
+    df = pd.DataFrame({'close': [1., 2., 3., 4.], 'net_worth': [1., 2., 3., 4.],
+                       'position': [0, 1, -1, 0], 'volume_int': [0, 1, 2, 10 ** 6]}, index=index)
+
+    compact = utils.compact_frame(df, keep=['net_worth'])
+
+    assert compact['close'].dtype == np.float32
+    assert compact['net_worth'].dtype == np.float64
+    assert compact['position'].dtype == np.int8
+    assert compact['volume_int'].dtype == np.int32
+    assert compact.index.equals(df.index)
+    assert df['close'].dtype == np.float64
+    assert utils.frame_nbytes(compact) < utils.frame_nbytes(df)
+
+
+def test_compact_prices_keep_compounded_metrics_within_tolerance():
+    rng = np.random.default_rng(1)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.002, 50000)))
+    df = pd.DataFrame({'open': np.r_[close[0], close[:-1]], 'close': close})
+    compact = utils.compact_frame(df)
+
+    def net_worth(data):
+        returns = (data['close'] / data['open'] - 1).astype(np.float64)
+        return (1 + returns).cumprod()
+
+    np.testing.assert_allclose(net_worth(compact), net_worth(df), rtol=1e-3)
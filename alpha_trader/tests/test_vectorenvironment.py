@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from tradingEnvironment import TradingEnvironment
+from vectorEnvironment import VectorTradingEnvironment
+
+
+def scalar_episode(data, start, actions, contextualize):
+    """Reference run of one TradingEnvironment with the auto-reset of the vector environment."""
+    def fresh():
+        env = TradingEnvironment(None, None, 1000., data=data, stateSize=10, contextualize=contextualize)
+        env.current_step = start
+        env.reset()
+        return env
+
+    env = fresh()
+    states, rewards, dones, cash = [], [], [], []
+    for action in actions:
+        state, reward, done = env.step(action)
+        if done:
+            state = env.reset()
+            if state is None:
+                env = fresh()
+                state = env.state
+        states.append(state)
+        rewards.append(reward)
+        dones.append(done)
+        cash.append(env.cash)
+    return np.array(states), np.array(rewards), np.array(dones), np.array(cash)
+
+
+@pytest.mark.parametrize('contextualize', [True, False])
+def test_batch_matches_independent_environments(market_data, contextualize):
+    data = market_data(volatility=0.02)
+    starts = [10, 100, 250, 297]
+    actions = np.random.default_rng(1).choice([-1, 0, 1], size=(120, len(starts)), p=[0.2, 0.6, 0.2])
+
+    envs = VectorTradingEnvironment(TradingEnvironment(None, None, 1000., data=data, stateSize=10, contextualize=contextualize),
+                                    num_envs=len(starts), start_steps=starts)
+    batch = [envs.step(row) + (envs.cash.copy(),) for row in actions]
+
+    for i, start in enumerate(starts):
+        states, rewards, dones, cash = scalar_episode(data, start, actions[:, i], contextualize)
+        np.testing.assert_allclose(np.array([b[0][i] for b in batch]), states)
+        np.testing.assert_allclose(np.array([b[1][i] for b in batch]), rewards, rtol=1e-12)
+        np.testing.assert_array_equal(np.array([b[2][i] for b in batch]), dones)
+        np.testing.assert_allclose(np.array([b[3][i] for b in batch]), cash, rtol=1e-12)
+    assert any(b[2].any() for b in batch)
+
+
+def test_shapes_and_shared_market_data(market_data):
+    env = TradingEnvironment(None, None, 1000., data=market_data(volatility=0.02), stateSize=10)
+    envs = VectorTradingEnvironment(env, num_envs=16)
+
+    states = envs.reset()
+    assert states.shape == (16, 10 * len(env.state_columns))
+    assert envs.features is env.features and envs.close is env.close
+
+    states, rewards, dones = envs.step(np.ones(16, dtype=np.int8))
+    assert states.shape == (16, 80) and rewards.shape == (16,) and dones.dtype == bool
+
+    with pytest.raises(ValueError):
+        envs.step(np.ones(4))
+    with pytest.raises(ValueError):
+        VectorTradingEnvironment(env, num_envs=2, start_steps=[5, 20])
+
+
+def test_states_are_written_into_the_output_buffer(market_data):
+    env = TradingEnvironment(None, None, 1000., data=market_data(volatility=0.02), stateSize=10)
+    out = np.empty((4, 80))
+    envs = VectorTradingEnvironment(env, num_envs=4, out=out)
+
+    states, _, _ = envs.step(np.zeros(4))
+    assert states is out
+    np.testing.assert_array_equal(out, env.observations(envs.current_steps))